@@ -8,15 +8,21 @@ class Settings(BaseSettings):
     
     # Redis settings for Celery
     REDIS_URL: str = "redis://redis:6379/0"
+    REDIS_MAX_CONNECTIONS: int = 50  # per process, for each of the sync and asyncio pools
+    REDIS_POOL_TIMEOUT: float = 5.0  # seconds to wait for a free pooled connection
+    REDIS_SOCKET_TIMEOUT: float = 2.0  # seconds before a command to an unresponsive Redis fails
+    REDIS_CONNECT_TIMEOUT: float = 1.0  # seconds before connecting to an unreachable Redis fails
     
     # File storage settings
     UPLOAD_DIR: Path = Path("uploads")
     PROCESSED_DIR: Path = Path("processed")
     MAX_UPLOAD_SIZE: int = 100 * 1024 * 1024  # 100MB
+    VIDEO_TOMBSTONE_RETENTION_DAYS: int = 30  # how long delta polls can still learn of deletions
     
     # YouTube API settings
     YOUTUBE_CLIENT_SECRETS_FILE: str = "client_secrets.json"
     YOUTUBE_CREDENTIALS_PATH: str = "token.pickle"
+    YOUTUBE_STATS_RETENTION_DAYS: int = 90  # older view/like snapshots are pruned, except each video's latest
     
     # Video processing settings
     CHECK_SUBTITLE_FRAMES: int = 10  # Number of frames to check for existing subtitles
@@ -25,6 +31,32 @@ class Settings(BaseSettings):
     SUBTITLE_BACKGROUND: bool = True
     SUBTITLE_POSITION: str = "bottom"  # 'top' or 'bottom'
     
+    # Job scheduling settings
+    SCHEDULER_MAX_IN_FLIGHT: int = 4  # Processing jobs handed to Celery at once
+    SCHEDULER_BATCH_PENALTY: float = 300.0  # seconds a batch job yields to interactive ones
+    SCHEDULER_DURATION_WEIGHT: float = 2.0  # seconds of delay per second of clip length
+    SCHEDULER_SHORT_CLIP_SECONDS: float = 15.0
+    SCHEDULER_LEASE_TIMEOUT: int = 900  # re-queue jobs whose worker stopped renewing their slot
+    SCHEDULER_DISPATCH_TIMEOUT: int = 3600  # re-queue dispatched jobs no worker has started
+    SCHEDULER_MAX_ATTEMPTS: int = 3  # dispatches before a repeatedly lost job is marked failed
+    HEAVY_JOB_SLOTS: int = 2  # Whisper/ffmpeg runs allowed at once across all workers
+    HEAVY_JOB_LEASE_TTL: int = 60  # seconds before a crashed worker's slot is reclaimed
+    HEAVY_JOB_SLOT_TIMEOUT: int = 900  # give up waiting for a slot after this long
+
+    # Monitoring settings
+    WORKER_METRICS_PORT: int = 9808  # Prometheus endpoint of each Celery worker
+    API_TIMING_SAMPLE_THRESHOLD: int = 100  # in-flight requests before timing is sampled; 0 never samples
+    API_TIMING_SAMPLE_EVERY: int = 10  # record one request in this many while sampling
+    TRACE_EXPORTER: str = "file"  # 'file', 'otlp' or 'none'; recent traces are always kept in Redis
+    TRACE_FILE: str = "logs/traces.jsonl"
+    OTLP_ENDPOINT: str = "http://localhost:4318"  # OTLP/HTTP collector base URL
+    TRACE_SERVICE_NAME: str = "tiktok-shorts"
+    TRACE_RETENTION: int = 3 * 86400  # seconds traces stay queryable in Redis
+    PROFILE_DIR: str = "logs/profiles"  # collapsed-stack output of the sampling profiler
+    PROFILER_MAX_DURATION: float = 300.0  # longest profile an admin can request, in seconds
+    PROFILER_ENABLED: bool = False  # mount the admin profiler routes and start the process watchers
+    PROFILER_ADMIN_TOKEN: str = ""  # shared secret callers send in X-Admin-Token; empty rejects all
+
     # Shorts settings
     MAX_VIDEO_LENGTH: int = 60  # seconds
     TARGET_RESOLUTION: tuple = (1080, 1920)  # Shorts vertical format
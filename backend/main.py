@@ -1,20 +1,41 @@
-from fastapi import FastAPI, File, UploadFile, Depends, HTTPException
+from fastapi import FastAPI, File, UploadFile, Depends, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, tuple_
+from pydantic import BaseModel
 from typing import List, Optional
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 
-from database import get_db, engine
+from database import get_async_db, get_read_db, use_primary
 import models
-from tasks import process_video, upload_to_youtube, cleanup_video_files
+from tasks import scheduler, upload_to_youtube, cleanup_video_files, rerender_subtitles
+from routes import stats, settings, errors, search, metrics, traces, profiler
+from utils import health_check
+from utils.redis_pool import redis_pools
+from utils.metrics import metrics_collector
+from middleware.rate_limiter import RateLimiter, ConcurrencyLimiter
+from middleware.metrics import RequestMetrics
+from services.niche_stats import niche_stats_delta, niche_assignment_deltas
+from services.transcripts import decode_segments, transcript_text
+from utils.tiered_cache import response_cache, video_tags
+from utils.tracing import tracer
+from utils.profiler import profiler_control
+from utils.pagination import encode_cursor, decode_timestamp_cursor, to_naive_utc, compute_etag
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
+# Database schema is managed by Alembic (see migrations/)
 
 app = FastAPI()
 
+# Per-client rate limits run first (added last), then the cluster-wide
+# upload/processing concurrency cap; both sit inside CORS so 429s and 503s
+# still carry CORS headers. Request timing wraps both so rejections are counted.
+app.middleware("http")(ConcurrencyLimiter())
+app.middleware("http")(RateLimiter())
+app.add_middleware(RequestMetrics)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -22,8 +43,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset", "Retry-After", "Server-Timing"],
 )
 
+@app.on_event("startup")
+async def start_profiler_watcher():
+    profiler_control.start_watcher("api")
+
+@app.on_event("shutdown")
+async def flush_metrics_and_close_redis():
+    await run_in_threadpool(metrics_collector.flush)
+    await run_in_threadpool(tracer.flush)
+    await redis_pools.close()
+
+app.include_router(stats.router)
+app.include_router(settings.router)
+app.include_router(errors.router)
+app.include_router(search.router)
+app.include_router(health_check.router)
+app.include_router(metrics.router)
+app.include_router(traces.router)
+if profiler_control.enabled:
+    app.include_router(profiler.router)
+
 # Ensure upload directories exist
 UPLOAD_DIR = Path("uploads")
 PROCESSED_DIR = Path("processed")
@@ -31,90 +73,227 @@ UPLOAD_DIR.mkdir(exist_ok=True)
 PROCESSED_DIR.mkdir(exist_ok=True)
 
 @app.post("/api/videos/upload")
-async def upload_video(file: UploadFile = File(...), db: Session = Depends(get_db)):
+async def upload_video(file: UploadFile = File(...), source: str = "interactive", db: AsyncSession = Depends(get_async_db)):
     """Upload a new video for processing."""
     if not file.filename.endswith(('.mp4', '.mov', '.avi')):
         raise HTTPException(status_code=400, detail="Invalid file type")
+    if source not in scheduler.SOURCES:
+        raise HTTPException(status_code=400, detail="Invalid job source")
     
-    # Save uploaded file
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    file_path = UPLOAD_DIR / f"{timestamp}_{file.filename}"
-    
-    with open(file_path, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
+    # The trace started here follows the video through processing and YouTube upload
+    with tracer.start_trace("upload_video", source=source):
+        # Save uploaded file
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        file_path = UPLOAD_DIR / f"{timestamp}_{file.filename}"
+        
+        with tracer.span("save_upload"):
+            with open(file_path, "wb") as buffer:
+                content = await file.read()
+                buffer.write(content)
+        
+        # Create video record
+        db_video = models.Video(
+            title=file.filename,
+            file_path=str(file_path),
+            status="uploaded"
+        )
+        db.add(db_video)
+        await db.commit()
+        await db.refresh(db_video)
+        await run_in_threadpool(tracer.index_video, db_video.id)
+        await run_in_threadpool(response_cache.invalidate_tags, *video_tags())
+        
+        # Queue processing task, prioritised by clip length and source
+        job = await run_in_threadpool(scheduler.submit, db_video.id, str(file_path), source=source)
     
-    # Create video record
-    db_video = models.Video(
-        title=file.filename,
-        file_path=str(file_path),
-        status="uploaded"
-    )
-    db.add(db_video)
-    db.commit()
-    db.refresh(db_video)
+    return {"id": db_video.id, "status": "processing", "priorityClass": job["priority_class"]}
+
+@app.get("/api/queue/status")
+async def get_queue_status():
+    """Get processing queue depth and wait times per priority class."""
+    queue_status = await run_in_threadpool(scheduler.get_queue_status)
+    wait_times = await run_in_threadpool(scheduler.metrics.get_queue_wait_metrics, 1)
+    return {**queue_status, "waitTimes": wait_times}
+
+class ProcessedVideo(BaseModel):
+    id: int
+    title: Optional[str]
+    status: Optional[str]
+    processed_path: Optional[str]
+    has_subtitles: Optional[bool]
+    niche_id: Optional[int]
+    youtube_url: Optional[str]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+    class Config:
+        orm_mode = True
+
+class ProcessedVideoPage(BaseModel):
+    items: List[ProcessedVideo]
+    removed: List[int] = []
+    nextCursor: Optional[str]
+
+# Listing columns; the transcript stays out of the hot path
+PROCESSED_VIDEO_COLUMNS = [getattr(models.Video, field) for field in ProcessedVideo.__fields__]
+
+# updated_at is stamped when a row is written, not when its transaction
+# commits, so a delta poll re-reads this far back to catch late commits
+UPDATED_SINCE_OVERLAP = timedelta(seconds=60)
+
+@app.get("/api/videos/processed", response_model=ProcessedVideoPage)
+async def get_processed_videos(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    updated_since: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get a page of processed videos, newest first.
+
+    Pass the returned nextCursor to fetch the following page, and
+    updated_since (the newest updated_at seen) to only receive videos
+    changed since. Delta polls overlap the previous one by
+    UPDATED_SINCE_OVERLAP, so clients must merge items by id. Delta items
+    include videos that have since left "processed" (reprocessing, failed
+    uploads), which clients must drop by their `status`; the first page also
+    lists the ids of videos deleted since in `removed`.
+    """
+    query = select(*PROCESSED_VIDEO_COLUMNS)
+
+    removed = []
+    if updated_since is None:
+        query = query.where(models.Video.status == "processed")
+    else:
+        # Reads switching between a lagging replica and the primary could skip changes for good
+        use_primary(db)
+        changed_since = to_naive_utc(updated_since) - UPDATED_SINCE_OVERLAP
+        query = query.where(models.Video.updated_at > changed_since)
+        if not cursor:
+            removed = (await db.scalars(
+                select(models.VideoTombstone.video_id).where(models.VideoTombstone.deleted_at > changed_since)
+            )).all()
+
+    if cursor:
+        created_at, video_id = decode_timestamp_cursor(cursor)
+        query = query.where(
+            tuple_(models.Video.created_at, models.Video.id) < tuple_(created_at, video_id)
+        )
+
+    rows = (await db.execute(
+        query.order_by(models.Video.created_at.desc(), models.Video.id.desc()).limit(limit + 1)
+    )).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+
+    etag = compute_etag(next_cursor, removed, [(row.id, row.updated_at) for row in rows])
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    return {
+        "items": [ProcessedVideo.from_orm(row) for row in rows],
+        "removed": removed,
+        "nextCursor": next_cursor
+    }
+
+@app.get("/api/videos/{video_id}/transcript")
+async def get_video_transcript(video_id: int, db: AsyncSession = Depends(get_read_db)):
+    """Get a video's transcript with segment timings."""
+    transcript = await db.get(models.Transcript, video_id)
+    if not transcript:
+        raise HTTPException(status_code=404, detail="Transcript not found")
     
-    # Start processing task
-    process_video.delay(db_video.id)
+    segments = decode_segments(transcript.segments)
+    return {
+        "videoId": video_id,
+        "text": transcript_text(segments),
+        "segments": segments
+    }
+
+@app.post("/api/videos/{video_id}/subtitles/render")
+async def render_video_subtitles(video_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Re-burn the stored transcript into the video without re-transcribing it."""
+    transcript = await db.get(models.Transcript, video_id)
+    if not transcript:
+        raise HTTPException(status_code=404, detail="Transcript not found")
     
-    return {"id": db_video.id, "status": "processing"}
+    await run_in_threadpool(rerender_subtitles.delay, video_id)
+    return {"status": "rendering subtitles"}
 
-@app.get("/api/videos/processed")
-def get_processed_videos(db: Session = Depends(get_db)):
-    """Get list of processed videos."""
-    videos = db.query(models.Video).filter(
-        models.Video.status == "processed"
-    ).all()
-    return videos
+async def locked_video(db: AsyncSession, video_id: int) -> Optional[models.Video]:
+    """Load a video with its row locked until the transaction ends."""
+    return (await db.execute(
+        select(models.Video).where(models.Video.id == video_id).with_for_update()
+    )).scalar_one_or_none()
 
 @app.post("/api/videos/{video_id}/save")
-def save_video(video_id: int, niche_id: Optional[int] = None, db: Session = Depends(get_db)):
+async def save_video(video_id: int, niche_id: Optional[int] = None, db: AsyncSession = Depends(get_async_db)):
     """Save a video to a niche collection and trigger YouTube upload."""
-    video = db.query(models.Video).filter(models.Video.id == video_id).first()
+    # Lock the row so the rollup deltas below see the niche and upload state
+    # they replace, not one a concurrent save or upload is changing
+    video = await locked_video(db, video_id)
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
     
+    previous_niche_id = video.niche_id
     if niche_id:
-        niche = db.query(models.Niche).filter(models.Niche.id == niche_id).first()
+        niche = await db.get(models.Niche, niche_id)
         if not niche:
             raise HTTPException(status_code=404, detail="Niche not found")
+        for statement in niche_assignment_deltas(video, video.niche_id, niche_id):
+            await db.execute(statement)
         video.niche_id = niche_id
     
-    # Trigger YouTube upload
-    upload_to_youtube.delay(video.id)
-    
-    db.commit()
+    await db.commit()
+    await run_in_threadpool(response_cache.invalidate_tags, *video_tags(previous_niche_id), *video_tags(video.niche_id), "niches")
+
+    # Trigger YouTube upload only once the niche is committed, so the task counts it there
+    await run_in_threadpool(upload_to_youtube.delay, video.id)
     return {"status": "uploading to YouTube"}
 
 @app.post("/api/videos/{video_id}/discard")
-def discard_video(video_id: int, db: Session = Depends(get_db)):
+async def discard_video(video_id: int, db: AsyncSession = Depends(get_async_db)):
     """Discard a video and clean up its files."""
-    video = db.query(models.Video).filter(models.Video.id == video_id).first()
+    video = await locked_video(db, video_id)
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
     
     # Trigger cleanup
-    cleanup_video_files.delay(video.id)
+    await run_in_threadpool(cleanup_video_files.delay, video.id)
     
-    # Delete from database
-    db.delete(video)
-    db.commit()
+    # Delete from database, removing the video from its niche rollup
+    if video.niche_id:
+        await db.execute(niche_stats_delta(
+            video.niche_id,
+            total_videos=-1,
+            successful_uploads=-1 if video.youtube_url else 0
+        ))
+    await db.delete(video)
+    await db.commit()
+    await run_in_threadpool(response_cache.invalidate_tags, *video_tags(video.niche_id), "niches")
     
     return {"status": "deleted"}
 
 @app.get("/api/niches")
-def get_niches(db: Session = Depends(get_db)):
+async def get_niches(db: AsyncSession = Depends(get_read_db)):
     """Get all available niches."""
-    niches = db.query(models.Niche).all()
+    niches = (await db.scalars(select(models.Niche))).all()
     return niches
 
 @app.post("/api/niches")
-def create_niche(name: str, description: Optional[str] = None, db: Session = Depends(get_db)):
+async def create_niche(name: str, description: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
     """Create a new niche category."""
     db_niche = models.Niche(name=name, description=description)
     db.add(db_niche)
-    db.commit()
-    db.refresh(db_niche)
+    await db.flush()
+    db.add(models.NicheStats(niche_id=db_niche.id, total_videos=0, successful_uploads=0))
+    await db.commit()
+    await db.refresh(db_niche)
+    await run_in_threadpool(response_cache.invalidate_tags, "niches")
     return db_niche
 
 if __name__ == "__main__":
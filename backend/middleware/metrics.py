@@ -0,0 +1,102 @@
+import time
+from typing import Any, Dict, Optional
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from config import settings
+from utils.metrics import MetricsCollector, metrics_collector
+from utils.prometheus import API_REQUEST_SECONDS
+from utils.request_timing import start_request_timing, finish_request_timing, server_timing_header
+
+def route_template(scope: Scope) -> str:
+    """Path template of the route serving a request, e.g. /api/videos/{video_id}.
+
+    Labelling by template rather than raw path keeps one series per endpoint;
+    requests matching no route share a single "unmatched" label.
+    """
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match != Match.NONE:
+            return route.path
+    return "unmatched"
+
+class RequestMetrics:
+    """Times every request and reports it to Prometheus and the in-process metrics.
+
+    A plain ASGI middleware, so it adds no task or stream per request the way
+    BaseHTTPMiddleware does. Latency, response size and status go to
+    MetricsCollector under "METHOD /route/{template}". Responses carry a
+    Server-Timing header with the total and the db, cache and redis time spent.
+
+    While more than `sample_threshold` requests are in flight, only every
+    `sample_every`-th request is recorded in MetricsCollector (weighted to
+    keep counts right) and gets sub-timings; Prometheus still sees them all.
+    """
+
+    def __init__(self, app: ASGIApp, collector: Optional[MetricsCollector] = None,
+                 sample_threshold: int = settings.API_TIMING_SAMPLE_THRESHOLD,
+                 sample_every: int = settings.API_TIMING_SAMPLE_EVERY):
+        self.app = app
+        self.collector = collector or metrics_collector
+        self.sample_threshold = sample_threshold
+        self.sample_every = max(sample_every, 1)
+        self.in_flight = 0
+        self._seen = 0
+        self._templates: Dict[Any, str] = {}
+
+    def _weight(self) -> int:
+        """How many requests this one stands for in MetricsCollector; 0 to skip it."""
+        if not self.sample_threshold or self.in_flight <= self.sample_threshold:
+            return 1
+        self._seen += 1
+        return self.sample_every if self._seen % self.sample_every == 0 else 0
+
+    def _route(self, scope: Scope) -> str:
+        # The router stores the matched endpoint in the scope; rejected
+        # requests (429, 503) never reach it and are matched here instead
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return route_template(scope)
+        template = self._templates.get(endpoint)
+        if template is None:
+            template = self._templates[endpoint] = route_template(scope)
+        return template
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        self.in_flight += 1
+        weight = self._weight()
+        token = start_request_timing() if weight else None
+        start = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = server_timing_header(time.perf_counter() - start)
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", header.encode("latin-1"))
+                ]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            self.in_flight -= 1
+            duration = time.perf_counter() - start
+            if token is not None:
+                finish_request_timing(token)
+            route = self._route(scope)
+            API_REQUEST_SECONDS.labels(
+                method=scope["method"],
+                route=route,
+                status=str(status)
+            ).observe(duration)
+            if weight:
+                self.collector.record_api_response(f"{scope['method']} {route}", duration, status, size, weight)
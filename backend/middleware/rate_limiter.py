@@ -1,134 +1,117 @@
 from fastapi import Request, HTTPException
 from fastapi.responses import JSONResponse
-import time
+import math
 import redis
+from typing import Optional
+from redis.asyncio import Redis as AsyncRedis
+from utils.redis_pool import redis_pools
+from utils.rate_limit import LeasedRateLimiter
+from utils.semaphore import AsyncDistributedSemaphore, SemaphoreTimeout
 from utils.logging_config import CustomLogger, api_logger
 
 logger = CustomLogger(api_logger, {'component': 'rate_limiter'})
 
+def request_type(request: Request) -> str:
+    """Classify a request as an upload, a processing trigger or anything else."""
+    path = request.url.path
+    if request.method == "POST" and path.endswith("/upload"):
+        return "upload"
+    if request.method == "POST" and path.endswith("/subtitles/render"):
+        return "process"
+    return "default"
+
 class RateLimiter:
-    def __init__(self, redis_url: str = "redis://redis:6379/0"):
-        self.redis = redis.from_url(redis_url)
+    """Per-client, per-endpoint-type sliding-window rate limiting with X-RateLimit headers.
+
+    Decisions come from local buckets leased from Redis in blocks (see
+    LeasedRateLimiter), so most requests never wait on Redis.
+    """
+
+    def __init__(self, redis_client: Optional[AsyncRedis] = None):
+        self.redis = redis_client or redis_pools.async_client()
+        self.limiter = LeasedRateLimiter(self.redis, key_prefix="rate_limit:")
         self.window_size = 60  # 1 minute
         self.max_requests = {
             "upload": 10,      # 10 uploads per minute
             "process": 20,     # 20 processing requests per minute
             "default": 100     # 100 requests per minute for other endpoints
         }
+        self._was_degraded = False
 
-    async def __call__(self, request: Request):
+    async def __call__(self, request: Request, call_next):
         client_ip = request.client.host
-        path = request.url.path
-        current_time = int(time.time())
-
-        # Determine rate limit based on endpoint
-        if "upload" in path:
-            endpoint_type = "upload"
-        elif "process" in path:
-            endpoint_type = "process"
-        else:
-            endpoint_type = "default"
-
+        endpoint_type = request_type(request)
         max_requests = self.max_requests[endpoint_type]
+        result = await self.limiter.hit(f"{client_ip}:{endpoint_type}", max_requests, self.window_size)
+        self._log_degraded_transition()
 
-        try:
-            # Create a sliding window in Redis
-            key = f"rate_limit:{client_ip}:{endpoint_type}:{current_time // self.window_size}"
-            
-            # Increment request count
-            request_count = self.redis.incr(key)
-            
-            # Set expiry if this is the first request in the window
-            if request_count == 1:
-                self.redis.expire(key, self.window_size)
-            
-            # Check if rate limit exceeded
-            if request_count > max_requests:
-                logger.warning(
-                    "Rate limit exceeded",
-                    client_ip=client_ip,
-                    endpoint_type=endpoint_type,
-                    request_count=request_count
-                )
-                return JSONResponse(
-                    status_code=429,
-                    content={
-                        "detail": "Too many requests. Please try again later.",
-                        "retry_after": self.window_size
-                    }
-                )
-
-            # Log request
-            logger.info(
-                "Request processed",
+        if not result.allowed:
+            logger.warning(
+                "Rate limit exceeded",
                 client_ip=client_ip,
                 endpoint_type=endpoint_type,
-                request_count=request_count
+                retry_after=result.reset_after
+            )
+            return JSONResponse(
+                status_code=429,
+                content={
+                    "detail": "Too many requests. Please try again later.",
+                    "retry_after": math.ceil(result.reset_after)
+                },
+                headers=result.headers()
             )
 
-        except redis.RedisError as e:
+        response = await call_next(request)
+        response.headers.update(result.headers())
+        return response
+
+    def _log_degraded_transition(self):
+        """Log once when Redis becomes unreachable and once when it recovers."""
+        degraded = self.limiter.degraded
+        if degraded == self._was_degraded:
+            return
+        self._was_degraded = degraded
+        if degraded:
             logger.error(
-                "Redis error in rate limiter",
-                exc_info=e,
-                client_ip=client_ip,
-                endpoint_type=endpoint_type
+                "Redis unreachable, rate limiting from local fallback limits",
+                counters=self.limiter.counters
             )
-            # Allow request through if Redis fails
-            return None
-
-        return None
+        else:
+            logger.info("Redis reachable again, rate limiting from shared window")
 
 class ConcurrencyLimiter:
-    def __init__(self, redis_url: str = "redis://redis:6379/0"):
-        self.redis = redis.from_url(redis_url)
+    """Cluster-wide cap on concurrent upload and processing requests.
+
+    Slots are leases in a Redis semaphore, so a request that dies mid-flight
+    gives its slot back when the lease expires instead of leaking it.
+    """
+
+    def __init__(self, redis_client: Optional[AsyncRedis] = None):
+        self.redis = redis_client or redis_pools.async_client()
         self.max_concurrent = {
             "upload": 5,      # 5 concurrent uploads
             "process": 10     # 10 concurrent processing tasks
         }
+        self.semaphores = {
+            operation: AsyncDistributedSemaphore(self.redis, f"requests:{operation}", limit, lease_ttl=30)
+            for operation, limit in self.max_concurrent.items()
+        }
 
-    async def acquire_lock(self, key: str, limit: int) -> bool:
-        """Try to acquire a processing slot."""
-        try:
-            current = int(self.redis.get(key) or 0)
-            if current >= limit:
-                return False
-            
-            self.redis.incr(key)
-            return True
-        except redis.RedisError as e:
-            logger.error("Redis error acquiring lock", exc_info=e, key=key)
-            return True  # Allow operation if Redis fails
+    async def __call__(self, request: Request, call_next):
+        operation = request_type(request)
+        semaphore = self.semaphores.get(operation)
+        if semaphore is None:
+            return await call_next(request)
 
-    async def release_lock(self, key: str):
-        """Release a processing slot."""
+        # Only acquiring the slot is guarded: errors raised by the endpoint
+        # itself must propagate, not re-run the request without a slot
         try:
-            current = int(self.redis.get(key) or 1)
-            if current > 0:
-                self.redis.decr(key)
-        except redis.RedisError as e:
-            logger.error("Redis error releasing lock", exc_info=e, key=key)
-
-    async def __call__(self, request: Request):
-        path = request.url.path
-        
-        # Determine concurrency limit based on endpoint
-        if "upload" in path:
-            operation = "upload"
-        elif "process" in path:
-            operation = "process"
-        else:
-            return None
-
-        limit = self.max_concurrent.get(operation)
-        if not limit:
-            return None
-
-        key = f"concurrent:{operation}"
-        if not await self.acquire_lock(key, limit):
+            holder = await semaphore.acquire(timeout=0)
+        except SemaphoreTimeout:
             logger.warning(
                 "Concurrency limit reached",
                 operation=operation,
-                limit=limit
+                limit=semaphore.limit
             )
             return JSONResponse(
                 status_code=503,
@@ -136,8 +119,9 @@ class ConcurrencyLimiter:
                     "detail": f"Server is busy. Maximum concurrent {operation} operations reached."
                 }
             )
+        except redis.RedisError as e:
+            logger.error("Redis error in concurrency limiter", exc_info=e, operation=operation)
+            return await call_next(request)
 
-        # Add cleanup to response handlers
-        response = await request.call_next(request)
-        await self.release_lock(key)
-        return response
\ No newline at end of file
+        async with semaphore.held(holder):
+            return await call_next(request)
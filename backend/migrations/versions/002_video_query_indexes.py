@@ -0,0 +1,36 @@
+"""Index the hot video query paths
+
+Revision ID: 002
+Create Date: 2026-10-19 09:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Listing and counting by status, newest first
+    op.create_index('ix_videos_status_created_at', 'videos', ['status', 'created_at', 'id'])
+
+    # Recent videos and processing history range scans
+    op.create_index('ix_videos_created_at', 'videos', ['created_at'])
+    op.create_index('ix_videos_niche_id', 'videos', ['niche_id'])
+
+    # Successful uploads per niche
+    op.create_index(
+        'ix_videos_niche_id_uploaded',
+        'videos',
+        ['niche_id'],
+        postgresql_where=sa.text('youtube_url IS NOT NULL'),
+        sqlite_where=sa.text('youtube_url IS NOT NULL')
+    )
+
+def downgrade():
+    op.drop_index('ix_videos_niche_id_uploaded', table_name='videos')
+    op.drop_index('ix_videos_niche_id', table_name='videos')
+    op.drop_index('ix_videos_created_at', table_name='videos')
+    op.drop_index('ix_videos_status_created_at', table_name='videos')
@@ -0,0 +1,22 @@
+"""Track video updates for delta polling
+
+Revision ID: 003
+Create Date: 2026-10-19 10:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('videos', sa.Column('updated_at', sa.DateTime()))
+    op.execute('UPDATE videos SET updated_at = created_at')
+    op.create_index('ix_videos_status_updated_at', 'videos', ['status', 'updated_at'])
+
+def downgrade():
+    op.drop_index('ix_videos_status_updated_at', table_name='videos')
+    op.drop_column('videos', 'updated_at')
@@ -0,0 +1,23 @@
+"""Record when video processing starts and finishes
+
+Revision ID: 004
+Create Date: 2026-10-19 11:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('videos', sa.Column('processing_started_at', sa.DateTime(), nullable=True))
+    op.add_column('videos', sa.Column('processing_finished_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_videos_processing_finished_at', 'videos', ['processing_finished_at'])
+
+def downgrade():
+    op.drop_index('ix_videos_processing_finished_at', table_name='videos')
+    op.drop_column('videos', 'processing_finished_at')
+    op.drop_column('videos', 'processing_started_at')
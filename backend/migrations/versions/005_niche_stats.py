@@ -0,0 +1,38 @@
+"""Add the niche_stats rollup table
+
+Revision ID: 005
+Create Date: 2026-10-19 12:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'niche_stats',
+        sa.Column('niche_id', sa.Integer(), primary_key=True),
+        sa.Column('total_videos', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('successful_uploads', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime()),
+        sa.ForeignKeyConstraint(['niche_id'], ['niches.id'], ondelete='CASCADE'),
+    )
+
+    # Backfill from the existing videos
+    op.execute('''
+        INSERT INTO niche_stats (niche_id, total_videos, successful_uploads, updated_at)
+        SELECT niches.id,
+               COUNT(videos.id),
+               COUNT(videos.youtube_url),
+               CURRENT_TIMESTAMP
+        FROM niches
+        LEFT JOIN videos ON videos.niche_id = niches.id
+        GROUP BY niches.id
+    ''')
+
+def downgrade():
+    op.drop_table('niche_stats')
@@ -0,0 +1,33 @@
+"""Store YouTube statistics snapshots locally
+
+Revision ID: 006
+Create Date: 2026-10-19 13:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'youtube_stats_snapshots',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('video_id', sa.Integer(), nullable=False),
+        sa.Column('views', sa.BigInteger(), nullable=True),
+        sa.Column('likes', sa.BigInteger(), nullable=True),
+        sa.Column('fetched_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['video_id'], ['videos.id'], ondelete='CASCADE'),
+    )
+    op.create_index(
+        'ix_youtube_stats_snapshots_video_id_fetched_at',
+        'youtube_stats_snapshots',
+        ['video_id', 'fetched_at']
+    )
+
+def downgrade():
+    op.drop_index('ix_youtube_stats_snapshots_video_id_fetched_at', table_name='youtube_stats_snapshots')
+    op.drop_table('youtube_stats_snapshots')
@@ -0,0 +1,20 @@
+"""Record when a video was uploaded to YouTube
+
+Revision ID: 007
+Create Date: 2026-10-19 14:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('videos', sa.Column('youtube_uploaded_at', sa.DateTime(), nullable=True))
+    op.execute('UPDATE videos SET youtube_uploaded_at = created_at WHERE youtube_url IS NOT NULL')
+
+def downgrade():
+    op.drop_column('videos', 'youtube_uploaded_at')
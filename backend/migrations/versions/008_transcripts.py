@@ -0,0 +1,68 @@
+"""Move transcripts off the videos table
+
+Revision ID: 008
+Create Date: 2026-10-19 15:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from services.transcripts import encode_segments, decode_segments, transcript_text
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+videos = sa.table(
+    'videos',
+    sa.column('id', sa.Integer()),
+    sa.column('subtitles_text', sa.Text()),
+)
+
+transcripts = sa.table(
+    'transcripts',
+    sa.column('video_id', sa.Integer()),
+    sa.column('segments', sa.LargeBinary()),
+    sa.column('segment_count', sa.Integer()),
+)
+
+def upgrade():
+    op.create_table(
+        'transcripts',
+        sa.Column('video_id', sa.Integer(), primary_key=True),
+        sa.Column('segments', sa.LargeBinary(), nullable=False),
+        sa.Column('segment_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(['video_id'], ['videos.id'], ondelete='CASCADE'),
+    )
+
+    # Existing transcripts have no segment timing; keep each as a single segment
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.select(videos.c.id, videos.c.subtitles_text).where(videos.c.subtitles_text.isnot(None))
+    ).all()
+    if rows:
+        op.bulk_insert(transcripts, [
+            {
+                'video_id': row.id,
+                'segments': encode_segments([{'start': 0.0, 'end': 0.0, 'text': row.subtitles_text}]),
+                'segment_count': 1
+            }
+            for row in rows
+        ])
+
+    op.drop_column('videos', 'subtitles_text')
+
+def downgrade():
+    op.add_column('videos', sa.Column('subtitles_text', sa.Text(), nullable=True))
+
+    bind = op.get_bind()
+    for row in bind.execute(sa.select(transcripts.c.video_id, transcripts.c.segments)).all():
+        bind.execute(
+            videos.update().where(videos.c.id == row.video_id).values(
+                subtitles_text=transcript_text(decode_segments(row.segments))
+            )
+        )
+
+    op.drop_table('transcripts')
@@ -0,0 +1,66 @@
+"""Full-text search over transcripts
+
+Revision ID: 009
+Create Date: 2026-10-19 16:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+from services.transcripts import decode_segments, transcript_text
+from services.transcript_search import SEARCH_CONFIG
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+transcripts = sa.table(
+    'transcripts',
+    sa.column('video_id', sa.Integer()),
+    sa.column('segments', sa.LargeBinary()),
+)
+
+def upgrade():
+    bind = op.get_bind()
+    rows = bind.execute(sa.select(transcripts.c.video_id, transcripts.c.segments)).all()
+
+    if bind.dialect.name == 'postgresql':
+        op.add_column('transcripts', sa.Column('search_vector', TSVECTOR(), nullable=True))
+        op.create_index(
+            'ix_transcripts_search_vector',
+            'transcripts',
+            ['search_vector'],
+            postgresql_using='gin'
+        )
+        for row in rows:
+            bind.execute(
+                sa.text(
+                    'UPDATE transcripts SET search_vector = to_tsvector(:config, :content) '
+                    'WHERE video_id = :video_id'
+                ),
+                {
+                    'config': SEARCH_CONFIG,
+                    'content': transcript_text(decode_segments(row.segments)),
+                    'video_id': row.video_id
+                }
+            )
+    else:
+        op.add_column('transcripts', sa.Column('search_vector', sa.Text(), nullable=True))
+        op.execute("CREATE VIRTUAL TABLE transcripts_fts USING fts5(content, tokenize='porter')")
+        for row in rows:
+            bind.execute(
+                sa.text('INSERT INTO transcripts_fts (rowid, content) VALUES (:video_id, :content)'),
+                {
+                    'content': transcript_text(decode_segments(row.segments)),
+                    'video_id': row.video_id
+                }
+            )
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_transcripts_search_vector', table_name='transcripts')
+    else:
+        op.execute('DROP TABLE transcripts_fts')
+    op.drop_column('transcripts', 'search_vector')
@@ -0,0 +1,39 @@
+"""Record per-stage processing events
+
+Revision ID: 010
+Create Date: 2026-10-19 17:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'processing_logs',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('video_id', sa.Integer(), nullable=False),
+        sa.Column('step', sa.String(100), nullable=False),
+        sa.Column('status', sa.String(50), nullable=False),
+        sa.Column('duration', sa.Float(), nullable=True),
+        sa.Column('cpu_time', sa.Float(), nullable=True),
+        sa.Column('memory_rss', sa.BigInteger(), nullable=True),
+        sa.Column('message', sa.Text()),
+        sa.Column('created_at', sa.DateTime()),
+        sa.ForeignKeyConstraint(['video_id'], ['videos.id'], ondelete='CASCADE'),
+    )
+    op.create_index('ix_processing_logs_video_id_created_at', 'processing_logs', ['video_id', 'created_at'])
+    op.create_index(
+        'ix_processing_logs_step_status_created_at',
+        'processing_logs',
+        ['step', 'status', 'created_at']
+    )
+
+def downgrade():
+    op.drop_index('ix_processing_logs_step_status_created_at', table_name='processing_logs')
+    op.drop_index('ix_processing_logs_video_id_created_at', table_name='processing_logs')
+    op.drop_table('processing_logs')
@@ -0,0 +1,30 @@
+"""Persist daily metrics reports
+
+Revision ID: 011
+Create Date: 2026-10-19 18:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'daily_metrics_reports',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('report_date', sa.Date(), nullable=False),
+        sa.Column('processing_metrics', sa.JSON(), nullable=False),
+        sa.Column('api_metrics', sa.JSON(), nullable=False),
+        sa.Column('storage_metrics', sa.JSON(), nullable=False),
+        sa.Column('queue_wait_metrics', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('updated_at', sa.DateTime()),
+        sa.UniqueConstraint('report_date', name='uq_daily_metrics_reports_report_date'),
+    )
+
+def downgrade():
+    op.drop_table('daily_metrics_reports')
@@ -0,0 +1,70 @@
+"""Stamp video updates with the database clock and record deletions
+
+Revision ID: 012
+Create Date: 2026-10-20 09:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'video_tombstones',
+        sa.Column('video_id', sa.Integer(), primary_key=True),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_video_tombstones_deleted_at', 'video_tombstones', ['deleted_at'])
+
+    if op.get_bind().dialect.name == 'postgresql':
+        # API and worker hosts all write videos; take updated_at from one clock,
+        # read when the row is written rather than when its transaction began
+        op.execute('''
+            CREATE FUNCTION videos_touch_updated_at() RETURNS trigger AS $$
+            BEGIN
+                NEW.updated_at := timezone('utc', clock_timestamp());
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        ''')
+        op.execute('''
+            CREATE TRIGGER videos_touch_updated_at BEFORE INSERT OR UPDATE ON videos
+            FOR EACH ROW EXECUTE FUNCTION videos_touch_updated_at()
+        ''')
+        op.execute('''
+            CREATE FUNCTION videos_record_tombstone() RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO video_tombstones (video_id, deleted_at)
+                VALUES (OLD.id, timezone('utc', clock_timestamp()))
+                ON CONFLICT (video_id) DO UPDATE SET deleted_at = EXCLUDED.deleted_at;
+                RETURN OLD;
+            END
+            $$ LANGUAGE plpgsql
+        ''')
+        op.execute('''
+            CREATE TRIGGER videos_record_tombstone AFTER DELETE ON videos
+            FOR EACH ROW EXECUTE FUNCTION videos_record_tombstone()
+        ''')
+    else:
+        op.execute('''
+            CREATE TRIGGER videos_record_tombstone AFTER DELETE ON videos
+            BEGIN
+                INSERT OR REPLACE INTO video_tombstones (video_id, deleted_at)
+                VALUES (OLD.id, strftime('%Y-%m-%d %H:%M:%f', 'now'));
+            END
+        ''')
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('DROP TRIGGER videos_record_tombstone ON videos')
+        op.execute('DROP FUNCTION videos_record_tombstone()')
+        op.execute('DROP TRIGGER videos_touch_updated_at ON videos')
+        op.execute('DROP FUNCTION videos_touch_updated_at()')
+    else:
+        op.execute('DROP TRIGGER videos_record_tombstone')
+    op.drop_index('ix_video_tombstones_deleted_at', table_name='video_tombstones')
+    op.drop_table('video_tombstones')
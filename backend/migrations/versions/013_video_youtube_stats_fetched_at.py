@@ -0,0 +1,65 @@
+"""Track the latest YouTube stats snapshot on videos
+
+Revision ID: 013
+Create Date: 2026-10-20 12:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('videos', sa.Column('youtube_stats_fetched_at', sa.DateTime(), nullable=True))
+    op.execute('''
+        UPDATE videos SET youtube_stats_fetched_at = (
+            SELECT MAX(fetched_at) FROM youtube_stats_snapshots
+            WHERE youtube_stats_snapshots.video_id = videos.id
+        )
+        WHERE youtube_url IS NOT NULL
+    ''')
+
+    # Uploaded videos due a YouTube stats refresh
+    op.create_index(
+        'ix_videos_youtube_stats_fetched_at',
+        'videos',
+        ['youtube_stats_fetched_at'],
+        postgresql_where=sa.text('youtube_url IS NOT NULL'),
+        sqlite_where=sa.text('youtube_url IS NOT NULL')
+    )
+
+    # Pruning snapshots past the retention window
+    op.create_index('ix_youtube_stats_snapshots_fetched_at', 'youtube_stats_snapshots', ['fetched_at'])
+
+    if op.get_bind().dialect.name == 'postgresql':
+        # Refresh bookkeeping is not a change delta polls need to see
+        op.execute('''
+            CREATE OR REPLACE FUNCTION videos_touch_updated_at() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'UPDATE' AND to_jsonb(NEW) - 'youtube_stats_fetched_at' - 'updated_at'
+                        = to_jsonb(OLD) - 'youtube_stats_fetched_at' - 'updated_at' THEN
+                    NEW.updated_at := OLD.updated_at;
+                ELSE
+                    NEW.updated_at := timezone('utc', clock_timestamp());
+                END IF;
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        ''')
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('''
+            CREATE OR REPLACE FUNCTION videos_touch_updated_at() RETURNS trigger AS $$
+            BEGIN
+                NEW.updated_at := timezone('utc', clock_timestamp());
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        ''')
+    op.drop_index('ix_youtube_stats_snapshots_fetched_at', table_name='youtube_stats_snapshots')
+    op.drop_index('ix_videos_youtube_stats_fetched_at', table_name='videos')
+    op.drop_column('videos', 'youtube_stats_fetched_at')
@@ -0,0 +1,85 @@
+"""Count videos per status in a trigger-maintained table
+
+Revision ID: 014
+Create Date: 2026-10-20 15:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '014'
+down_revision = '013'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'video_status_counts',
+        sa.Column('status', sa.String(), primary_key=True),
+        sa.Column('count', sa.BigInteger(), nullable=False),
+    )
+
+    if op.get_bind().dialect.name == 'postgresql':
+        # Keep other writers out until the triggers exist, so the backfill is exact
+        op.execute('LOCK TABLE videos IN SHARE ROW EXCLUSIVE MODE')
+        op.execute('''
+            CREATE FUNCTION videos_count_status() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'UPDATE' AND NEW.status IS NOT DISTINCT FROM OLD.status THEN
+                    RETURN NULL;
+                END IF;
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    UPDATE video_status_counts SET count = count - 1
+                    WHERE status = COALESCE(OLD.status, '');
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    INSERT INTO video_status_counts (status, count)
+                    VALUES (COALESCE(NEW.status, ''), 1)
+                    ON CONFLICT (status) DO UPDATE SET count = video_status_counts.count + 1;
+                END IF;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        ''')
+        op.execute('''
+            CREATE TRIGGER videos_count_status AFTER INSERT OR DELETE OR UPDATE OF status ON videos
+            FOR EACH ROW EXECUTE FUNCTION videos_count_status()
+        ''')
+    else:
+        op.execute('''
+            CREATE TRIGGER videos_count_status_insert AFTER INSERT ON videos
+            BEGIN
+                INSERT INTO video_status_counts (status, count) VALUES (COALESCE(NEW.status, ''), 1)
+                ON CONFLICT (status) DO UPDATE SET count = count + 1;
+            END
+        ''')
+        op.execute('''
+            CREATE TRIGGER videos_count_status_update AFTER UPDATE OF status ON videos
+            WHEN NEW.status IS NOT OLD.status
+            BEGIN
+                UPDATE video_status_counts SET count = count - 1 WHERE status = COALESCE(OLD.status, '');
+                INSERT INTO video_status_counts (status, count) VALUES (COALESCE(NEW.status, ''), 1)
+                ON CONFLICT (status) DO UPDATE SET count = count + 1;
+            END
+        ''')
+        op.execute('''
+            CREATE TRIGGER videos_count_status_delete AFTER DELETE ON videos
+            BEGIN
+                UPDATE video_status_counts SET count = count - 1 WHERE status = COALESCE(OLD.status, '');
+            END
+        ''')
+
+    op.execute('''
+        INSERT INTO video_status_counts (status, count)
+        SELECT COALESCE(status, ''), COUNT(*) FROM videos GROUP BY COALESCE(status, '')
+    ''')
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('DROP TRIGGER videos_count_status ON videos')
+        op.execute('DROP FUNCTION videos_count_status()')
+    else:
+        op.execute('DROP TRIGGER videos_count_status_delete')
+        op.execute('DROP TRIGGER videos_count_status_update')
+        op.execute('DROP TRIGGER videos_count_status_insert')
+    op.drop_table('video_status_counts')
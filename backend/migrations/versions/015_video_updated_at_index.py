@@ -0,0 +1,20 @@
+"""Index updated_at alone now that delta polls span every status
+
+Revision ID: 015
+Create Date: 2026-10-21 09:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '015'
+down_revision = '014'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index('ix_videos_updated_at', 'videos', ['updated_at'])
+    op.drop_index('ix_videos_status_updated_at', table_name='videos')
+
+def downgrade():
+    op.create_index('ix_videos_status_updated_at', 'videos', ['status', 'updated_at'])
+    op.drop_index('ix_videos_updated_at', table_name='videos')
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, BigInteger, Float, String, Boolean, ForeignKey, Date, DateTime, LargeBinary, Text, Index, JSON, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -15,12 +16,44 @@ class Video(Base):
     has_subtitles = Column(Boolean, default=False)
     status = Column(String)  # 'uploaded', 'processing', 'processed', 'failed'
     created_at = Column(DateTime, default=datetime.utcnow)
+    # On PostgreSQL a trigger (migration 012) overwrites this with the database clock
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    processing_started_at = Column(DateTime, nullable=True)
+    processing_finished_at = Column(DateTime, nullable=True)
     niche_id = Column(Integer, ForeignKey("niches.id"), nullable=True)
     youtube_url = Column(String, nullable=True)
-    subtitles_text = Column(Text, nullable=True)
+    youtube_uploaded_at = Column(DateTime, nullable=True)
+    # fetched_at of the latest youtube_stats_snapshots row, so refresh scheduling skips the history
+    youtube_stats_fetched_at = Column(DateTime, nullable=True)
 
     niche = relationship("Niche", back_populates="videos")
 
+    __table_args__ = (
+        # Listing and counting by status, newest first
+        Index("ix_videos_status_created_at", "status", "created_at", "id"),
+        # Delta polling, which also reports videos that left "processed"
+        Index("ix_videos_updated_at", "updated_at"),
+        # Recent videos and processing history range scans
+        Index("ix_videos_created_at", "created_at"),
+        Index("ix_videos_niche_id", "niche_id"),
+        # Processing time aggregates over recently finished jobs
+        Index("ix_videos_processing_finished_at", "processing_finished_at"),
+        # Successful uploads per niche
+        Index(
+            "ix_videos_niche_id_uploaded",
+            "niche_id",
+            postgresql_where=text("youtube_url IS NOT NULL"),
+            sqlite_where=text("youtube_url IS NOT NULL")
+        ),
+        # Uploaded videos due a YouTube stats refresh
+        Index(
+            "ix_videos_youtube_stats_fetched_at",
+            "youtube_stats_fetched_at",
+            postgresql_where=text("youtube_url IS NOT NULL"),
+            sqlite_where=text("youtube_url IS NOT NULL")
+        ),
+    )
+
 class Niche(Base):
     __tablename__ = "niches"
 
@@ -30,3 +63,94 @@ class Niche(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     videos = relationship("Video", back_populates="niche")
+
+class VideoTombstone(Base):
+    """A deleted video, kept so delta polls of the listing can report the deletion."""
+    __tablename__ = "video_tombstones"
+
+    video_id = Column(Integer, primary_key=True)  # written by a trigger on videos (migration 012)
+    deleted_at = Column(DateTime, nullable=False, index=True)
+
+class VideoStatusCount(Base):
+    """Number of videos per status, kept by triggers on videos (migration 014)."""
+    __tablename__ = "video_status_counts"
+
+    status = Column(String, primary_key=True)  # '' for videos without a status
+    count = Column(BigInteger, nullable=False, default=0)
+
+class NicheStats(Base):
+    """Per-niche counters maintained alongside video writes; rebuilt by tasks.rebuild_niche_stats."""
+    __tablename__ = "niche_stats"
+
+    niche_id = Column(Integer, ForeignKey("niches.id", ondelete="CASCADE"), primary_key=True)
+    total_videos = Column(Integer, nullable=False, default=0)
+    successful_uploads = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    niche = relationship("Niche")
+
+class YouTubeStatsSnapshot(Base):
+    """Point-in-time YouTube view/like counts for an uploaded video."""
+    __tablename__ = "youtube_stats_snapshots"
+
+    id = Column(Integer, primary_key=True)
+    video_id = Column(Integer, ForeignKey("videos.id", ondelete="CASCADE"), nullable=False)
+    views = Column(BigInteger, nullable=True)
+    likes = Column(BigInteger, nullable=True)
+    fetched_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # Latest snapshot per video
+        Index("ix_youtube_stats_snapshots_video_id_fetched_at", "video_id", "fetched_at"),
+        # Pruning snapshots past the retention window
+        Index("ix_youtube_stats_snapshots_fetched_at", "fetched_at"),
+    )
+
+class Transcript(Base):
+    """Whisper segments for a video, kept off the videos table and loaded on demand."""
+    __tablename__ = "transcripts"
+
+    video_id = Column(Integer, ForeignKey("videos.id", ondelete="CASCADE"), primary_key=True)
+    segments = Column(LargeBinary, nullable=False)  # see services.transcripts.encode_segments
+    segment_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # Postgres full-text index of the transcript; SQLite uses the transcripts_fts table instead
+    search_vector = Column(TSVECTOR().with_variant(Text(), "sqlite"), nullable=True)
+
+    __table_args__ = (
+        Index("ix_transcripts_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
+class ProcessingLog(Base):
+    """One start/completion/failure event of a processing stage."""
+    __tablename__ = "processing_logs"
+
+    id = Column(Integer, primary_key=True)
+    video_id = Column(Integer, ForeignKey("videos.id", ondelete="CASCADE"), nullable=False)
+    step = Column(String(100), nullable=False)
+    status = Column(String(50), nullable=False)  # 'started', 'completed', 'failed'
+    duration = Column(Float, nullable=True)  # seconds, on completion or failure
+    cpu_time = Column(Float, nullable=True)  # process CPU seconds spent in the stage
+    memory_rss = Column(BigInteger, nullable=True)  # worker resident memory in bytes
+    message = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Timeline of one video
+        Index("ix_processing_logs_video_id_created_at", "video_id", "created_at"),
+        # Stage latency percentiles
+        Index("ix_processing_logs_step_status_created_at", "step", "status", "created_at"),
+    )
+
+class DailyMetricsReport(Base):
+    """Daily rollup of the Redis metrics, kept after the Redis tiers expire."""
+    __tablename__ = "daily_metrics_reports"
+
+    id = Column(Integer, primary_key=True)
+    report_date = Column(Date, nullable=False, unique=True)
+    processing_metrics = Column(JSON, nullable=False)
+    api_metrics = Column(JSON, nullable=False)
+    storage_metrics = Column(JSON, nullable=False)
+    queue_wait_metrics = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
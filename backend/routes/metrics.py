@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response
+from starlette.concurrency import run_in_threadpool
+from utils.prometheus import exposition
+
+router = APIRouter()
+
+@router.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus scrape endpoint, aggregated across all API worker processes."""
+    body, content_type = await run_in_threadpool(exposition)
+    return Response(content=body, headers={"Content-Type": content_type})
@@ -0,0 +1,45 @@
+import secrets
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+from config import settings
+from utils.profiler import profiler_control
+
+async def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """Reject callers without the shared PROFILER_ADMIN_TOKEN; all of them if none is set."""
+    expected = settings.PROFILER_ADMIN_TOKEN
+    if not expected or not x_admin_token or not secrets.compare_digest(x_admin_token.encode(), expected.encode()):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+# Only mounted when PROFILER_ENABLED is set (see main.py)
+router = APIRouter(dependencies=[Depends(require_admin_token)])
+
+@router.get("/api/admin/profiler/processes")
+async def list_profilable_processes():
+    """API and worker processes that can currently be profiled."""
+    return {"processes": await run_in_threadpool(profiler_control.processes)}
+
+@router.post("/api/admin/profiler/{process}/start")
+async def start_profiler(
+    process: str,
+    duration: float = Query(30.0, gt=0),
+    interval: float = Query(0.01, ge=0.001, le=1.0)
+):
+    """Profile a named process for a bounded time; fetch the result from /profile afterwards."""
+    processes = await run_in_threadpool(profiler_control.processes)
+    if process not in {entry["process"] for entry in processes}:
+        raise HTTPException(status_code=404, detail="Process not found")
+    return await run_in_threadpool(profiler_control.request, process, duration, interval)
+
+@router.get("/api/admin/profiler/{process}/profile", response_class=PlainTextResponse)
+async def get_profile(process: str):
+    """Latest collapsed-stack profile of a process, ready for flamegraph.pl or speedscope."""
+    result = await run_in_threadpool(profiler_control.result, process)
+    if result is None:
+        raise HTTPException(status_code=404, detail="No profile recorded for this process")
+    return PlainTextResponse(result["collapsed"], headers={
+        "X-Profile-Samples": str(result["samples"]),
+        "X-Profile-Started-At": str(result["startedAt"]),
+        "X-Profile-Finished-At": str(result["finishedAt"])
+    })
@@ -0,0 +1,60 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import Optional
+from database import get_read_db, async_engine
+from models import Transcript
+from services.transcripts import decode_segments
+from services.transcript_search import postgres_search_query, sqlite_search_query, matching_segments
+from utils.pagination import encode_cursor, decode_cursor
+
+router = APIRouter()
+
+@router.get("/api/transcripts/search")
+async def search_transcripts(
+    q: str = Query(..., min_length=1, max_length=200),
+    niche_id: Optional[int] = None,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Find videos by what is said in them, best match first."""
+    after = None
+    if cursor:
+        try:
+            rank, video_id = decode_cursor(cursor)
+            after = (float(rank), int(video_id))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    build_query = postgres_search_query if async_engine.dialect.name == "postgresql" else sqlite_search_query
+    rows = (await db.execute(build_query(q, niche_id, status, after, limit))).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(repr(rows[-1].rank), rows[-1].id) if has_more else None
+
+    # Segment timings for the page only, to point at where the terms were said
+    transcripts = {
+        transcript.video_id: transcript
+        for transcript in (await db.scalars(
+            select(Transcript).where(Transcript.video_id.in_([row.id for row in rows]))
+        )).all()
+    } if rows else {}
+
+    return {
+        "items": [
+            {
+                "id": row.id,
+                "title": row.title,
+                "status": row.status,
+                "nicheId": row.niche_id,
+                "rank": row.rank,
+                "matches": matching_segments(decode_segments(transcripts[row.id].segments), q)
+                if row.id in transcripts else []
+            }
+            for row in rows
+        ],
+        "nextCursor": next_cursor
+    }
@@ -1,129 +1,168 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from database import get_db
-from models import Video, Niche
-from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy import func, select, case, tuple_
+from database import get_read_db
+from models import Video, VideoStatusCount, Niche, NicheStats, YouTubeStatsSnapshot, ProcessingLog, DailyMetricsReport
+from datetime import date, datetime, timedelta
 from typing import List
-from services.youtube_uploader import YouTubeUploader
+from utils.cache import cache_key
+from utils.metrics import metrics_collector
+from utils.tiered_cache import response_cache
 
 router = APIRouter()
 
+STATS_CACHE_TTL = 30  # seconds
+MAX_METRICS_DAYS = 31  # day rollups are kept this long
+
 @router.get("/api/stats")
-async def get_dashboard_stats(db: Session = Depends(get_db)):
-    """Get overall statistics for the dashboard."""
-    total_videos = db.query(func.count(Video.id)).scalar()
-    processed_videos = db.query(func.count(Video.id)).filter(
-        Video.status == "processed"
-    ).scalar()
-    total_niches = db.query(func.count(Niche.id)).scalar()
-    
-    # Calculate average processing time
-    processed_videos_with_time = db.query(Video).filter(
-        Video.status == "processed"
-    ).all()
-    
-    total_processing_time = 0
-    video_count = 0
-    
-    for video in processed_videos_with_time:
-        if video.created_at:
-            processing_time = (datetime.utcnow() - video.created_at).total_seconds()
-            total_processing_time += processing_time
-            video_count += 1
-    
-    avg_processing_time = (
-        total_processing_time / video_count if video_count > 0 else 0
+async def get_dashboard_stats(days: int = 30, db: AsyncSession = Depends(get_read_db)):
+    """Get overall statistics for the dashboard.
+
+    Processing times cover videos that finished processing in the last `days` days.
+    """
+    return await response_cache.get_or_set(
+        cache_key("stats:dashboard", days=days),
+        lambda: _dashboard_stats(db, days),
+        STATS_CACHE_TTL,
+        tags=("videos", "niches")
     )
+
+async def _dashboard_stats(db: AsyncSession, days: int):
+    # One row per status, so this stays constant-time however many videos there are
+    status_counts = dict((await db.execute(
+        select(VideoStatusCount.status, VideoStatusCount.count)
+    )).all())
+    total_niches = await db.scalar(select(func.count(Niche.id)))
+
+    processing_time = func.extract(
+        'epoch', Video.processing_finished_at - Video.processing_started_at
+    )
+    timings = (await db.execute(
+        select(
+            func.avg(processing_time).label('average'),
+            func.percentile_cont(0.5).within_group(processing_time).label('median'),
+            func.percentile_cont(0.95).within_group(processing_time).label('p95')
+        ).where(
+            Video.status == "processed",
+            Video.processing_started_at.isnot(None),
+            Video.processing_finished_at >= datetime.utcnow() - timedelta(days=days)
+        )
+    )).one()
     
     return {
-        "totalVideos": total_videos,
-        "processedVideos": processed_videos,
+        "totalVideos": sum(status_counts.values()),
+        "processedVideos": status_counts.get("processed", 0),
         "totalNiches": total_niches,
-        "averageProcessingTime": round(avg_processing_time, 2)
+        "averageProcessingTime": round(float(timings.average or 0), 2),
+        "medianProcessingTime": round(float(timings.median or 0), 2),
+        "p95ProcessingTime": round(float(timings.p95 or 0), 2)
     }
 
 @router.get("/api/videos/recent")
-async def get_recent_videos(db: Session = Depends(get_db)):
-    """Get recent videos with their stats."""
-    videos = db.query(Video).order_by(Video.created_at.desc()).limit(10).all()
-    
-    # Initialize YouTube API client
-    youtube = YouTubeUploader()
+async def get_recent_videos(db: AsyncSession = Depends(get_read_db)):
+    """Get recent videos with their latest stored YouTube stats."""
+    return await response_cache.get_or_set(
+        cache_key("stats:recent_videos"),
+        lambda: _recent_videos(db),
+        STATS_CACHE_TTL,
+        tags=("videos",)
+    )
+
+async def _recent_videos(db: AsyncSession):
+    videos = (await db.scalars(
+        select(Video)
+        .options(joinedload(Video.niche))
+        .order_by(Video.created_at.desc())
+        .limit(10)
+    )).all()
+
+    # Latest stored snapshot for each uploaded video
+    fetched = {
+        (video.id, video.youtube_stats_fetched_at)
+        for video in videos if video.youtube_url and video.youtube_stats_fetched_at
+    }
+    snapshots = {
+        snapshot.video_id: snapshot
+        for snapshot in (await db.scalars(
+            select(YouTubeStatsSnapshot).where(
+                tuple_(YouTubeStatsSnapshot.video_id, YouTubeStatsSnapshot.fetched_at).in_(fetched)
+            )
+        )).all()
+    } if fetched else {}
     
     video_stats = []
     for video in videos:
-        stats = {
+        snapshot = snapshots.get(video.id)
+        video_stats.append({
             "id": video.id,
             "title": video.title,
             "status": video.status,
             "niche": video.niche.name if video.niche else "Uncategorized",
             "youtubeUrl": video.youtube_url,
             "processedAt": video.created_at.isoformat(),
-            "views": None,
-            "likes": None
-        }
-        
-        # If video is uploaded to YouTube, fetch its statistics
-        if video.youtube_url and youtube.youtube:
-            try:
-                video_id = video.youtube_url.split("/")[-1]
-                response = youtube.youtube.videos().list(
-                    part="statistics",
-                    id=video_id
-                ).execute()
-                
-                if response["items"]:
-                    statistics = response["items"][0]["statistics"]
-                    stats["views"] = int(statistics.get("viewCount", 0))
-                    stats["likes"] = int(statistics.get("likeCount", 0))
-            except Exception as e:
-                print(f"Error fetching YouTube stats for video {video.id}: {e}")
-        
-        video_stats.append(stats)
+            "views": snapshot.views if snapshot else None,
+            "likes": snapshot.likes if snapshot else None
+        })
     
     return video_stats
 
 @router.get("/api/stats/niche-performance")
-async def get_niche_performance(db: Session = Depends(get_db)):
-    """Get performance statistics by niche."""
-    niches = db.query(Niche).all()
+async def get_niche_performance(db: AsyncSession = Depends(get_read_db)):
+    """Get performance statistics by niche from the niche_stats rollup."""
+    return await response_cache.get_or_set(
+        cache_key("stats:niche_performance"),
+        lambda: _niche_performance(db),
+        STATS_CACHE_TTL,
+        tags=("videos", "niches")
+    )
+
+async def _niche_performance(db: AsyncSession):
+    rows = (await db.execute(
+        select(
+            Niche.name,
+            func.coalesce(NicheStats.total_videos, 0).label('total_videos'),
+            func.coalesce(NicheStats.successful_uploads, 0).label('successful_uploads')
+        ).outerjoin(NicheStats, NicheStats.niche_id == Niche.id)
+    )).all()
     
     niche_stats = []
-    for niche in niches:
-        total_videos = db.query(func.count(Video.id)).filter(
-            Video.niche_id == niche.id
-        ).scalar()
-        
-        successful_uploads = db.query(func.count(Video.id)).filter(
-            Video.niche_id == niche.id,
-            Video.youtube_url.isnot(None)
-        ).scalar()
-        
-        success_rate = (successful_uploads / total_videos * 100) if total_videos > 0 else 0
+    for row in rows:
+        success_rate = (row.successful_uploads / row.total_videos * 100) if row.total_videos > 0 else 0
         
         niche_stats.append({
-            "nicheName": niche.name,
-            "totalVideos": total_videos,
-            "successfulUploads": successful_uploads,
+            "nicheName": row.name,
+            "totalVideos": row.total_videos,
+            "successfulUploads": row.successful_uploads,
             "successRate": round(success_rate, 2)
         })
     
     return niche_stats
 
 @router.get("/api/stats/processing-history")
-async def get_processing_history(days: int = 7, db: Session = Depends(get_db)):
+async def get_processing_history(days: int = 7, db: AsyncSession = Depends(get_read_db)):
     """Get video processing history over time."""
+    return await response_cache.get_or_set(
+        cache_key("stats:processing_history", days=days),
+        lambda: _processing_history(db, days),
+        STATS_CACHE_TTL,
+        tags=("videos",)
+    )
+
+async def _processing_history(db: AsyncSession, days: int):
     start_date = datetime.utcnow() - timedelta(days=days)
     
-    videos = db.query(
-        func.date(Video.created_at).label('date'),
-        func.count(Video.id).label('count')
-    ).filter(
-        Video.created_at >= start_date
-    ).group_by(
-        func.date(Video.created_at)
-    ).all()
+    videos = (await db.execute(
+        select(
+            func.date(Video.created_at).label('date'),
+            func.count(Video.id).label('count')
+        ).where(
+            Video.created_at >= start_date
+        ).group_by(
+            func.date(Video.created_at)
+        )
+    )).all()
     
     history = [
         {
@@ -133,4 +172,111 @@ async def get_processing_history(days: int = 7, db: Session = Depends(get_db)):
         for video in videos
     ]
     
-    return history
\ No newline at end of file
+    return history
+
+@router.get("/api/videos/{video_id}/timeline")
+async def get_video_timeline(video_id: int, db: AsyncSession = Depends(get_read_db)):
+    """Get the recorded processing stage events for one video."""
+    events = (await db.scalars(
+        select(ProcessingLog).where(
+            ProcessingLog.video_id == video_id
+        ).order_by(
+            ProcessingLog.created_at, ProcessingLog.id
+        )
+    )).all()
+
+    if not events and not await db.get(Video, video_id):
+        raise HTTPException(status_code=404, detail="Video not found")
+
+    return [
+        {
+            "step": event.step,
+            "status": event.status,
+            "duration": event.duration,
+            "cpuTime": event.cpu_time,
+            "memoryRss": event.memory_rss,
+            "message": event.message,
+            "timestamp": event.created_at.isoformat()
+        }
+        for event in events
+    ]
+
+@router.get("/api/stats/stages")
+async def get_stage_latencies(days: int = 7, db: AsyncSession = Depends(get_read_db)):
+    """Get latency percentiles and failure counts per processing stage."""
+    start_date = datetime.utcnow() - timedelta(days=days)
+    # Latencies of successful runs only; failures often abort early and would pull them down
+    completed_duration = case((ProcessingLog.status == "completed", ProcessingLog.duration))
+
+    stages = (await db.execute(
+        select(
+            ProcessingLog.step,
+            func.count(ProcessingLog.id).filter(ProcessingLog.status == "completed").label('completed'),
+            func.count(ProcessingLog.id).filter(ProcessingLog.status == "failed").label('failed'),
+            func.avg(completed_duration).label('average'),
+            func.percentile_cont(0.5).within_group(completed_duration).label('p50'),
+            func.percentile_cont(0.95).within_group(completed_duration).label('p95'),
+            func.percentile_cont(0.99).within_group(completed_duration).label('p99')
+        ).where(
+            ProcessingLog.status.in_(["completed", "failed"]),
+            ProcessingLog.created_at >= start_date
+        ).group_by(
+            ProcessingLog.step
+        )
+    )).all()
+
+    return [
+        {
+            "step": stage.step,
+            "completed": stage.completed,
+            "failed": stage.failed,
+            "averageDuration": round(float(stage.average or 0), 3),
+            "p50Duration": round(float(stage.p50 or 0), 3),
+            "p95Duration": round(float(stage.p95 or 0), 3),
+            "p99Duration": round(float(stage.p99 or 0), 3)
+        }
+        for stage in stages
+    ]
+
+@router.get("/api/stats/cache")
+async def get_cache_stats():
+    """Get response cache hit/miss counters for this API process."""
+    return response_cache.stats()
+
+@router.get("/api/stats/metrics")
+async def get_collected_metrics(days: int = 7):
+    """Get processing, API, storage and queue-wait metrics over the last `days` days."""
+    days = max(1, min(days, MAX_METRICS_DAYS))
+    return await response_cache.get_or_set(
+        cache_key("stats:metrics", days=days),
+        lambda: run_in_threadpool(_collected_metrics, days),
+        STATS_CACHE_TTL
+    )
+
+def _collected_metrics(days: int):
+    return {
+        "processing": metrics_collector.get_processing_metrics(days),
+        "api": metrics_collector.get_api_metrics(days),
+        "storage": metrics_collector.get_storage_metrics(days),
+        "queueWait": metrics_collector.get_queue_wait_metrics(days)
+    }
+
+@router.get("/api/stats/daily-reports")
+async def get_daily_reports(days: int = 30, db: AsyncSession = Depends(get_read_db)):
+    """Get the persisted daily metrics reports of the last `days` days, newest first."""
+    reports = (await db.execute(
+        select(DailyMetricsReport).where(
+            DailyMetricsReport.report_date >= date.today() - timedelta(days=days)
+        ).order_by(DailyMetricsReport.report_date.desc())
+    )).scalars().all()
+
+    return [
+        {
+            "date": report.report_date.isoformat(),
+            "processing": report.processing_metrics,
+            "api": report.api_metrics,
+            "storage": report.storage_metrics,
+            "queueWait": report.queue_wait_metrics
+        }
+        for report in reports
+    ]
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, HTTPException
+from starlette.concurrency import run_in_threadpool
+from utils.tracing import tracer, critical_path
+
+router = APIRouter()
+
+@router.get("/api/videos/{video_id}/trace")
+async def get_video_trace(video_id: int):
+    """Critical path of the trace from a video's upload through processing and YouTube upload."""
+    spans = await run_in_threadpool(tracer.video_trace, video_id)
+    if not spans:
+        raise HTTPException(status_code=404, detail="No trace recorded for this video")
+
+    start = min(span["start"] for span in spans)
+    end = max(span["end"] for span in spans)
+    path = critical_path(spans)
+    by_name = {}
+    for segment in path:
+        by_name[segment["name"]] = by_name.get(segment["name"], 0) + segment["durationMs"]
+
+    return {
+        "videoId": video_id,
+        "traceId": spans[0]["traceId"],
+        "durationMs": (end - start) * 1000,
+        "spanCount": len(spans),
+        "criticalPath": path,
+        "criticalPathByName": dict(sorted(by_name.items(), key=lambda item: item[1], reverse=True)),
+        "errors": [
+            {"name": span["name"], "error": span["attributes"].get("error") or span["attributes"].get("state")}
+            for span in spans if span["status"] == "error"
+        ]
+    }
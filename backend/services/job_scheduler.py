@@ -0,0 +1,246 @@
+import threading
+import time
+from typing import Callable, Dict, Any, List, Optional
+import ffmpeg
+from redis import Redis
+from utils.logging_config import CustomLogger, video_logger
+from utils.metrics import MetricsCollector, metrics_collector
+from utils.prometheus import QUEUE_WAIT_SECONDS
+from utils.tracing import tracer
+
+# Reclaim in-flight jobs whose lease went stale (their worker died) and put
+# them back in the pending set at their original deadline, or give them up
+# after `max_attempts` dispatches. Jobs no worker has started yet have no
+# heartbeat, so they are only reclaimed once their dispatch went stale.
+# Returns the IDs of jobs given up.
+# KEYS[1] = pending, KEYS[2] = in flight, KEYS[3] = dispatched but not started
+# ARGV = lease cutoff, max_attempts, job key prefix, dispatch cutoff
+_RECLAIM_SCRIPT = """
+local abandoned = {}
+for _, video_id in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])) do
+    local dispatched_at = redis.call('ZSCORE', KEYS[3], video_id)
+    if not dispatched_at or tonumber(dispatched_at) <= tonumber(ARGV[4]) then
+        redis.call('ZREM', KEYS[2], video_id)
+        redis.call('ZREM', KEYS[3], video_id)
+        local job_key = ARGV[3] .. video_id
+        if redis.call('HINCRBY', job_key, 'attempts', 1) < tonumber(ARGV[2]) then
+            redis.call('ZADD', KEYS[1], redis.call('HGET', job_key, 'score') or 0, video_id)
+        else
+            redis.call('DEL', job_key)
+            table.insert(abandoned, video_id)
+        end
+    end
+end
+return abandoned
+"""
+
+# Move the most urgent pending job into the in-flight set if there is capacity
+# left, and note it as dispatched until a worker starts it.
+_DISPATCH_SCRIPT = """
+if redis.call('ZCARD', KEYS[2]) >= tonumber(ARGV[2]) then
+    return nil
+end
+local job = redis.call('ZPOPMIN', KEYS[1])
+if #job == 0 then
+    return nil
+end
+redis.call('ZADD', KEYS[2], ARGV[1], job[1])
+redis.call('ZADD', KEYS[3], ARGV[1], job[1])
+return job[1]
+"""
+
+class JobScheduler:
+    """Duration- and source-aware dispatcher in front of the Celery processing queue.
+
+    Jobs wait in a Redis sorted set scored by a virtual deadline
+    (enqueue time + source penalty + duration penalty) and are only handed to
+    Celery when a worker slot is free. Because the deadline is anchored to the
+    enqueue time, every waiting job eventually becomes the most urgent one, so
+    batch backfills and long clips cannot starve.
+
+    Running jobs keep their in-flight entry fresh from a heartbeat thread. A
+    job whose entry goes stale lost its worker and is re-queued, up to
+    `max_attempts` dispatches; after that `on_abandoned(video_id)` is called
+    so the video can be marked failed. Jobs still waiting in the broker have
+    no heartbeat yet, so they are only re-queued `dispatch_timeout` seconds
+    after dispatch if no worker has started them.
+    """
+
+    SOURCES = ("interactive", "batch")
+
+    def __init__(self, redis_client: Redis, task, max_in_flight: int = 4,
+                 batch_penalty: float = 300.0, duration_weight: float = 2.0,
+                 short_clip_seconds: float = 15.0, lease_timeout: int = 900,
+                 dispatch_timeout: int = 3600, max_attempts: int = 3,
+                 on_abandoned: Optional[Callable[[int], None]] = None,
+                 metrics: Optional[MetricsCollector] = None, key_prefix: str = "scheduler:"):
+        self.redis_client = redis_client
+        self.task = task
+        self.max_in_flight = max_in_flight
+        self.batch_penalty = batch_penalty
+        self.duration_weight = duration_weight
+        self.short_clip_seconds = short_clip_seconds
+        self.lease_timeout = lease_timeout
+        self.dispatch_timeout = dispatch_timeout
+        self.max_attempts = max_attempts
+        self.on_abandoned = on_abandoned
+        self.key_prefix = key_prefix
+        self.pending_key = f"{self.key_prefix}pending"
+        self.in_flight_key = f"{self.key_prefix}in_flight"
+        self.dispatched_key = f"{self.key_prefix}dispatched"
+        self.metrics = metrics or metrics_collector
+        self.logger = CustomLogger(video_logger, {'component': 'job_scheduler'})
+        self._reclaim_script = redis_client.register_script(_RECLAIM_SCRIPT)
+        self._dispatch_script = redis_client.register_script(_DISPATCH_SCRIPT)
+        self._heartbeats: Dict[int, threading.Event] = {}
+
+    @staticmethod
+    def probe_duration(video_path: str) -> Optional[float]:
+        """Return the clip duration in seconds, or None if it cannot be probed."""
+        try:
+            with tracer.span("ffprobe"):
+                return float(ffmpeg.probe(video_path)["format"]["duration"])
+        except Exception:
+            return None
+
+    def priority_class(self, source: str, duration: Optional[float]) -> str:
+        """Bucket a job into a class used for Celery priority and wait metrics."""
+        length = "short" if duration is not None and duration <= self.short_clip_seconds else "long"
+        return f"{source}_{length}"
+
+    def celery_priority(self, priority_class: str) -> int:
+        """Map a priority class onto Celery's 0 (highest) to 9 (lowest) scale."""
+        return {
+            "interactive_short": 0,
+            "interactive_long": 3,
+            "batch_short": 6,
+            "batch_long": 9
+        }[priority_class]
+
+    def deadline(self, enqueued_at: float, source: str, duration: Optional[float]) -> float:
+        """Virtual deadline used as the pending-set score; lower runs first."""
+        penalty = self.batch_penalty if source == "batch" else 0.0
+        clip_length = duration if duration is not None else self.short_clip_seconds
+        return enqueued_at + penalty + clip_length * self.duration_weight
+
+    def submit(self, video_id: int, video_path: str, source: str = "interactive") -> Dict[str, Any]:
+        """Queue a video for processing and dispatch as many jobs as slots allow."""
+        if source not in self.SOURCES:
+            raise ValueError(f"Unknown job source: {source}")
+
+        duration = self.probe_duration(video_path)
+        priority_class = self.priority_class(source, duration)
+        enqueued_at = time.time()
+        score = self.deadline(enqueued_at, source, duration)
+
+        pipe = self.redis_client.pipeline()
+        job = {"enqueued_at": enqueued_at, "priority_class": priority_class, "score": score}
+        traceparent = tracer.traceparent()
+        if traceparent:
+            # Dispatch may happen later from another job's task, so keep the
+            # submitting trace with the job rather than relying on context
+            job["traceparent"] = traceparent
+        # Kept until the job finishes or is given up, however long it waits
+        pipe.hset(f"{self.key_prefix}job:{video_id}", mapping=job)
+        pipe.zadd(self.pending_key, {str(video_id): score})
+        pipe.execute()
+
+        self.logger.info(
+            "Job queued",
+            video_id=video_id,
+            source=source,
+            duration=duration,
+            priority_class=priority_class
+        )
+        self.dispatch()
+
+        return {"priority_class": priority_class, "duration": duration}
+
+    def dispatch(self) -> int:
+        """Hand pending jobs to Celery until the in-flight limit is reached."""
+        self.reclaim()
+        dispatched = 0
+        while True:
+            video_id = self._dispatch_script(
+                keys=[self.pending_key, self.in_flight_key, self.dispatched_key],
+                args=[time.time(), self.max_in_flight]
+            )
+            if video_id is None:
+                return dispatched
+
+            video_id = int(video_id)
+            priority_class, traceparent = self.redis_client.hmget(
+                f"{self.key_prefix}job:{video_id}", "priority_class", "traceparent"
+            )
+            priority_class = priority_class.decode() if priority_class else "interactive_long"
+            self.task.apply_async(
+                args=[video_id],
+                priority=self.celery_priority(priority_class),
+                headers={"traceparent": traceparent.decode()} if traceparent else None
+            )
+            dispatched += 1
+
+    def reclaim(self) -> List[int]:
+        """Re-queue jobs whose worker stopped renewing their lease; returns those given up."""
+        now = time.time()
+        abandoned = [int(video_id) for video_id in self._reclaim_script(
+            keys=[self.pending_key, self.in_flight_key, self.dispatched_key],
+            args=[now - self.lease_timeout, self.max_attempts, f"{self.key_prefix}job:",
+                  now - self.dispatch_timeout]
+        )]
+        for video_id in abandoned:
+            self.logger.error("Job abandoned after repeated lost leases", video_id=video_id,
+                              attempts=self.max_attempts)
+            if self.on_abandoned:
+                self.on_abandoned(video_id)
+        return abandoned
+
+    def _renew_lease(self, video_id: int, stop: threading.Event) -> None:
+        while not stop.wait(self.lease_timeout / 3):
+            try:
+                # XX: never resurrect an entry that was already reclaimed
+                self.redis_client.zadd(self.in_flight_key, {str(video_id): time.time()}, xx=True)
+            except Exception as e:
+                self.logger.error("Failed to renew job lease", exc_info=e, video_id=video_id)
+
+    def mark_started(self, video_id: int) -> None:
+        """Record how long the job waited and keep its in-flight lease alive until it finishes."""
+        # Out of the broker: from now on the heartbeat alone keeps the job in flight
+        pipe = self.redis_client.pipeline()
+        pipe.zrem(self.dispatched_key, str(video_id))
+        pipe.zadd(self.in_flight_key, {str(video_id): time.time()}, xx=True)
+        pipe.execute()
+
+        stop = threading.Event()
+        self._heartbeats[video_id] = stop
+        threading.Thread(target=self._renew_lease, args=(video_id, stop), daemon=True).start()
+
+        job = self.redis_client.hgetall(f"{self.key_prefix}job:{video_id}")
+        if not job:
+            return
+        wait = time.time() - float(job[b"enqueued_at"])
+        priority_class = job[b"priority_class"].decode()
+        self.metrics.record_queue_wait(priority_class, video_id, wait)
+        QUEUE_WAIT_SECONDS.labels(priority_class=priority_class).observe(wait)
+        tracer.set_attribute("queue_wait", wait)
+        tracer.set_attribute("priority_class", priority_class)
+
+    def mark_finished(self, video_id: int) -> None:
+        """Free the job's slot and let the next pending job through."""
+        stop = self._heartbeats.pop(video_id, None)
+        if stop is not None:
+            stop.set()
+        pipe = self.redis_client.pipeline()
+        pipe.zrem(self.in_flight_key, str(video_id))
+        pipe.zrem(self.dispatched_key, str(video_id))
+        pipe.delete(f"{self.key_prefix}job:{video_id}")
+        pipe.execute()
+        self.dispatch()
+
+    def get_queue_status(self) -> Dict[str, Any]:
+        """Current queue depth and in-flight count."""
+        return {
+            "pending": self.redis_client.zcard(self.pending_key),
+            "in_flight": self.redis_client.zcard(self.in_flight_key),
+            "max_in_flight": self.max_in_flight
+        }
@@ -0,0 +1,89 @@
+from datetime import datetime
+from typing import Optional, Union
+from sqlalchemy import func, select, text, true, update
+from sqlalchemy.sql.selectable import ScalarSelect
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import Video, Niche, NicheStats
+
+def niche_stats_delta(niche_id: Union[int, ScalarSelect], total_videos: int = 0, successful_uploads: int = 0):
+    """Statement that applies counter deltas to a niche's rollup row.
+
+    Execute it in the same transaction as the video change it reflects so the
+    rollup commits or rolls back together with it. `niche_id` may be a
+    subquery such as current_niche_id() to read the niche at write time.
+    """
+    return update(NicheStats).where(
+        NicheStats.niche_id == niche_id
+    ).values(
+        total_videos=NicheStats.total_videos + total_videos,
+        successful_uploads=NicheStats.successful_uploads + successful_uploads,
+        updated_at=datetime.utcnow()
+    )
+
+def current_niche_id(video_id: int):
+    """Subquery for a video's niche as seen by the statement it is used in."""
+    return select(Video.niche_id).where(Video.id == video_id).scalar_subquery()
+
+def niche_assignment_deltas(video: Video, old_niche_id: Optional[int], new_niche_id: Optional[int]):
+    """Statements moving a video's contribution from one niche rollup to another."""
+    if old_niche_id == new_niche_id:
+        return []
+
+    uploaded = 1 if video.youtube_url else 0
+    statements = []
+    if old_niche_id is not None:
+        statements.append(niche_stats_delta(old_niche_id, total_videos=-1, successful_uploads=-uploaded))
+    if new_niche_id is not None:
+        statements.append(niche_stats_delta(new_niche_id, total_videos=1, successful_uploads=uploaded))
+    return statements
+
+def niche_counts_query():
+    """Single grouped query computing every niche's counters from the videos table."""
+    return select(
+        Video.niche_id,
+        func.count(Video.id).label('total_videos'),
+        func.count(Video.id).filter(Video.youtube_url.isnot(None)).label('successful_uploads')
+    ).where(
+        Video.niche_id.isnot(None)
+    ).group_by(
+        Video.niche_id
+    )
+
+def rebuild_statements(dialect: str = "postgresql"):
+    """Statements overwriting the whole rollup with freshly computed counts.
+
+    Every niche gets a row, including niches without videos, so later deltas
+    always have a row to update. Rows are upserted rather than deleted and
+    re-inserted, so a niche created concurrently (with its own row) cannot
+    cause a primary key conflict; rows of deleted niches go with them.
+
+    On PostgreSQL the rollup is locked against writes first: transactions
+    that already applied a delta commit before the counts are read, and later
+    deltas wait for the rebuild, so none is overwritten. SQLite runs one
+    writer at a time anyway.
+    """
+    counts = niche_counts_query().subquery()
+    insert = sqlite_insert if dialect == "sqlite" else postgresql_insert
+    statement = insert(NicheStats).from_select(
+        ['niche_id', 'total_videos', 'successful_uploads', 'updated_at'],
+        select(
+            Niche.id,
+            func.coalesce(counts.c.total_videos, 0),
+            func.coalesce(counts.c.successful_uploads, 0),
+            func.now()
+        ).outerjoin(
+            counts, counts.c.niche_id == Niche.id
+        ).where(true())  # SQLite cannot tell a join's ON from ON CONFLICT without a WHERE
+    )
+    statements = [text("LOCK TABLE niche_stats IN EXCLUSIVE MODE")] if dialect == "postgresql" else []
+    return statements + [
+        statement.on_conflict_do_update(
+            index_elements=[NicheStats.niche_id],
+            set_={
+                'total_videos': statement.excluded.total_videos,
+                'successful_uploads': statement.excluded.successful_uploads,
+                'updated_at': statement.excluded.updated_at
+            }
+        )
+    ]
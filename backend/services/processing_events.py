@@ -0,0 +1,131 @@
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import psutil
+from sqlalchemy import insert, select
+from database import SessionLocal
+from models import ProcessingLog, Video
+from utils.logging_config import CustomLogger, video_logger
+
+class ProcessingEventRecorder:
+    """Buffers per-stage processing events and writes them to processing_logs in bulk.
+
+    Events are flushed when the buffer reaches `flush_size`, when `flush_interval`
+    seconds have passed since the last flush, when a task calls flush(), and at
+    interpreter exit.
+    """
+
+    def __init__(self, flush_size: int = 50, flush_interval: float = 5.0):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.logger = CustomLogger(video_logger, {'component': 'processing_events'})
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._process: Optional[psutil.Process] = None
+        atexit.register(self.flush)
+
+    def _memory_rss(self) -> int:
+        # Created per pid: prefork Celery children must report their own memory, not the parent's
+        if self._process is None or self._process.pid != os.getpid():
+            self._process = psutil.Process()
+        return self._process.memory_info().rss
+
+    def record(self, video_id: int, step: str, status: str, duration: Optional[float] = None,
+               cpu_time: Optional[float] = None, message: Optional[str] = None) -> None:
+        """Buffer a single event."""
+        event = {
+            "video_id": video_id,
+            "step": step,
+            "status": status,
+            "duration": duration,
+            "cpu_time": cpu_time,
+            "memory_rss": self._memory_rss(),
+            "message": message,
+            "created_at": datetime.utcnow()
+        }
+        with self._lock:
+            self._buffer.append(event)
+            should_flush = (
+                len(self._buffer) >= self.flush_size
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if should_flush:
+            self.flush()
+
+    @contextmanager
+    def stage(self, video_id: Optional[int], step: str):
+        """Record start, completion or failure of a processing stage with its timings."""
+        if video_id is None:
+            yield
+            return
+
+        self.record(video_id, step, "started")
+        start_time = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield
+        except Exception as e:
+            self.record(
+                video_id, step, "failed",
+                duration=time.perf_counter() - start_time,
+                cpu_time=time.process_time() - start_cpu,
+                message=str(e)
+            )
+            raise
+        self.record(
+            video_id, step, "completed",
+            duration=time.perf_counter() - start_time,
+            cpu_time=time.process_time() - start_cpu
+        )
+
+    def flush(self) -> None:
+        """Write all buffered events in a single bulk insert.
+
+        Events of videos deleted meanwhile are dropped first. If the bulk insert
+        still fails, events are written one at a time so one bad row cannot
+        cost the whole batch.
+        """
+        with self._lock:
+            events, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+        if not events:
+            return
+
+        db = SessionLocal()
+        try:
+            video_ids = {event["video_id"] for event in events}
+            existing = set(db.scalars(select(Video.id).where(Video.id.in_(video_ids))))
+            events = [event for event in events if event["video_id"] in existing]
+            if events:
+                db.execute(insert(ProcessingLog), events)
+                db.commit()
+        except Exception as e:
+            db.rollback()
+            self.logger.warning(
+                "Bulk write of processing events failed, writing them one by one",
+                exc_info=e,
+                event_count=len(events)
+            )
+            self._insert_each(db, events)
+        finally:
+            db.close()
+
+    def _insert_each(self, db, events: List[Dict[str, Any]]) -> None:
+        failed = 0
+        for event in events:
+            try:
+                db.execute(insert(ProcessingLog), [event])
+                db.commit()
+            except Exception:
+                db.rollback()
+                failed += 1
+        if failed:
+            self.logger.error("Failed to write processing events", event_count=failed)
+
+# Shared per-process recorder used by the tasks and VideoProcessor
+event_recorder = ProcessingEventRecorder()
@@ -0,0 +1,94 @@
+import re
+from typing import Any, Dict, List, Optional
+from sqlalchemy import func, select, update, text, tuple_, table, column, literal_column
+from models import Video, Transcript
+
+# Postgres text search configuration used for both indexing and querying
+SEARCH_CONFIG = "english"
+
+# FTS5 virtual table used instead of the tsvector column on SQLite
+transcripts_fts = table("transcripts_fts", column("rowid"), column("content"))
+
+def index_transcript(db, video_id: int, content: str) -> None:
+    """Refresh a transcript's search index entry in the caller's transaction.
+
+    Postgres keeps a tsvector on the transcripts row; SQLite keeps a row in the
+    transcripts_fts FTS5 table.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(
+            update(Transcript).where(
+                Transcript.video_id == video_id
+            ).values(
+                search_vector=func.to_tsvector(SEARCH_CONFIG, content)
+            )
+        )
+    else:
+        db.execute(text("DELETE FROM transcripts_fts WHERE rowid = :video_id"), {"video_id": video_id})
+        db.execute(
+            text("INSERT INTO transcripts_fts (rowid, content) VALUES (:video_id, :content)"),
+            {"video_id": video_id, "content": content}
+        )
+
+def postgres_search_query(query: str, niche_id: Optional[int], status: Optional[str],
+                          after: Optional[tuple], limit: int):
+    """Ranked transcript matches using the GIN-indexed tsvector column."""
+    ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, query)
+    rank = func.ts_rank_cd(Transcript.search_vector, ts_query)
+
+    statement = select(
+        Video.id,
+        Video.title,
+        Video.status,
+        Video.niche_id,
+        rank.label('rank')
+    ).join(
+        Transcript, Transcript.video_id == Video.id
+    ).where(
+        Transcript.search_vector.op('@@')(ts_query)
+    )
+    return _filter_and_page(statement, rank, niche_id, status, after, limit)
+
+def sqlite_search_query(query: str, niche_id: Optional[int], status: Optional[str],
+                        after: Optional[tuple], limit: int):
+    """Ranked transcript matches using the FTS5 fallback table."""
+    fts_name = literal_column("transcripts_fts")
+    rank = -func.bm25(fts_name)
+
+    statement = select(
+        Video.id,
+        Video.title,
+        Video.status,
+        Video.niche_id,
+        rank.label('rank')
+    ).select_from(
+        transcripts_fts
+    ).join(
+        Video, Video.id == transcripts_fts.c.rowid
+    ).where(
+        fts_name.op('MATCH')(_fts5_query(query))
+    )
+    return _filter_and_page(statement, rank, niche_id, status, after, limit)
+
+def _filter_and_page(statement, rank, niche_id: Optional[int], status: Optional[str],
+                     after: Optional[tuple], limit: int):
+    """Apply filters and (rank, id) keyset pagination, best match first."""
+    if niche_id is not None:
+        statement = statement.where(Video.niche_id == niche_id)
+    if status is not None:
+        statement = statement.where(Video.status == status)
+    if after is not None:
+        statement = statement.where(tuple_(rank, Video.id) < tuple_(*after))
+    return statement.order_by(rank.desc(), Video.id.desc()).limit(limit + 1)
+
+def _fts5_query(query: str) -> str:
+    """Quote each term so user input cannot inject FTS5 query syntax."""
+    return " ".join('"{}"'.format(term.replace('"', '""')) for term in query.split())
+
+def matching_segments(segments: List[Dict[str, Any]], query: str) -> List[Dict[str, Any]]:
+    """Segments that contain any query term, to show where in the clip it was said."""
+    terms = [re.escape(term) for term in re.findall(r"\w+", query.lower())]
+    if not terms:
+        return []
+    pattern = re.compile(r"\b(" + "|".join(terms) + r")", re.IGNORECASE)
+    return [segment for segment in segments if pattern.search(segment["text"])]
@@ -0,0 +1,17 @@
+import json
+import zlib
+from typing import Any, Dict, List
+
+def encode_segments(segments: List[Dict[str, Any]]) -> bytes:
+    """Pack transcript segments as zlib-compressed [start, end, text] rows."""
+    rows = [[round(s["start"], 3), round(s["end"], 3), s["text"]] for s in segments]
+    return zlib.compress(json.dumps(rows, separators=(",", ":")).encode("utf-8"))
+
+def decode_segments(data: bytes) -> List[Dict[str, Any]]:
+    """Inverse of encode_segments."""
+    rows = json.loads(zlib.decompress(data).decode("utf-8"))
+    return [{"start": start, "end": end, "text": text} for start, end, text in rows]
+
+def transcript_text(segments: List[Dict[str, Any]]) -> str:
+    """Full transcript text as Whisper would have returned it."""
+    return " ".join(segment["text"] for segment in segments)
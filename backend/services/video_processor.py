@@ -3,9 +3,14 @@ import pytesseract
 import whisper
 import ffmpeg
 import os
-from typing import Tuple, Optional
+from typing import Tuple, Optional, List, Dict, Any
 from pathlib import Path
 import time
+from contextlib import ExitStack, nullcontext
+from services.processing_events import ProcessingEventRecorder
+from utils.semaphore import DistributedSemaphore
+from utils.prometheus import time_stage
+from utils.tracing import tracer
 from utils.logging_config import CustomLogger, video_logger
 from utils.error_handling import (
     SubtitleDetectionError,
@@ -14,16 +19,29 @@ from utils.error_handling import (
 )
 
 class VideoProcessor:
-    def __init__(self, upload_dir: str = "uploads", processed_dir: str = "processed"):
+    def __init__(self, upload_dir: str = "uploads", processed_dir: str = "processed",
+                 event_recorder: Optional[ProcessingEventRecorder] = None,
+                 job_slots: Optional[DistributedSemaphore] = None,
+                 slot_timeout: Optional[float] = None):
         self.upload_dir = Path(upload_dir)
         self.processed_dir = Path(processed_dir)
-        self.model = whisper.load_model("base")
+        self._model = None
         self.logger = CustomLogger(video_logger, {'component': 'video_processor'})
+        self.event_recorder = event_recorder
+        self.job_slots = job_slots
+        self.slot_timeout = slot_timeout
         
         # Create directories if they don't exist
         self.upload_dir.mkdir(exist_ok=True)
         self.processed_dir.mkdir(exist_ok=True)
 
+    @property
+    def model(self):
+        """Whisper model, loaded on first transcription so ffmpeg-only jobs skip it."""
+        if self._model is None:
+            self._model = whisper.load_model("base")
+        return self._model
+
     def detect_subtitles(self, video_path: str, max_frames: int = 10) -> bool:
         """Detect if video already has subtitles using OCR."""
         self.logger.info("Starting subtitle detection", video_path=video_path)
@@ -46,7 +64,8 @@ class VideoProcessor:
                 
                 # Convert to grayscale for better OCR
                 gray = cv2.cvtColor(subtitle_region, cv2.COLOR_BGR2GRAY)
-                text = pytesseract.image_to_string(gray)
+                with tracer.span("ocr"):
+                    text = pytesseract.image_to_string(gray)
                 
                 if len(text.strip()) > 0:
                     has_subtitles = True
@@ -79,38 +98,52 @@ class VideoProcessor:
             
         return has_subtitles
 
-    def generate_subtitles(self, video_path: str) -> Tuple[str, str]:
-        """Generate subtitles using Whisper and return subtitle text and SRT path."""
+    def write_srt(self, video_path: str, segments: List[Dict[str, Any]]) -> str:
+        """Write transcript segments to an SRT file next to the processed video."""
+        srt_path = self.processed_dir / f"{Path(video_path).stem}.srt"
+        
+        with open(srt_path, 'w', encoding='utf-8') as f:
+            for i, segment in enumerate(segments, 1):
+                start = self._format_timestamp(segment["start"])
+                end = self._format_timestamp(segment["end"])
+                text = segment["text"].strip()
+                
+                f.write(f"{i}\n")
+                f.write(f"{start} --> {end}\n")
+                f.write(f"{text}\n\n")
+        
+        return str(srt_path)
+
+    def generate_subtitles(self, video_path: str) -> Tuple[List[Dict[str, Any]], str]:
+        """Generate subtitles using Whisper and return the timed segments and SRT path."""
         self.logger.info("Starting subtitle generation", video_path=video_path)
         start_time = time.time()
         
         try:
             # Transcribe audio
-            result = self.model.transcribe(video_path)
+            with self._slot(), tracer.span("whisper"):
+                result = self.model.transcribe(video_path)
+            segments = [
+                {
+                    "start": segment["start"],
+                    "end": segment["end"],
+                    "text": segment["text"].strip()
+                }
+                for segment in result["segments"]
+            ]
             
             # Create SRT file
-            base_path = Path(video_path).stem
-            srt_path = self.processed_dir / f"{base_path}.srt"
-            
-            with open(srt_path, 'w', encoding='utf-8') as f:
-                for i, segment in enumerate(result["segments"], 1):
-                    start = self._format_timestamp(segment["start"])
-                    end = self._format_timestamp(segment["end"])
-                    text = segment["text"].strip()
-                    
-                    f.write(f"{i}\n")
-                    f.write(f"{start} --> {end}\n")
-                    f.write(f"{text}\n\n")
+            srt_path = self.write_srt(video_path, segments)
 
             processing_time = time.time() - start_time
             self.logger.info(
                 "Subtitle generation completed",
                 video_path=video_path,
-                srt_path=str(srt_path),
+                srt_path=srt_path,
                 processing_time=processing_time
             )
             
-            return result["text"], str(srt_path)
+            return segments, srt_path
             
         except Exception as e:
             self.logger.error(
@@ -141,7 +174,8 @@ class VideoProcessor:
             stream = ffmpeg.input(video_path)
             stream = ffmpeg.filter(stream, 'subtitles', str(srt_path))
             stream = ffmpeg.output(stream, str(output_path))
-            ffmpeg.run(stream, overwrite_output=True)
+            with self._slot(), tracer.span("ffmpeg"):
+                ffmpeg.run(stream, overwrite_output=True)
             
             processing_time = time.time() - start_time
             self.logger.info(
@@ -171,20 +205,44 @@ class VideoProcessor:
                 }
             )
 
-    def process_video(self, video_path: str, max_processing_time: int = 300) -> Tuple[str, bool, Optional[str]]:
+    def render_subtitles(self, video_path: str, segments: List[Dict[str, Any]]) -> str:
+        """Re-burn stored transcript segments into the video without re-running Whisper."""
+        srt_path = self.write_srt(video_path, segments)
+        return self.overlay_subtitles(video_path, srt_path)
+
+    def _stage(self, video_id: Optional[int], step: str):
+        """Context manager timing a stage, and recording its event when a recorder is given."""
+        stack = ExitStack()
+        if self.event_recorder is not None:
+            stack.enter_context(self.event_recorder.stage(video_id, step))
+        stack.enter_context(time_stage(step))
+        stack.enter_context(tracer.span(step))
+        return stack
+
+    def _slot(self):
+        """Context manager holding a cluster-wide Whisper/ffmpeg slot when a semaphore is given."""
+        if self.job_slots is None:
+            return nullcontext()
+        return self.job_slots.hold(timeout=self.slot_timeout)
+
+    def process_video(self, video_path: str, max_processing_time: int = 300,
+                      video_id: Optional[int] = None) -> Tuple[str, bool, Optional[List[Dict[str, Any]]]]:
         """Main processing function that handles subtitle detection and generation."""
         start_time = time.time()
         self.logger.info("Starting video processing", video_path=video_path)
         
         try:
-            has_subtitles = self.detect_subtitles(video_path)
-            subtitle_text = None
+            with self._stage(video_id, "detect"):
+                has_subtitles = self.detect_subtitles(video_path)
+            segments = None
             processed_path = video_path
             
             if not has_subtitles:
                 # Generate and overlay subtitles
-                subtitle_text, srt_path = self.generate_subtitles(video_path)
-                processed_path = self.overlay_subtitles(video_path, srt_path)
+                with self._stage(video_id, "transcribe"):
+                    segments, srt_path = self.generate_subtitles(video_path)
+                with self._stage(video_id, "overlay"):
+                    processed_path = self.overlay_subtitles(video_path, srt_path)
                 has_subtitles = True
             
             processing_time = time.time() - start_time
@@ -206,7 +264,7 @@ class VideoProcessor:
                 processing_time=processing_time
             )
             
-            return processed_path, has_subtitles, subtitle_text
+            return processed_path, has_subtitles, segments
             
         except Exception as e:
             self.logger.error(
@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import func, select, or_, and_
+from models import Video
+
+# (maximum time since upload, refresh interval); fresh uploads change fastest
+REFRESH_TIERS = [
+    (timedelta(days=1), timedelta(minutes=15)),
+    (timedelta(days=7), timedelta(hours=1)),
+]
+DEFAULT_REFRESH_INTERVAL = timedelta(days=1)
+
+def youtube_video_id(youtube_url: Optional[str]) -> Optional[str]:
+    """Extract the YouTube video ID from a stored Shorts URL."""
+    if not youtube_url:
+        return None
+    return youtube_url.rstrip("/").split("/")[-1] or None
+
+def videos_due_for_refresh_query(now: datetime):
+    """Uploaded videos whose latest snapshot is older than their tier's refresh interval."""
+    fetched_at = Video.youtube_stats_fetched_at
+    uploaded_at = func.coalesce(Video.youtube_uploaded_at, Video.created_at)
+    due = [fetched_at.is_(None)]
+    for max_age, interval in REFRESH_TIERS:
+        due.append(and_(
+            uploaded_at >= now - max_age,
+            fetched_at < now - interval
+        ))
+    due.append(fetched_at < now - DEFAULT_REFRESH_INTERVAL)
+
+    return select(
+        Video.id,
+        Video.youtube_url
+    ).where(
+        Video.youtube_url.isnot(None),
+        or_(*due)
+    )
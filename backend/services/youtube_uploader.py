@@ -4,7 +4,7 @@ from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaFileUpload
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Iterator, Tuple
 import pickle
 import time
 from utils.logging_config import CustomLogger, youtube_logger
@@ -161,6 +161,39 @@ class YouTubeUploader:
                 }
             )
 
+    def iter_video_statistics(self, video_ids: List[str], batch_size: int = 50) -> Iterator[Tuple[List[str], Dict[str, Dict[str, int]]]]:
+        """Yield (batch, view and like counts) per videos.list call of up to 50 IDs.
+
+        Batches that fail are logged and skipped.
+        """
+        if not self.youtube:
+            self.authenticate()
+
+        for i in range(0, len(video_ids), batch_size):
+            batch = video_ids[i:i + batch_size]
+            try:
+                response = self.youtube.videos().list(
+                    part="statistics",
+                    id=",".join(batch),
+                    maxResults=batch_size
+                ).execute()
+            except Exception as e:
+                self.logger.error(
+                    "Failed to fetch video statistics",
+                    exc_info=e,
+                    video_ids=batch
+                )
+                continue
+
+            statistics = {}
+            for item in response.get("items", []):
+                item_statistics = item.get("statistics", {})
+                statistics[item["id"]] = {
+                    "views": int(item_statistics.get("viewCount", 0)),
+                    "likes": int(item_statistics.get("likeCount", 0))
+                }
+            yield batch, statistics
+
     def update_video_privacy(self, video_id: str, privacy_status: str = 'public') -> None:
         """Update the privacy status of a video."""
         if not self.youtube:
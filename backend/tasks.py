@@ -1,34 +1,169 @@
 from celery import Celery
+from celery.schedules import crontab
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown, task_prerun, task_postrun
+from celery.worker.control import control_command
 from services.video_processor import VideoProcessor
 from services.youtube_uploader import YouTubeUploader
-from models import Video
+from services.job_scheduler import JobScheduler
+from services.niche_stats import niche_stats_delta, current_niche_id, rebuild_statements
+from services.youtube_stats import youtube_video_id, videos_due_for_refresh_query
+from services.transcripts import encode_segments, decode_segments, transcript_text
+from services.transcript_search import index_transcript
+from services.processing_events import event_recorder
+from models import Video, VideoTombstone, Transcript, YouTubeStatsSnapshot, DailyMetricsReport
+from sqlalchemy import update, delete, select
 from sqlalchemy.orm import Session
+from datetime import date, datetime, timedelta
 from database import SessionLocal
+from config import settings
+from utils.cache import redis_client
+from utils.tiered_cache import response_cache, video_tags
+from utils.semaphore import DistributedSemaphore
+from utils.metrics import metrics_collector
+from utils.prometheus import serve as serve_prometheus, mark_process_dead, time_youtube_upload
+from utils.tracing import tracer
+from utils.profiler import profiler_control, process_name
+from utils.logging_config import CustomLogger, video_logger
 import os
+import time
 
-celery = Celery('tasks', broker=os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+logger = CustomLogger(video_logger, {'component': 'tasks'})
+
+celery = Celery('tasks', broker=settings.REDIS_URL)
+celery.conf.broker_transport_options = {
+    'priority_steps': list(range(10)),
+    'queue_order_strategy': 'priority'
+}
+celery.conf.beat_schedule = {
+    'dispatch-pending-jobs': {
+        'task': 'tasks.dispatch_pending_jobs',
+        'schedule': 10.0
+    },
+    'rebuild-niche-stats': {
+        'task': 'tasks.rebuild_niche_stats',
+        'schedule': 3600.0
+    },
+    'refresh-youtube-stats': {
+        'task': 'tasks.refresh_youtube_stats',
+        'schedule': 900.0
+    },
+    'prune-youtube-stats-snapshots': {
+        'task': 'tasks.prune_youtube_stats_snapshots',
+        'schedule': 86400.0
+    },
+    'rollup-metrics': {
+        'task': 'tasks.rollup_metrics',
+        'schedule': 60.0
+    },
+    'persist-daily-metrics-report': {
+        'task': 'tasks.persist_daily_metrics_report',
+        'schedule': crontab(hour=0, minute=15)
+    },
+    'prune-video-tombstones': {
+        'task': 'tasks.prune_video_tombstones',
+        'schedule': 86400.0
+    },
+    'trim-metrics': {
+        'task': 'tasks.trim_metrics',
+        'schedule': 3600.0
+    }
+}
+
+@worker_init.connect
+def start_metrics_server(**kwargs):
+    """Serve Prometheus metrics from the worker parent; prefork children report through it."""
+    serve_prometheus(settings.WORKER_METRICS_PORT)
+    profiler_control.start_watcher('worker')
+
+@worker_process_init.connect
+def start_profiler_watcher(**kwargs):
+    profiler_control.start_watcher('worker')
+
+@control_command(
+    args=[('duration', float), ('interval', float)],
+    signature='[duration=30 [interval=0.01]]'
+)
+def profile(state, duration=30.0, interval=0.01):
+    """Profile this worker's pool processes, e.g. `celery -A tasks control profile 60 -d celery@host`."""
+    if not profiler_control.enabled:
+        return {'error': 'Profiler is disabled; set PROFILER_ENABLED'}
+    pids = state.consumer.pool.info.get('processes') or [os.getpid()]
+    return {'ok': [profiler_control.request(process_name(pid), duration, interval) for pid in pids]}
+
+@worker_process_shutdown.connect
+def flush_metrics_on_shutdown(pid=None, **kwargs):
+    """Prefork children can exit without running atexit handlers."""
+    metrics_collector.flush()
+    tracer.flush()
+    mark_process_dead(pid or os.getpid())
+
+# Tasks whose first argument is a video ID; they join the trace of the video's
+# upload when the sender did not pass one in the traceparent header
+VIDEO_TASKS = {'tasks.process_video', 'tasks.rerender_subtitles', 'tasks.upload_to_youtube', 'tasks.cleanup_video_files'}
+
+@task_prerun.connect
+def start_task_span(task_id=None, task=None, args=None, **kwargs):
+    video_id = args[0] if task.name in VIDEO_TASKS and args else None
+    tracer.start_task(task_id, task.name, task.request.get('traceparent'), video_id)
+
+@task_postrun.connect
+def finish_task_span(task_id=None, state=None, **kwargs):
+    tracer.finish_task(task_id, state)
+
+# Caps CPU-heavy Whisper/ffmpeg work across every worker node
+heavy_job_slots = DistributedSemaphore(
+    redis_client,
+    "heavy_jobs",
+    limit=settings.HEAVY_JOB_SLOTS,
+    lease_ttl=settings.HEAVY_JOB_LEASE_TTL
+)
+
+def _video_processor(**kwargs) -> VideoProcessor:
+    return VideoProcessor(
+        job_slots=heavy_job_slots,
+        slot_timeout=settings.HEAVY_JOB_SLOT_TIMEOUT,
+        **kwargs
+    )
 
 @celery.task
 def process_video(video_id: int):
     """Process video with subtitle detection and generation."""
     db = SessionLocal()
     try:
+        scheduler.mark_started(video_id)
         video = db.query(Video).filter(Video.id == video_id).first()
         if not video:
             return {'status': 'error', 'message': 'Video not found'}
 
         video.status = 'processing'
+        video.processing_started_at = datetime.utcnow()
+        video.processing_finished_at = None
         db.commit()
+        response_cache.invalidate_tags(*video_tags(video.niche_id))
 
-        processor = VideoProcessor()
+        processor = _video_processor(event_recorder=event_recorder)
         try:
-            processed_path, has_subtitles, subtitle_text = processor.process_video(video.file_path)
+            with event_recorder.stage(video.id, 'process_video'):
+                processed_path, has_subtitles, segments = processor.process_video(
+                    video.file_path,
+                    video_id=video.id
+                )
             
             video.processed_path = processed_path
             video.has_subtitles = has_subtitles
-            video.subtitles_text = subtitle_text
+            if segments is not None:
+                db.merge(Transcript(
+                    video_id=video.id,
+                    segments=encode_segments(segments),
+                    segment_count=len(segments)
+                ))
+                db.flush()
+                index_transcript(db, video.id, transcript_text(segments))
             video.status = 'processed'
+            video.processing_finished_at = datetime.utcnow()
             db.commit()
+            response_cache.invalidate_tags(*video_tags(video.niche_id))
+            _record_processing(video, success=True)
 
             return {
                 'status': 'success',
@@ -37,12 +172,93 @@ def process_video(video_id: int):
                 'has_subtitles': has_subtitles
             }
         except Exception as e:
+            # A failed statement aborts the transaction; start over before recording the failure
+            db.rollback()
             video.status = 'failed'
+            video.processing_finished_at = datetime.utcnow()
             db.commit()
+            response_cache.invalidate_tags(*video_tags(video.niche_id))
+            _record_processing(video, success=False)
             raise e
 
     finally:
         db.close()
+        event_recorder.flush()
+        scheduler.mark_finished(video_id)
+
+def _record_processing(video: Video, success: bool) -> None:
+    """Count a processing outcome; successes also record their duration and upload size."""
+    metrics_collector.record_processing_outcome(video.id, success)
+    if not success:
+        return
+    metrics_collector.record_processing_time(
+        video.id, (video.processing_finished_at - video.processing_started_at).total_seconds()
+    )
+    if os.path.exists(video.file_path):
+        metrics_collector.record_upload_size(video.id, os.path.getsize(video.file_path))
+
+def _fail_abandoned_job(video_id: int) -> None:
+    """Mark a video failed once the scheduler gives up re-running its lost jobs."""
+    db = SessionLocal()
+    try:
+        video = db.query(Video).filter(Video.id == video_id).first()
+        if video and video.status in ('uploaded', 'processing'):
+            video.status = 'failed'
+            video.processing_finished_at = datetime.utcnow()
+            db.commit()
+            response_cache.invalidate_tags(*video_tags(video.niche_id))
+    finally:
+        db.close()
+
+scheduler = JobScheduler(
+    redis_client,
+    process_video,
+    max_in_flight=settings.SCHEDULER_MAX_IN_FLIGHT,
+    batch_penalty=settings.SCHEDULER_BATCH_PENALTY,
+    duration_weight=settings.SCHEDULER_DURATION_WEIGHT,
+    short_clip_seconds=settings.SCHEDULER_SHORT_CLIP_SECONDS,
+    lease_timeout=settings.SCHEDULER_LEASE_TIMEOUT,
+    dispatch_timeout=settings.SCHEDULER_DISPATCH_TIMEOUT,
+    max_attempts=settings.SCHEDULER_MAX_ATTEMPTS,
+    on_abandoned=_fail_abandoned_job
+)
+
+@celery.task
+def dispatch_pending_jobs():
+    """Periodically push queued jobs to workers in case a completion signal was lost."""
+    return {'status': 'success', 'dispatched': scheduler.dispatch()}
+
+@celery.task
+def rerender_subtitles(video_id: int):
+    """Burn the stored transcript back into a video without re-running Whisper."""
+    db = SessionLocal()
+    try:
+        video = db.query(Video).filter(Video.id == video_id).first()
+        if not video:
+            return {'status': 'error', 'message': 'Video not found'}
+
+        transcript = db.query(Transcript).filter(Transcript.video_id == video_id).first()
+        if not transcript:
+            return {'status': 'error', 'message': 'Video has no stored transcript'}
+
+        processor = _video_processor()
+        with event_recorder.stage(video.id, 'rerender_subtitles'):
+            video.processed_path = processor.render_subtitles(
+                video.file_path,
+                decode_segments(transcript.segments)
+            )
+        db.commit()
+        response_cache.invalidate_tags(*video_tags(video.niche_id))
+
+        return {
+            'status': 'success',
+            'video_id': video_id,
+            'processed_path': video.processed_path
+        }
+
+    finally:
+        db.close()
+        event_recorder.flush()
 
 @celery.task
 def upload_to_youtube(video_id: int, title: str = None, description: str = None, tags: list = None):
@@ -62,16 +278,30 @@ def upload_to_youtube(video_id: int, title: str = None, description: str = None,
             video_title = title or f"#{video.niche.name if video.niche else 'shorts'}"
             
             # Upload to YouTube
-            result = uploader.upload_video(
-                file_path=video.processed_path,
-                title=video_title,
-                description=description or '',
-                tags=tags or []
-            )
+            upload_started = time.perf_counter()
+            with event_recorder.stage(video.id, 'youtube_upload'), time_youtube_upload(video.processed_path):
+                with tracer.span('youtube_upload'):
+                    result = uploader.upload_video(
+                        file_path=video.processed_path,
+                        title=video_title,
+                        description=description or '',
+                        tags=tags or []
+                    )
+            metrics_collector.record_youtube_upload_time(video.id, time.perf_counter() - upload_started)
 
-            # Update video with YouTube URL
-            video.youtube_url = result['url']
+            # Update video with YouTube URL, counting the first successful upload in its
+            # niche. The conditional UPDATE decides "first" atomically, so concurrent
+            # uploads of one video count it once, in the niche it is in at that moment.
+            uploaded = {'youtube_url': result['url'], 'youtube_uploaded_at': datetime.utcnow()}
+            first_upload = db.execute(
+                update(Video).where(Video.id == video_id, Video.youtube_url.is_(None)).values(**uploaded)
+            ).rowcount == 1
+            if first_upload:
+                db.execute(niche_stats_delta(current_niche_id(video_id), successful_uploads=1))
+            else:
+                db.execute(update(Video).where(Video.id == video_id).values(**uploaded))
             db.commit()
+            response_cache.invalidate_tags(*video_tags(video.niche_id))
 
             return {
                 'status': 'success',
@@ -79,12 +309,112 @@ def upload_to_youtube(video_id: int, title: str = None, description: str = None,
                 'youtube_url': result['url']
             }
         except Exception as e:
+            db.rollback()
             video.status = 'upload_failed'
             db.commit()
+            response_cache.invalidate_tags(*video_tags(video.niche_id))
             raise e
 
     finally:
         db.close()
+        event_recorder.flush()
+
+@celery.task
+def rebuild_niche_stats():
+    """Rebuild the niche_stats rollup from the videos table to correct any drift."""
+    db = SessionLocal()
+    try:
+        for statement in rebuild_statements(db.get_bind().dialect.name):
+            db.execute(statement)
+        db.commit()
+        response_cache.invalidate_tags("niches")
+        return {'status': 'success'}
+    finally:
+        db.close()
+
+@celery.task
+def refresh_youtube_stats():
+    """Snapshot YouTube view/like counts for uploaded videos that are due a refresh.
+
+    Each videos.list batch is stored on its own, so a failed batch only
+    leaves its videos due for the next run.
+    """
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        due = {
+            youtube_video_id(row.youtube_url): row.id
+            for row in db.execute(videos_due_for_refresh_query(now))
+            if youtube_video_id(row.youtube_url)
+        }
+        if not due:
+            return {'status': 'success', 'refreshed': 0}
+
+        refreshed = stored = 0
+        for batch, statistics in YouTubeUploader().iter_video_statistics(list(due)):
+            video_ids = [due[yt_id] for yt_id in batch]
+            try:
+                # Videos YouTube no longer returns get an empty snapshot so they back off like the rest
+                db.add_all([
+                    YouTubeStatsSnapshot(
+                        video_id=due[yt_id],
+                        views=statistics.get(yt_id, {}).get('views'),
+                        likes=statistics.get(yt_id, {}).get('likes'),
+                        fetched_at=now
+                    )
+                    for yt_id in batch
+                ])
+                # Bookkeeping only; leave updated_at alone so delta polls don't resend these videos
+                db.execute(
+                    update(Video)
+                    .where(Video.id.in_(video_ids))
+                    .values(youtube_stats_fetched_at=now, updated_at=Video.updated_at)
+                    .execution_options(synchronize_session=False)
+                )
+                db.commit()
+                refreshed += len(statistics)
+                stored += len(batch)
+            except Exception as e:
+                db.rollback()
+                logger.error("Failed to store YouTube stats batch", exc_info=e, video_ids=video_ids)
+
+        response_cache.invalidate_tags("videos")
+        # Videos of failed batches are still due and are retried next run
+        return {'status': 'success', 'refreshed': refreshed, 'failed': len(due) - stored}
+
+    finally:
+        db.close()
+
+@celery.task
+def prune_youtube_stats_snapshots():
+    """Drop snapshots past the retention window, keeping each video's latest one."""
+    db = SessionLocal()
+    try:
+        cutoff = datetime.utcnow() - timedelta(days=settings.YOUTUBE_STATS_RETENTION_DAYS)
+        latest = select(Video.youtube_stats_fetched_at).where(
+            Video.id == YouTubeStatsSnapshot.video_id
+        ).scalar_subquery()
+        deleted = db.execute(
+            delete(YouTubeStatsSnapshot)
+            .where(YouTubeStatsSnapshot.fetched_at < cutoff, YouTubeStatsSnapshot.fetched_at < latest)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        return {'status': 'success', 'deleted': deleted}
+    finally:
+        db.close()
+
+@celery.task
+def prune_video_tombstones():
+    """Forget deletions older than the window delta polls are expected to catch up within."""
+    db = SessionLocal()
+    try:
+        cutoff = datetime.utcnow() - timedelta(days=settings.VIDEO_TOMBSTONE_RETENTION_DAYS)
+        deleted = db.query(VideoTombstone).filter(VideoTombstone.deleted_at < cutoff).delete()
+        db.commit()
+        return {'status': 'success', 'deleted': deleted}
+    finally:
+        db.close()
 
 @celery.task
 def cleanup_video_files(video_id: int):
@@ -110,4 +440,32 @@ def cleanup_video_files(video_id: int):
         return {'status': 'success', 'video_id': video_id}
 
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+@celery.task
+def trim_metrics():
+    """Delete metric buckets and counters that are past their retention."""
+    return {'status': 'success', 'deleted': metrics_collector.trim()}
+
+@celery.task
+def rollup_metrics():
+    """Compact closed minute buckets and fold them into the hour and day tiers."""
+    return {'status': 'success', 'minutes': metrics_collector.rollup()}
+
+@celery.task
+def persist_daily_metrics_report(report_date: str = None):
+    """Store one day's metrics in Postgres (yesterday by default); re-running a day replaces it."""
+    day = date.fromisoformat(report_date) if report_date else date.today() - timedelta(days=1)
+    report = metrics_collector.collect_daily_metrics(day)
+    db = SessionLocal()
+    try:
+        row = db.query(DailyMetricsReport).filter(DailyMetricsReport.report_date == day).first()
+        if row is None:
+            row = DailyMetricsReport(report_date=day)
+            db.add(row)
+        for field, value in report.items():
+            setattr(row, field, value)
+        db.commit()
+        return {'status': 'success', 'report_date': day.isoformat()}
+    finally:
+        db.close()
@@ -0,0 +1,43 @@
+"""Timing helpers for the benchmark-marked tests; figures are printed after the run."""
+import statistics
+import time
+from typing import Callable, Dict, List
+
+# Lines recorded through Bench, printed by conftest's terminal summary
+benchmark_results: List[str] = []
+
+class Bench:
+    """Times callables and records the figures for the end-of-run summary."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def record(self, label: str, **figures) -> None:
+        values = ", ".join(
+            f"{name}={value:.3f}" if isinstance(value, float) else f"{name}={value}"
+            for name, value in figures.items()
+        )
+        benchmark_results.append(f"{self.name} [{label}] {values}")
+
+    def time(self, label: str, fn: Callable[[], object], repeat: int = 100, warmup: int = 3,
+             **figures) -> Dict[str, float]:
+        """Call `fn` `repeat` times and record its mean, p50 and p95 in milliseconds."""
+        for _ in range(warmup):
+            fn()
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - start) * 1000)
+        result = summarize(samples)
+        self.record(label, **{f"{name}_ms": value for name, value in result.items()}, **figures)
+        return result
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    """Mean, p50 and p95 of a list of millisecond timings."""
+    ordered = sorted(samples_ms)
+    return {
+        "mean": statistics.fmean(ordered),
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    }
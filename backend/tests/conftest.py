@@ -0,0 +1,113 @@
+import os
+import sys
+import uuid
+from pathlib import Path
+import pytest
+from tests.bench import Bench, benchmark_results
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Throwaway PostgreSQL database the postgres-marked tests migrate and fill;
+# everything in its public schema is dropped first
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+# Redis the redis-marked tests may write to; they only touch keys under a random prefix
+TEST_REDIS_URL = os.getenv("TEST_REDIS_URL")
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "postgres: needs a PostgreSQL database in TEST_DATABASE_URL")
+    config.addinivalue_line("markers", "redis: needs a Redis server in TEST_REDIS_URL")
+    config.addinivalue_line("markers", "benchmark: measures performance; run with -m benchmark")
+
+def pytest_collection_modifyitems(config, items):
+    # Benchmarks are slow and only informative when asked for
+    run_benchmarks = "benchmark" in (config.getoption("markexpr") or "")
+    skip_benchmark = pytest.mark.skip(reason="benchmark; run with -m benchmark")
+    skip_postgres = pytest.mark.skip(reason="TEST_DATABASE_URL is not set")
+    skip_redis = pytest.mark.skip(reason="TEST_REDIS_URL is not set")
+    for item in items:
+        if "benchmark" in item.keywords and not run_benchmarks:
+            item.add_marker(skip_benchmark)
+        if "postgres" in item.keywords and not TEST_DATABASE_URL:
+            item.add_marker(skip_postgres)
+        if "redis" in item.keywords and not TEST_REDIS_URL:
+            item.add_marker(skip_redis)
+
+def pytest_terminal_summary(terminalreporter):
+    if benchmark_results:
+        terminalreporter.section("benchmarks")
+        for line in benchmark_results:
+            terminalreporter.write_line(line)
+
+@pytest.fixture
+def bench(request):
+    return Bench(request.node.name)
+
+def migrate(url: str) -> None:
+    """Run the Alembic migrations up to head against `url`."""
+    from alembic import command
+    from alembic.config import Config
+
+    # migrations/env.py reads the URL from DATABASE_URL
+    previous_url = os.environ.get("DATABASE_URL")
+    os.environ["DATABASE_URL"] = url
+    try:
+        config = Config(str(BACKEND_DIR / "alembic.ini"))
+        config.set_main_option("script_location", str(BACKEND_DIR / "migrations"))
+        command.upgrade(config, "head")
+    finally:
+        if previous_url is None:
+            os.environ.pop("DATABASE_URL", None)
+        else:
+            os.environ["DATABASE_URL"] = previous_url
+
+@pytest.fixture(scope="session")
+def pg_engine():
+    """Engine on TEST_DATABASE_URL with a fresh schema migrated to head."""
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(TEST_DATABASE_URL)
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE"))
+        conn.execute(text("CREATE SCHEMA public"))
+    migrate(TEST_DATABASE_URL)
+
+    yield engine
+    engine.dispose()
+
+@pytest.fixture(scope="session")
+def sqlite_engine(tmp_path_factory):
+    """Engine on a new SQLite file migrated to head."""
+    from sqlalchemy import create_engine
+
+    url = f"sqlite:///{tmp_path_factory.mktemp('db') / 'test.db'}"
+    migrate(url)
+    engine = create_engine(url)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def redis_prefix():
+    """Random key prefix for a redis-marked test; its keys are deleted afterwards."""
+    from redis import Redis
+
+    prefix = f"test:{uuid.uuid4().hex}:"
+    yield prefix
+    client = Redis.from_url(TEST_REDIS_URL)
+    keys = list(client.scan_iter(f"{prefix}*"))
+    if keys:
+        client.delete(*keys)
+    client.close()
+
+@pytest.fixture
+def test_redis_pools():
+    """RedisPools on TEST_REDIS_URL, for patching over the process-wide ones.
+
+    Tests using the asyncio client must `await pools.close()` on their own loop.
+    """
+    from utils.redis_pool import RedisPools
+
+    pools = RedisPools(TEST_REDIS_URL, max_connections=20, timeout=5.0)
+    yield pools
+    if pools._client is not None:
+        pools._client.close()
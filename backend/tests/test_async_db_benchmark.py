@@ -0,0 +1,104 @@
+"""Load test: concurrent request throughput with blocking vs async database access.
+
+Each simulated request reads a page of processed videos, either the old way
+(a sync Session inside an async handler, which blocks the event loop) or
+through the pooled async engine the routes use now. Requests share one event
+loop, as they do in a uvicorn worker.
+"""
+import asyncio
+import os
+import time
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from models import Video
+from tests.bench import summarize
+
+pytestmark = [pytest.mark.postgres, pytest.mark.benchmark]
+
+VIDEO_COUNT = 100_000
+REQUESTS = 500
+CONCURRENCY = 50
+# Stands in for the network round trip to a database on another host
+QUERY_LATENCY = 0.002  # seconds
+
+LATENCY = text("SELECT pg_sleep(:latency)").bindparams(latency=QUERY_LATENCY)
+PAGE = select(Video.id, Video.title, Video.created_at).where(
+    Video.status == "processed"
+).order_by(Video.created_at.desc(), Video.id.desc()).offset(1000).limit(20)
+
+@pytest.fixture(scope="module")
+def videos(pg_engine):
+    with pg_engine.begin() as conn:
+        conn.execute(text("TRUNCATE videos, niches, video_status_counts RESTART IDENTITY CASCADE"))
+        conn.execute(text("""
+            INSERT INTO videos (title, status, created_at)
+            SELECT 'video ' || i,
+                   CASE WHEN i % 10 = 0 THEN 'failed' ELSE 'processed' END,
+                   now() - i * interval '1 minute'
+            FROM generate_series(1, :videos) i
+        """), {"videos": VIDEO_COUNT})
+    with pg_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE videos"))
+    return pg_engine
+
+async def run_load(handler):
+    """Run REQUESTS calls of `handler`, CONCURRENCY at a time; return (requests/s, latencies in ms)."""
+    slots = asyncio.Semaphore(CONCURRENCY)
+    latencies = []
+
+    async def request():
+        async with slots:
+            start = time.perf_counter()
+            rows = await handler()
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert len(rows) == 20
+
+    start = time.perf_counter()
+    await asyncio.gather(*(request() for _ in range(REQUESTS)))
+    return REQUESTS / (time.perf_counter() - start), latencies
+
+def test_async_sessions_serve_more_concurrent_requests(videos, bench):
+    # database builds its engines from DATABASE_URL on import
+    from database import _async_url, _pool_kwargs
+
+    url = os.environ["TEST_DATABASE_URL"]
+
+    sync_engine = create_engine(url, **_pool_kwargs(url))
+    SyncSession = sessionmaker(bind=sync_engine)
+
+    async def blocking_handler():
+        with SyncSession() as db:
+            db.execute(LATENCY)
+            return db.execute(PAGE).all()
+
+    async def measure_async():
+        async_engine = create_async_engine(_async_url(url), **_pool_kwargs(_async_url(url)))
+        AsyncSessionFactory = sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False)
+
+        async def async_handler():
+            async with AsyncSessionFactory() as db:
+                await db.execute(LATENCY)
+                return (await db.execute(PAGE)).all()
+
+        try:
+            await run_load(async_handler)  # warm the pool
+            return await run_load(async_handler)
+        finally:
+            await async_engine.dispose()
+
+    try:
+        asyncio.run(run_load(blocking_handler))
+        blocking_rps, blocking_latencies = asyncio.run(run_load(blocking_handler))
+    finally:
+        sync_engine.dispose()
+    async_rps, async_latencies = asyncio.run(measure_async())
+
+    bench.record("sync session", requests_per_s=blocking_rps, **{
+        f"{name}_ms": value for name, value in summarize(blocking_latencies).items()
+    })
+    bench.record("async session", requests_per_s=async_rps, **{
+        f"{name}_ms": value for name, value in summarize(async_latencies).items()
+    })
+    assert async_rps > blocking_rps
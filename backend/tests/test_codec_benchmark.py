@@ -0,0 +1,92 @@
+"""Encode/decode time and stored size of cached payloads: PayloadCodec against plain JSON."""
+import json
+import random
+from datetime import datetime, timedelta
+import pytest
+from utils.codec import JsonCodec, PayloadCodec, payload_codec
+from utils.sketch import QuantileSketch
+
+def listing_page():
+    """A full /api/videos/processed page, as cached."""
+    now = datetime(2026, 10, 20)
+    return {
+        "items": [
+            {
+                "id": 100000 - i,
+                "title": f"clip_{i:05d}.mp4",
+                "status": "processed",
+                "processed_path": f"processed/20261020_{i:06d}_clip_{i:05d}.mp4",
+                "has_subtitles": i % 3 == 0,
+                "niche_id": i % 20 + 1,
+                "youtube_url": f"https://youtube.com/shorts/{i:011d}" if i % 4 == 0 else None,
+                "created_at": (now - timedelta(minutes=i)).isoformat(),
+                "updated_at": (now - timedelta(minutes=i, seconds=-30)).isoformat()
+            }
+            for i in range(100)
+        ],
+        "removed": [],
+        "nextCursor": "MTIzNDU2Nzg5MDp8OTk5MDA="
+    }
+
+def transcript():
+    """A two-minute transcript with its segment timings."""
+    rng = random.Random(39)
+    words = ["so", "today", "we", "are", "going", "to", "try", "the", "new", "recipe", "and",
+             "see", "if", "it", "actually", "works", "this", "is", "really", "good"]
+    segments = [
+        {"start": i * 2.5, "end": i * 2.5 + 2.4, "text": " ".join(rng.choices(words, k=8))}
+        for i in range(48)
+    ]
+    return {"videoId": 4242, "text": " ".join(s["text"] for s in segments), "segments": segments}
+
+def dashboard():
+    return {
+        "totalVideos": 183422, "processedVideos": 170931, "totalNiches": 24,
+        "averageProcessingTime": 41.37, "medianProcessingTime": 38.9, "p95ProcessingTime": 97.12
+    }
+
+def latency_sketch():
+    """A minute bucket of API latencies as MetricsCollector stores it."""
+    rng = random.Random(39)
+    sketch = QuantileSketch()
+    for _ in range(5000):
+        sketch.add(rng.lognormvariate(-3, 0.8))
+    return sketch.to_dict()
+
+PAYLOADS = {
+    "listing page": listing_page(),
+    "transcript": transcript(),
+    "dashboard": dashboard(),
+    "latency sketch": latency_sketch(),
+}
+
+CODECS = {
+    "compact json": PayloadCodec(JsonCodec.version, compress_threshold=float("inf")),
+    "msgpack": PayloadCodec(compress_threshold=float("inf")),
+    "msgpack+zlib": payload_codec,
+}
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("payload_name", PAYLOADS)
+def test_codec_size_and_speed(bench, payload_name):
+    payload = PAYLOADS[payload_name]
+    baseline = json.dumps(payload).encode("utf-8")
+    bench.time(f"{payload_name} json.dumps", lambda: json.dumps(payload).encode("utf-8"),
+               repeat=300, bytes=len(baseline))
+    bench.time(f"{payload_name} json.loads", lambda: json.loads(baseline), repeat=300)
+
+    sizes = {}
+    for codec_name, codec in CODECS.items():
+        data = codec.dumps(payload)
+        assert codec.loads(data) == payload
+        sizes[codec_name] = len(data)
+        bench.time(f"{payload_name} {codec_name} dumps", lambda: codec.dumps(payload),
+                   repeat=300, bytes=len(data), vs_json=len(data) / len(baseline))
+        bench.time(f"{payload_name} {codec_name} loads", lambda: codec.loads(data), repeat=300)
+
+    # What Cache stores is never bigger than the JSON it replaced
+    assert sizes["msgpack+zlib"] <= sizes["msgpack"] < len(baseline)
+
+def test_legacy_json_entries_still_decode():
+    for payload in PAYLOADS.values():
+        assert payload_codec.loads(json.dumps(payload).encode("utf-8")) == payload
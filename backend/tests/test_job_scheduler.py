@@ -0,0 +1,147 @@
+"""Dispatch order, lease renewal and reclaim of JobScheduler, with a controllable clock."""
+import pytest
+from redis import Redis
+from services import job_scheduler
+from services.job_scheduler import JobScheduler
+from tests.conftest import TEST_REDIS_URL
+
+pytestmark = pytest.mark.redis
+
+LEASE_TIMEOUT = 60
+DISPATCH_TIMEOUT = 600
+
+class Clock:
+    """Stands in for the time module inside job_scheduler."""
+
+    def __init__(self):
+        self.now = 1_800_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+class RecordingTask:
+    """Records apply_async calls instead of sending them to Celery."""
+
+    def __init__(self):
+        self.calls = []
+
+    def apply_async(self, args, priority, headers=None):
+        self.calls.append((args[0], priority))
+
+    @property
+    def video_ids(self):
+        return [video_id for video_id, _ in self.calls]
+
+class RecordingMetrics:
+    def __init__(self):
+        self.waits = []
+
+    def record_queue_wait(self, priority_class, video_id, duration):
+        self.waits.append((priority_class, video_id, duration))
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(job_scheduler, "time", clock)
+    return clock
+
+@pytest.fixture
+def scheduler(redis_prefix, clock):
+    client = Redis.from_url(TEST_REDIS_URL)
+    abandoned = []
+    scheduler = JobScheduler(
+        client, RecordingTask(), max_in_flight=2, lease_timeout=LEASE_TIMEOUT,
+        dispatch_timeout=DISPATCH_TIMEOUT, max_attempts=2, on_abandoned=abandoned.append,
+        metrics=RecordingMetrics(), key_prefix=redis_prefix
+    )
+    scheduler.abandoned = abandoned
+    yield scheduler
+    for stop in scheduler._heartbeats.values():
+        stop.set()
+    client.close()
+
+def submit(scheduler, monkeypatch, video_id: int, source: str, duration):
+    monkeypatch.setattr(scheduler, "probe_duration", lambda path: duration)
+    return scheduler.submit(video_id, f"/app/uploads/{video_id}.mp4", source=source)
+
+def lose_worker(scheduler, video_id: int) -> None:
+    """Stop a started job's heartbeat, as if its worker died."""
+    scheduler._heartbeats.pop(video_id).set()
+
+def test_dispatch_order_follows_virtual_deadlines(scheduler, monkeypatch, clock):
+    scheduler.max_in_flight = 0
+    submit(scheduler, monkeypatch, 1, "batch", 5.0)
+    clock.now += 1
+    submit(scheduler, monkeypatch, 2, "interactive", 120.0)
+    clock.now += 1
+    submit(scheduler, monkeypatch, 3, "interactive", 8.0)
+    clock.now += 1
+    submit(scheduler, monkeypatch, 4, "interactive", None)
+    assert scheduler.task.calls == []
+
+    scheduler.max_in_flight = 3
+    assert scheduler.dispatch() == 3
+    # Short interactive clips first, then the long one; the batch job waits out its penalty
+    assert scheduler.task.calls == [(3, 0), (4, 3), (2, 3)]
+    assert scheduler.get_queue_status() == {"pending": 1, "in_flight": 3, "max_in_flight": 3}
+
+def test_finished_job_frees_its_slot_for_the_next(scheduler, monkeypatch):
+    for video_id in (1, 2, 3):
+        submit(scheduler, monkeypatch, video_id, "interactive", 10.0)
+    assert scheduler.task.video_ids == [1, 2]
+
+    scheduler.mark_started(1)
+    scheduler.mark_finished(1)
+    assert scheduler.task.video_ids == [1, 2, 3]
+    assert scheduler.redis_client.exists(f"{scheduler.key_prefix}job:1") == 0
+    assert scheduler.metrics.waits[0][:2] == ("interactive_short", 1)
+
+def test_started_job_with_stale_lease_is_requeued(scheduler, monkeypatch, clock):
+    submit(scheduler, monkeypatch, 1, "interactive", 10.0)
+    scheduler.mark_started(1)
+    lose_worker(scheduler, 1)
+
+    clock.now += LEASE_TIMEOUT - 1
+    assert scheduler.dispatch() == 0
+    clock.now += 2
+    assert scheduler.dispatch() == 1
+    assert scheduler.task.video_ids == [1, 1]
+    assert scheduler.redis_client.hget(f"{scheduler.key_prefix}job:1", "attempts") == b"1"
+
+def test_queued_job_is_not_reclaimed_before_dispatch_timeout(scheduler, monkeypatch, clock):
+    submit(scheduler, monkeypatch, 1, "interactive", 10.0)
+
+    # Waiting in the broker well past the lease: no heartbeat yet, but not lost either
+    clock.now += LEASE_TIMEOUT * 5
+    assert scheduler.reclaim() == []
+    assert scheduler.dispatch() == 0
+    assert scheduler.task.video_ids == [1]
+
+    # Picked up late; from here on its heartbeat is what counts
+    scheduler.mark_started(1)
+    clock.now += DISPATCH_TIMEOUT
+    scheduler.redis_client.zadd(scheduler.in_flight_key, {"1": clock.now}, xx=True)  # a heartbeat
+    clock.now += LEASE_TIMEOUT - 1
+    assert scheduler.dispatch() == 0
+    assert scheduler.redis_client.hget(f"{scheduler.key_prefix}job:1", "attempts") is None
+
+def test_job_never_started_is_reclaimed_after_dispatch_timeout(scheduler, monkeypatch, clock):
+    submit(scheduler, monkeypatch, 1, "interactive", 10.0)
+
+    clock.now += DISPATCH_TIMEOUT + 1
+    assert scheduler.dispatch() == 1
+    assert scheduler.task.video_ids == [1, 1]
+    assert scheduler.redis_client.hget(f"{scheduler.key_prefix}job:1", "attempts") == b"1"
+
+def test_job_abandoned_after_max_attempts(scheduler, monkeypatch, clock):
+    submit(scheduler, monkeypatch, 1, "interactive", 10.0)
+    for _ in range(2):
+        scheduler.mark_started(1)
+        lose_worker(scheduler, 1)
+        clock.now += LEASE_TIMEOUT + 1
+        scheduler.dispatch()
+
+    assert scheduler.abandoned == [1]
+    assert scheduler.task.video_ids == [1, 1]
+    assert scheduler.get_queue_status()["in_flight"] == 0
+    assert scheduler.redis_client.exists(f"{scheduler.key_prefix}job:1") == 0
@@ -0,0 +1,142 @@
+"""Flushing, rollup, sealing and retention of MetricsCollector buckets, with a controllable clock."""
+import atexit
+import time
+import pytest
+from redis import Redis
+from utils import metrics
+from utils.metrics import MetricsCollector, MINUTE, HOUR, ROLLUP_FIELD
+from tests.conftest import TEST_REDIS_URL
+
+pytestmark = pytest.mark.redis
+
+class Clock:
+    """Stands in for the time module inside utils.metrics."""
+
+    def __init__(self, now: float):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Start of the current hour, so bucket expiry stays in Redis's future
+    now = time.time()
+    clock = Clock(now - now % HOUR)
+    monkeypatch.setattr(metrics, "time", clock)
+    return clock
+
+@pytest.fixture
+def workers(redis_prefix, clock):
+    """Two collectors on one Redis, as two worker processes would have."""
+    client = Redis.from_url(TEST_REDIS_URL)
+    collectors = []
+    for name in ("worker-a", "worker-b"):
+        collector = MetricsCollector(client, flush_interval=3600, flush_size=10**6, key_prefix=redis_prefix)
+        collector._worker = name
+        collectors.append(collector)
+    yield collectors
+    for collector in collectors:
+        atexit.unregister(collector.flush)
+    client.close()
+
+def record_minutes(workers, clock, start: float, minutes: int) -> None:
+    """One sample from the first worker and two from the second in each minute."""
+    first, second = workers
+    for i in range(minutes):
+        clock.now = start + i * MINUTE + 5
+        first.record_sample("latency", 0.1)
+        second.record_sample("latency", 0.2, count=2)
+        first.flush()
+        second.flush()
+
+def count(collector, days: float = 1) -> int:
+    return collector.get_sketches(["latency"], days)["latency"].count
+
+def fields(collector, resolution: int, bucket_start: float):
+    return set(collector.redis_client.hkeys(collector._bucket_key("latency", resolution, int(bucket_start))))
+
+def test_workers_write_separate_fields_that_merge(workers, clock):
+    base = clock.now
+    record_minutes(workers, clock, base, 3)
+
+    assert fields(workers[0], MINUTE, base) == {b"worker-a", b"worker-b"}
+    assert count(workers[0]) == 9
+    assert workers[0].registered_metrics() == ["latency"]
+
+def test_rollup_counts_each_minute_once(workers, clock):
+    collector = workers[0]
+    base = clock.now
+    record_minutes(workers, clock, base, 10)
+    collector.redis_client.set(collector.rollup_key, int(base - MINUTE))
+
+    clock.now = base + 15 * MINUTE
+    # Minutes are rolled up once they are rollup_delay past their end
+    assert collector.rollup() == 13
+    assert fields(collector, MINUTE, base) == {ROLLUP_FIELD.encode()}
+    assert fields(collector, HOUR, base) == {ROLLUP_FIELD.encode()}
+    assert count(collector) == 30
+    assert collector.rollup() == 0
+    assert count(collector) == 30
+
+    # Once the hour is complete, queries read it instead of its minutes
+    clock.now = base + 2 * HOUR + 5 * MINUTE
+    assert collector.rollup() > 0
+    assert (HOUR, int(base)) in collector._window_buckets(
+        int(clock.now) - 3 * HOUR, int(clock.now) - 1, collector._rolled_up_until()
+    )
+    assert count(collector) == 30
+
+def test_late_flush_to_a_sealed_minute_is_rejected(workers, clock):
+    collector = workers[0]
+    late = MetricsCollector(collector.redis_client, flush_interval=3600, key_prefix=collector.metrics_key_prefix)
+    late._worker = "worker-late"
+    atexit.unregister(late.flush)
+    base = clock.now
+    record_minutes(workers, clock, base, 5)
+    collector.redis_client.set(collector.rollup_key, int(base - MINUTE))
+    clock.now = base + 6 * MINUTE
+    assert collector.rollup() == 4
+
+    # A worker that fell behind flushes a minute the rollup already read
+    clock.now = base + 2 * MINUTE + 30
+    late.record_sample("latency", 5.0)
+    late.flush()
+    assert fields(late, MINUTE, base + 2 * MINUTE) == {ROLLUP_FIELD.encode()}
+
+    # Minutes after the seal still take writes
+    clock.now = base + 4 * MINUTE + 30
+    late.record_sample("latency", 5.0)
+    late.flush()
+    assert b"worker-late" in fields(late, MINUTE, base + 4 * MINUTE)
+
+    clock.now = base + 6 * MINUTE
+    assert count(collector) == 16
+
+def test_trim_deletes_buckets_past_retention(workers, clock):
+    collector = workers[0]
+    base = clock.now
+    record_minutes(workers, clock, base, 2)
+    key = collector._bucket_key("latency", MINUTE, int(base))
+
+    clock.now = base + collector.retention[MINUTE] - 1
+    assert collector.trim() == 0
+    clock.now = base + collector.retention[MINUTE] + MINUTE
+    assert collector.trim() == 2
+    assert collector.redis_client.exists(key) == 0
+    assert collector.redis_client.zcard(collector.bucket_index_key) == 0
+
+def test_outcomes_and_processing_times_reach_the_report(workers, clock):
+    collector = workers[0]
+    clock.now += 5
+    for success in (True, True, True, False):
+        collector.record_processing_outcome(1, success)
+    collector.record_processing_time(1, 40.0)
+    collector.record_upload_size(1, 5_000_000)
+    collector.flush()
+
+    processing = collector.get_processing_metrics(days=1)
+    assert processing["total_videos_processed"] == 4
+    assert processing["success_rate"] == 75
+    assert processing["average_processing_time"] == pytest.approx(40.0)
+    assert collector.get_storage_metrics(days=1)["total_storage_used"] == 5_000_000
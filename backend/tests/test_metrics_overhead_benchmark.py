@@ -0,0 +1,111 @@
+"""Per-request cost of the RequestMetrics middleware and per-observation cost of the Prometheus histograms."""
+import asyncio
+import atexit
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+import pytest
+from redis import Redis
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from middleware.metrics import RequestMetrics
+from utils.metrics import MetricsCollector
+
+pytestmark = pytest.mark.benchmark
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+REQUESTS = 20_000
+CONCURRENCY = 200
+
+async def get_video(request):
+    await asyncio.sleep(0)  # yield like a real handler, so requests overlap
+    return PlainTextResponse("ok")
+
+def make_app():
+    return Starlette(routes=[Route("/api/videos/{video_id}", get_video)])
+
+@pytest.fixture
+def collectors():
+    """Build MetricsCollectors that never flush; the Redis URL is only needed to construct them."""
+    built = []
+
+    def build():
+        redis_client = Redis.from_url(os.getenv("TEST_REDIS_URL", "redis://localhost:6379/15"))
+        built.append(MetricsCollector(redis_client, flush_interval=3600, flush_size=REQUESTS * 10))
+        return built[-1]
+
+    yield build
+    for collector in built:
+        atexit.unregister(collector.flush)
+
+async def serve(app) -> tuple:
+    """Send REQUESTS GETs through `app`, CONCURRENCY at a time; return (µs per request, last headers)."""
+    headers = {}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            headers.update({name.decode(): value.decode() for name, value in message["headers"]})
+
+    async def request(i: int):
+        await app({
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": "GET", "scheme": "http", "path": f"/api/videos/{i}", "raw_path": f"/api/videos/{i}".encode(),
+            "query_string": b"", "root_path": "", "headers": [], "client": ("127.0.0.1", 50000),
+            "server": ("testserver", 80)
+        }, receive, send)
+
+    start = time.perf_counter()
+    for offset in range(0, REQUESTS, CONCURRENCY):
+        await asyncio.gather(*(request(i) for i in range(offset, offset + CONCURRENCY)))
+    return (time.perf_counter() - start) / REQUESTS * 1e6, headers
+
+def test_request_metrics_overhead(bench, collectors):
+    bare_us, _ = asyncio.run(serve(make_app()))
+
+    timed = RequestMetrics(make_app(), collector=collectors(), sample_threshold=0)
+    timed_us, headers = asyncio.run(serve(timed))
+    assert "server-timing" in headers
+
+    sampled = RequestMetrics(make_app(), collector=collectors(), sample_threshold=CONCURRENCY // 2, sample_every=10)
+    sampled_us, _ = asyncio.run(serve(sampled))
+
+    bench.record("bare app", us_per_request=bare_us)
+    bench.record("every request recorded", us_per_request=timed_us, overhead_us=timed_us - bare_us)
+    bench.record("sampling 1 in 10 above 100 in flight", us_per_request=sampled_us, overhead_us=sampled_us - bare_us)
+
+OBSERVE_SCRIPT = """
+import time
+from utils.prometheus import API_REQUEST_SECONDS
+n = 100000
+labelled = API_REQUEST_SECONDS.labels(method="GET", route="/api/videos/{video_id}", status="200")
+start = time.perf_counter()
+for _ in range(n):
+    API_REQUEST_SECONDS.labels(method="GET", route="/api/videos/{video_id}", status="200").observe(0.012)
+with_labels = (time.perf_counter() - start) / n * 1e6
+start = time.perf_counter()
+for _ in range(n):
+    labelled.observe(0.012)
+print(with_labels, (time.perf_counter() - start) / n * 1e6)
+"""
+
+@pytest.mark.parametrize("mode", ["single process", "multiprocess"])
+def test_histogram_observe_cost(bench, mode, tmp_path):
+    """Run in a fresh interpreter, since the multiprocess mode is chosen at import."""
+    env = {**os.environ, "PYTHONPATH": str(BACKEND_DIR)}
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    if mode == "multiprocess":
+        env["PROMETHEUS_MULTIPROC_DIR"] = str(tmp_path)
+    output = subprocess.run(
+        [sys.executable, "-c", OBSERVE_SCRIPT], env=env, cwd=BACKEND_DIR,
+        capture_output=True, text=True, check=True
+    ).stdout
+    with_labels_us, observe_us = map(float, output.split())
+
+    bench.record(mode, labels_and_observe_us=with_labels_us, observe_us=observe_us)
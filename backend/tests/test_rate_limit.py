@@ -0,0 +1,161 @@
+"""Accounting of the sliding-window and leased rate limiters, with a controllable clock."""
+import asyncio
+import pytest
+from redis import Redis, ConnectionError as RedisConnectionError
+from redis.asyncio import Redis as AsyncRedis
+from utils import rate_limit
+from utils.rate_limit import SlidingWindowRateLimiter, LeasedRateLimiter
+from tests.conftest import TEST_REDIS_URL
+
+pytestmark = pytest.mark.redis
+
+PERIOD = 60
+
+class Clock:
+    """Stands in for the time module inside utils.rate_limit."""
+
+    def __init__(self):
+        self.now = 1_800_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit, "time", clock)
+    return clock
+
+@pytest.fixture
+def sliding(redis_prefix, clock):
+    client = Redis.from_url(TEST_REDIS_URL)
+    yield SlidingWindowRateLimiter(client, key_prefix=redis_prefix)
+    client.close()
+
+def run_leased(redis_prefix, scenario, processes: int = 1, **options):
+    """Run `scenario(*limiters)` with one LeasedRateLimiter per simulated process."""
+    async def main():
+        clients = [AsyncRedis.from_url(TEST_REDIS_URL) for _ in range(processes)]
+        try:
+            return await scenario(*(LeasedRateLimiter(client, key_prefix=redis_prefix, **options)
+                                    for client in clients))
+        finally:
+            for client in clients:
+                await client.close()
+    return asyncio.run(main())
+
+async def hits(limiter, count: int, limit: int = 100, key: str = "client"):
+    return [await limiter.hit(key, limit, PERIOD) for _ in range(count)]
+
+def window_size(redis_prefix: str, key: str = "client") -> int:
+    client = Redis.from_url(TEST_REDIS_URL)
+    try:
+        return client.zcard(f"{redis_prefix}{key}")
+    finally:
+        client.close()
+
+def test_sliding_window_admits_exactly_the_limit(sliding, clock):
+    results = [sliding.hit("client", 5, PERIOD) for _ in range(7)]
+    assert [result.allowed for result in results] == [True] * 5 + [False] * 2
+    assert [result.remaining for result in results[:5]] == [4, 3, 2, 1, 0]
+    assert results[-1].headers()["Retry-After"] == str(PERIOD)
+
+    # Requests leave the window one period after they were admitted
+    clock.now += PERIOD - 1
+    assert not sliding.hit("client", 5, PERIOD).allowed
+    clock.now += 1.001
+    assert sliding.hit("client", 5, PERIOD).allowed
+
+def test_sliding_window_keys_are_independent_and_resettable(sliding):
+    assert all(sliding.hit("a", 2, PERIOD).allowed for _ in range(2))
+    assert not sliding.hit("a", 2, PERIOD).allowed
+    assert sliding.hit("b", 2, PERIOD).allowed
+
+    assert sliding.reset("a")
+    assert sliding.hit("a", 2, PERIOD).allowed
+
+def test_leased_limiters_share_the_limit(redis_prefix, clock):
+    async def scenario(*limiters):
+        results = []
+        for _ in range(80):
+            for limiter in limiters:
+                results.append(await limiter.hit("client", 100, PERIOD))
+        return results, limiters
+
+    results, limiters = run_leased(redis_prefix, scenario, processes=2)
+    assert sum(result.allowed for result in results) == 100
+    assert window_size(redis_prefix) == 100
+    # Blocks of 10: most requests are decided locally
+    assert sum(limiter.counters["leases"] for limiter in limiters) <= 12
+    assert sum(limiter.counters["local"] for limiter in limiters) == 100
+    assert not any(limiter.counters["fallback"] for limiter in limiters)
+
+def test_full_window_is_not_asked_again_until_it_resets(redis_prefix, clock):
+    async def scenario(limiter):
+        admitted = await hits(limiter, 10, limit=10)
+        leases = limiter.counters["leases"]
+        denied = await hits(limiter, 5, limit=10)
+        asked_again = limiter.counters["leases"] - leases
+        clock.now += PERIOD + 1
+        return admitted, denied, asked_again, await limiter.hit("client", 10, PERIOD)
+
+    admitted, denied, asked_again, later = run_leased(redis_prefix, scenario, block_fraction=0.5)
+    assert all(result.allowed for result in admitted)
+    assert not any(result.allowed for result in denied)
+    assert denied[-1].reset_after > 0
+    # Only the first denied request went to Redis
+    assert asked_again == 1
+    assert later.allowed
+
+def test_lease_is_renewed_in_the_background(redis_prefix, clock):
+    async def scenario(limiter):
+        await hits(limiter, 5)
+        bucket = limiter._buckets["client"]
+        tokens_before = bucket.tokens
+        # Half a block left: this request is served locally and starts a refill
+        result = await limiter.hit("client", 100, PERIOD)
+        refill = bucket.refill
+        await refill
+        return tokens_before, result, bucket.tokens, limiter.counters["leases"]
+
+    tokens_before, result, tokens_after, leases = run_leased(redis_prefix, scenario)
+    assert tokens_before == 5
+    assert result.allowed
+    assert tokens_after == 4 + 10
+    assert leases == 2
+    assert window_size(redis_prefix) == 20
+
+def test_unspent_lease_expires_after_its_period(redis_prefix, clock):
+    async def scenario(limiter):
+        await hits(limiter, 1)
+        clock.now += PERIOD
+        result = await limiter.hit("client", 100, PERIOD)
+        return result, limiter._buckets["client"].tokens, limiter.counters["leases"]
+
+    result, tokens, leases = run_leased(redis_prefix, scenario)
+    # The 9 slots left from the first block were dropped, not spent
+    assert result.allowed
+    assert tokens == 9
+    assert leases == 2
+    assert window_size(redis_prefix) == 10
+
+def test_redis_errors_fall_back_to_local_limits(redis_prefix, clock):
+    async def unreachable(keys, args):
+        raise RedisConnectionError("Connection refused")
+
+    async def scenario(limiter):
+        limiter._script = unreachable
+        results = await hits(limiter, 30)
+        degraded = limiter.degraded
+        clock.now += limiter.retry_interval
+        return results, degraded, limiter.degraded, limiter.counters
+
+    results, degraded, still_degraded, counters = run_leased(redis_prefix, scenario)
+    # Each process allows fallback_fraction of the limit on its own
+    assert sum(result.allowed for result in results) == 25
+    assert degraded and not still_degraded
+    assert counters["redis_errors"] == 1
+    assert counters["fallback"] == 30
@@ -0,0 +1,86 @@
+"""Rate limiter throughput at high request rates, and that the shared limit holds under load."""
+import asyncio
+import os
+import time
+import uuid
+import pytest
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+from utils.rate_limit import SlidingWindowRateLimiter, LeasedRateLimiter
+
+pytestmark = [pytest.mark.redis, pytest.mark.benchmark]
+
+HITS = 20_000
+CONCURRENCY = 200
+PROCESSES = 4  # API processes sharing one limit, each with its own LeasedRateLimiter
+PERIOD = 60  # seconds; longer than any run, so nothing leaves the window mid-test
+
+@pytest.fixture
+def key_prefix():
+    prefix = f"bench:{uuid.uuid4().hex}:"
+    yield prefix
+    client = Redis.from_url(os.environ["TEST_REDIS_URL"])
+    keys = list(client.scan_iter(f"{prefix}*"))
+    if keys:
+        client.delete(*keys)
+    client.close()
+
+def test_sliding_window_throughput(bench, key_prefix):
+    """One script call per request, as utils.cache.RateLimiter uses it."""
+    client = Redis.from_url(os.environ["TEST_REDIS_URL"])
+    limiter = SlidingWindowRateLimiter(client, key_prefix=key_prefix)
+    limit = HITS // 4
+    try:
+        start = time.perf_counter()
+        allowed = sum(limiter.hit("client", limit, PERIOD).allowed for _ in range(HITS))
+        elapsed = time.perf_counter() - start
+    finally:
+        client.close()
+
+    bench.record("sync, 1 round trip per hit", hits_per_s=HITS / elapsed, allowed=allowed, limit=limit)
+    assert allowed == limit
+
+async def leased_run(key_prefix: str, limit: int):
+    """HITS requests spread over PROCESSES limiters, CONCURRENCY at a time."""
+    clients = [AsyncRedis.from_url(os.environ["TEST_REDIS_URL"]) for _ in range(PROCESSES)]
+    limiters = [LeasedRateLimiter(client, key_prefix=key_prefix) for client in clients]
+    slots = asyncio.Semaphore(CONCURRENCY)
+    allowed = 0
+
+    async def request(i: int):
+        nonlocal allowed
+        async with slots:
+            result = await limiters[i % PROCESSES].hit("client", limit, PERIOD)
+            allowed += result.allowed
+
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(request(i) for i in range(HITS)))
+        elapsed = time.perf_counter() - start
+    finally:
+        for client in clients:
+            await client.close()
+    leases = sum(limiter.counters["leases"] for limiter in limiters)
+    fallbacks = sum(limiter.counters["fallback"] for limiter in limiters)
+    return HITS / elapsed, allowed, leases, fallbacks, limiters[0].block_size(limit)
+
+def test_leased_throughput_under_limit(bench, key_prefix):
+    """The middleware path while clients stay under their limit."""
+    limit = HITS * 2
+    hits_per_s, allowed, leases, fallbacks, _ = asyncio.run(leased_run(key_prefix, limit))
+
+    bench.record("async leased, under limit", hits_per_s=hits_per_s,
+                 hits_per_round_trip=HITS / max(leases, 1), allowed=allowed)
+    assert fallbacks == 0
+    assert allowed == HITS
+
+def test_leased_limit_holds_across_processes(bench, key_prefix):
+    """Over the limit, the processes together never admit more than it."""
+    limit = HITS // 10
+    hits_per_s, allowed, leases, fallbacks, block = asyncio.run(leased_run(key_prefix, limit))
+
+    bench.record("async leased, over limit", hits_per_s=hits_per_s,
+                 hits_per_round_trip=HITS / max(leases, 1), allowed=allowed, limit=limit)
+    assert fallbacks == 0
+    # At most one unused block per process goes to waste
+    assert limit - PROCESSES * block <= allowed <= limit
@@ -0,0 +1,84 @@
+"""Slot accounting, lease expiry and renewal of the Redis semaphores."""
+import asyncio
+import time
+import pytest
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+from utils.semaphore import DistributedSemaphore, AsyncDistributedSemaphore, SemaphoreTimeout
+from tests.conftest import TEST_REDIS_URL
+
+pytestmark = pytest.mark.redis
+
+LEASE_TTL = 0.3  # seconds; leases are timed on the Redis server's clock
+
+@pytest.fixture
+def make_semaphore(redis_prefix):
+    """Build DistributedSemaphores on one key, as separate workers would."""
+    clients = []
+
+    def make(limit: int, lease_ttl: float = LEASE_TTL) -> DistributedSemaphore:
+        clients.append(Redis.from_url(TEST_REDIS_URL))
+        semaphore = DistributedSemaphore(clients[-1], "heavy", limit, lease_ttl=lease_ttl, poll_interval=0.02)
+        semaphore.key = f"{redis_prefix}heavy"
+        return semaphore
+
+    yield make
+    for client in clients:
+        client.close()
+
+def test_limit_is_shared_between_workers(make_semaphore):
+    first, second = make_semaphore(2, lease_ttl=30), make_semaphore(2, lease_ttl=30)
+    assert first.try_acquire("a")
+    assert second.try_acquire("b")
+    assert not second.try_acquire("c")
+    # A holder asking again keeps its slot rather than taking a second one
+    assert first.try_acquire("a")
+    assert first.in_use() == 2
+
+    first.release("a")
+    assert second.try_acquire("c")
+    assert second.in_use() == 2
+
+def test_acquire_times_out_when_no_slot_frees(make_semaphore):
+    semaphore = make_semaphore(1, lease_ttl=30)
+    semaphore.acquire(holder="a")
+    start = time.monotonic()
+    with pytest.raises(SemaphoreTimeout):
+        semaphore.acquire(timeout=0.1)
+    assert time.monotonic() - start < 1
+
+def test_expired_lease_is_reclaimed(make_semaphore):
+    crashed, other = make_semaphore(1), make_semaphore(1)
+    assert crashed.try_acquire("crashed")
+    assert not other.try_acquire("other")
+
+    # Nobody renews the crashed holder's lease
+    time.sleep(LEASE_TTL + 0.1)
+    assert other.in_use() == 0
+    assert other.try_acquire("other")
+    assert not crashed._renew_script(keys=[crashed.key], args=crashed._renew_args("crashed"))
+
+def test_held_slot_is_renewed_until_released(make_semaphore):
+    holder, other = make_semaphore(1), make_semaphore(1)
+    with holder.hold(timeout=1) as held:
+        time.sleep(LEASE_TTL * 3)
+        assert not other.try_acquire("other")
+        assert holder.in_use() == 1
+    assert holder.redis_client.zscore(holder.key, held) is None
+    assert other.try_acquire("other")
+
+def test_async_semaphore_fails_fast_and_renews(redis_prefix):
+    async def scenario():
+        client = AsyncRedis.from_url(TEST_REDIS_URL)
+        semaphore = AsyncDistributedSemaphore(client, "requests", 1, lease_ttl=LEASE_TTL, poll_interval=0.02)
+        semaphore.key = f"{redis_prefix}requests"
+        try:
+            async with semaphore.hold(timeout=0):
+                await asyncio.sleep(LEASE_TTL * 3)
+                with pytest.raises(SemaphoreTimeout):
+                    await semaphore.acquire(timeout=0)
+            return await semaphore.try_acquire("next")
+        finally:
+            await client.close()
+
+    assert asyncio.run(scenario())
@@ -0,0 +1,65 @@
+"""Accuracy and merging of QuantileSketch."""
+import random
+import pytest
+from utils.codec import payload_codec
+from utils.sketch import QuantileSketch
+
+def sketch_of(values, **options) -> QuantileSketch:
+    sketch = QuantileSketch(**options)
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+def exact_quantile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+@pytest.fixture(scope="module")
+def latencies():
+    rng = random.Random(44)
+    return [rng.lognormvariate(-3, 1) for _ in range(20000)]
+
+def test_quantiles_within_relative_accuracy(latencies):
+    sketch = sketch_of(latencies)
+    for q in (0.5, 0.9, 0.95, 0.99):
+        assert sketch.quantile(q) == pytest.approx(exact_quantile(latencies, q), rel=0.01)
+    assert sketch.count == len(latencies)
+    assert sketch.mean() == pytest.approx(sum(latencies) / len(latencies))
+    assert (sketch.min, sketch.max) == (min(latencies), max(latencies))
+
+def test_merge_equals_sketch_of_all_values(latencies):
+    # As if four workers each sketched a share of the minute
+    parts = [sketch_of(latencies[i::4]) for i in range(4)]
+    merged = QuantileSketch.merged(parts)
+    whole = sketch_of(latencies)
+
+    assert merged.bins == whole.bins
+    assert merged.count == whole.count
+    assert (merged.min, merged.max) == (whole.min, whole.max)
+    assert merged.quantile(0.95) == whole.quantile(0.95)
+
+def test_merging_empty_and_zero_values():
+    sketch = sketch_of([0.0, 0.0, 0.5])
+    sketch.merge(QuantileSketch())
+    assert sketch.count == 3
+    assert sketch.quantile(0.1) == 0.0
+    assert QuantileSketch().quantile(0.5) is None
+
+def test_merge_rejects_different_accuracy():
+    with pytest.raises(ValueError):
+        QuantileSketch(relative_accuracy=0.01).merge(QuantileSketch(relative_accuracy=0.02))
+
+def test_bins_are_capped_without_losing_counts(latencies):
+    sketch = sketch_of(latencies, max_bins=64)
+    assert len(sketch.bins) <= 64
+    assert sum(sketch.bins.values()) + sketch.zero_count == len(latencies)
+    # Collapsing folds the lowest bins together; upper quantiles stay accurate
+    assert sketch.quantile(0.99) == pytest.approx(exact_quantile(latencies, 0.99), rel=0.01)
+
+def test_stored_form_round_trips(latencies):
+    sketch = sketch_of(latencies)
+    restored = QuantileSketch.from_dict(payload_codec.loads(payload_codec.dumps(sketch.to_dict())))
+    assert restored.bins == sketch.bins
+    assert restored.quantile(0.5) == sketch.quantile(0.5)
+    assert (restored.count, restored.min, restored.max) == (sketch.count, sketch.min, sketch.max)
+    assert restored.sum == pytest.approx(sketch.sum)
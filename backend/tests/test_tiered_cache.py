@@ -0,0 +1,132 @@
+"""Single-flight loading and tag invalidation in TieredCache, across two simulated processes."""
+import asyncio
+import time
+import pytest
+import utils.cache
+import utils.tiered_cache
+from utils.tiered_cache import TieredCache
+
+pytestmark = pytest.mark.redis
+
+LOCK_TIMEOUT = 5.0  # seconds; waiters must be done long before this
+
+@pytest.fixture
+def make_cache(monkeypatch, test_redis_pools, redis_prefix):
+    """Build TieredCaches sharing one Redis, as two API processes would."""
+    monkeypatch.setattr(utils.tiered_cache, "redis_pools", test_redis_pools)
+    monkeypatch.setattr(utils.tiered_cache, "redis_client", test_redis_pools.client())
+    monkeypatch.setattr(utils.cache, "redis_client", test_redis_pools.client())
+
+    def make():
+        cache = TieredCache(lock_timeout=LOCK_TIMEOUT, poll_interval=0.01)
+        cache.key_prefix = redis_prefix
+        return cache
+
+    return make
+
+def run(pools, coroutine):
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await pools.close()
+    return asyncio.run(main())
+
+def test_concurrent_misses_load_once(make_cache, test_redis_pools):
+    first, second = make_cache(), make_cache()
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.1)
+        return {"total": 42}
+
+    async def scenario():
+        return await asyncio.gather(*(
+            cache.get_or_set("dashboard", loader, ttl=60, tags=("videos",))
+            for cache in (first, second) for _ in range(5)
+        ))
+
+    results = run(test_redis_pools, scenario())
+    assert results == [{"total": 42}] * 10
+    assert calls == 1
+    assert second.stats()["lock_waits"] + first.stats()["lock_waits"] == 1
+
+def test_waiter_takes_over_from_failing_leader(make_cache, test_redis_pools):
+    leader, waiter = make_cache(), make_cache()
+
+    async def failing_loader():
+        await asyncio.sleep(0.1)
+        raise RuntimeError("database went away")
+
+    async def loader():
+        return "fresh"
+
+    async def scenario():
+        leading = asyncio.ensure_future(leader.get_or_set("dashboard", failing_loader, ttl=60))
+        await asyncio.sleep(0.02)
+        start = time.monotonic()
+        value = await waiter.get_or_set("dashboard", loader, ttl=60)
+        with pytest.raises(RuntimeError):
+            await leading
+        return value, time.monotonic() - start
+
+    value, waited = run(test_redis_pools, scenario())
+    assert value == "fresh"
+    assert waiter.stats()["lock_waits"] == 1
+    assert waiter.stats()["loads"] == 1
+    assert waited < LOCK_TIMEOUT / 2
+
+def test_stale_load_is_not_stored_and_waiter_reloads(make_cache, test_redis_pools):
+    leader, waiter = make_cache(), make_cache()
+    version = "old"
+
+    async def slow_loader():
+        nonlocal version
+        value = version
+        await asyncio.sleep(0.1)
+        # A video changes while this load is still running
+        version = "new"
+        leader.invalidate_tags("videos")
+        return value
+
+    async def loader():
+        return version
+
+    async def scenario():
+        leading = asyncio.ensure_future(leader.get_or_set("dashboard", slow_loader, ttl=60, tags=("videos",)))
+        await asyncio.sleep(0.02)
+        start = time.monotonic()
+        waited_value = await waiter.get_or_set("dashboard", loader, ttl=60, tags=("videos",))
+        waited = time.monotonic() - start
+        leader_value = await leading
+        later_value = await leader.get_or_set("dashboard", slow_loader, ttl=60, tags=("videos",))
+        return leader_value, waited_value, later_value, waited
+
+    leader_value, waited_value, later_value, waited = run(test_redis_pools, scenario())
+    # The leader still answers its own caller, but its result never reaches Redis
+    assert leader_value == "old"
+    assert leader.stats()["stale_loads"] == 1
+    assert waited_value == "new"
+    assert waited < LOCK_TIMEOUT / 2
+    assert later_value == "new"
+    assert leader.stats()["loads"] == 1
+
+def test_invalidation_drops_keys_in_both_tiers(make_cache, test_redis_pools):
+    cache = make_cache()
+    calls = []
+
+    async def loader():
+        calls.append(len(calls))
+        return len(calls)
+
+    async def scenario():
+        first = await cache.get_or_set("niche-page", loader, ttl=60, tags=("videos", "niche:5"))
+        cached = await cache.get_or_set("niche-page", loader, ttl=60, tags=("videos", "niche:5"))
+        cache.invalidate_tags("niche:5")
+        reloaded = await cache.get_or_set("niche-page", loader, ttl=60, tags=("videos", "niche:5"))
+        return first, cached, reloaded
+
+    assert run(test_redis_pools, scenario()) == (1, 1, 2)
+    assert cache.get("niche-page") == 2
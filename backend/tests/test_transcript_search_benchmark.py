@@ -0,0 +1,135 @@
+"""Transcript search latency over 100k transcripts, on PostgreSQL (GIN) and SQLite (FTS5)."""
+import json
+import random
+import pytest
+from sqlalchemy import insert, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+from models import Video, Transcript
+from services.transcripts import encode_segments
+from services.transcript_search import index_transcript, postgres_search_query, sqlite_search_query
+
+pytestmark = pytest.mark.benchmark
+
+TRANSCRIPT_COUNT = 100_000
+NICHE_COUNT = 20
+WORDS_PER_TRANSCRIPT = 60
+VOCABULARY_SIZE = 5000
+PAGE_SIZE = 20
+
+# Zipf-like vocabulary: word 0 is in most transcripts, the last ones in a few
+VOCABULARY = [f"word{rank}" for rank in range(VOCABULARY_SIZE)]
+WEIGHTS = [1 / (rank + 1) for rank in range(VOCABULARY_SIZE)]
+
+QUERIES = {
+    "common term": dict(q="word1"),
+    "mid term": dict(q="word200"),
+    "rare term": dict(q="word4000"),
+    "two terms": dict(q="word3 word50"),
+    "niche filter": dict(q="word1", niche_id=7),
+    "status filter": dict(q="word200", status="processed"),
+}
+
+def transcripts(count: int):
+    rng = random.Random(35)
+    for video_id in range(1, count + 1):
+        words = rng.choices(VOCABULARY, WEIGHTS, k=WORDS_PER_TRANSCRIPT)
+        yield video_id, [
+            {"start": i * 2.0, "end": i * 2.0 + 2, "text": " ".join(words[i * 10:(i + 1) * 10])}
+            for i in range(WORDS_PER_TRANSCRIPT // 10)
+        ]
+
+def seed(engine):
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text(
+                "TRUNCATE videos, niches, video_status_counts, video_tombstones RESTART IDENTITY CASCADE"
+            ))
+        else:
+            for table in ("transcripts_fts", "transcripts", "videos", "niches", "video_status_counts", "video_tombstones"):
+                conn.execute(text(f"DELETE FROM {table}"))
+        conn.execute(
+            text("INSERT INTO niches (id, name) VALUES (:id, :name)"),
+            [{"id": n, "name": f"niche-{n}"} for n in range(1, NICHE_COUNT + 1)]
+        )
+        conn.execute(insert(Video), [
+            {
+                "id": video_id,
+                "title": f"video {video_id}",
+                "status": "failed" if video_id % 10 == 0 else "processed",
+                "niche_id": video_id % NICHE_COUNT + 1
+            }
+            for video_id in range(1, TRANSCRIPT_COUNT + 1)
+        ])
+
+    # Index through the same path the worker uses
+    with Session(engine) as db:
+        batch = []
+        for video_id, segments in transcripts(TRANSCRIPT_COUNT):
+            batch.append({"video_id": video_id, "segments": encode_segments(segments),
+                          "segment_count": len(segments)})
+            if len(batch) == 5000:
+                db.execute(insert(Transcript), batch)
+                batch = []
+        if batch:
+            db.execute(insert(Transcript), batch)
+        for video_id, segments in transcripts(TRANSCRIPT_COUNT):
+            index_transcript(db, video_id, " ".join(segment["text"] for segment in segments))
+        db.commit()
+
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM ANALYZE videos"))
+            conn.execute(text("VACUUM ANALYZE transcripts"))
+
+@pytest.fixture(scope="module", params=[
+    "sqlite",
+    pytest.param("postgresql", marks=pytest.mark.postgres)
+])
+def search_engine(request):
+    engine = request.getfixturevalue("sqlite_engine" if request.param == "sqlite" else "pg_engine")
+    seed(engine)
+    return engine
+
+def build_query(engine):
+    return postgres_search_query if engine.dialect.name == "postgresql" else sqlite_search_query
+
+def search(engine, q, niche_id=None, status=None, after=None):
+    with engine.connect() as conn:
+        return conn.execute(build_query(engine)(q, niche_id, status, after, PAGE_SIZE)).all()
+
+@pytest.mark.parametrize("label", QUERIES)
+def test_search_latency(search_engine, bench, label):
+    params = QUERIES[label]
+    rows = search(search_engine, **params)
+    assert rows
+    assert [(row.rank, row.id) for row in rows] == sorted(((row.rank, row.id) for row in rows), reverse=True)
+
+    bench.time(f"{search_engine.dialect.name} {label}", lambda: search(search_engine, **params),
+               repeat=30, matches=len(rows))
+
+def test_next_page_latency(search_engine, bench):
+    first = search(search_engine, "word1")
+    last = first[PAGE_SIZE - 1]
+    after = (last.rank, last.id)
+    second = search(search_engine, "word1", after=after)
+    assert second and not {row.id for row in first[:PAGE_SIZE]} & {row.id for row in second}
+
+    bench.time(f"{search_engine.dialect.name} next page",
+               lambda: search(search_engine, "word1", after=after), repeat=30)
+
+def test_search_uses_gin_index(search_engine):
+    if search_engine.dialect.name != "postgresql":
+        pytest.skip("the GIN index only exists on PostgreSQL")
+    sql = str(postgres_search_query("word200", None, None, None, PAGE_SIZE).compile(
+        dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+    ))
+    with search_engine.connect() as conn:
+        plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    nodes, stack = [], [plan[0]["Plan"]]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        stack.extend(node.get("Plans", []))
+    assert "ix_transcripts_search_vector" in {node.get("Index Name") for node in nodes}
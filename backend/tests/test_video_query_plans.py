@@ -0,0 +1,107 @@
+"""Check that the hot video queries use the indexes from migration 002 on a 1M-row table."""
+import json
+import pytest
+from sqlalchemy import text
+
+pytestmark = pytest.mark.postgres
+
+VIDEO_COUNT = 1_000_000
+NICHE_COUNT = 50
+
+@pytest.fixture(scope="module")
+def videos(pg_engine):
+    """1M videos over ~2 years: 90% processed, 10% on YouTube, spread over 50 niches."""
+    with pg_engine.begin() as conn:
+        conn.execute(text("TRUNCATE videos, niches, video_status_counts RESTART IDENTITY CASCADE"))
+        conn.execute(text(
+            "INSERT INTO niches (name, created_at) "
+            "SELECT 'niche-' || n, now() FROM generate_series(1, :niches) n"
+        ), {"niches": NICHE_COUNT})
+        conn.execute(text("""
+            INSERT INTO videos (title, file_path, processed_path, has_subtitles, status,
+                                created_at, updated_at, processing_started_at,
+                                processing_finished_at, niche_id, youtube_url)
+            SELECT 'video ' || i,
+                   '/app/uploads/' || i || '.mp4',
+                   '/app/processed/' || i || '.mp4',
+                   i % 3 = 0,
+                   CASE i % 20 WHEN 0 THEN 'failed' WHEN 1 THEN 'uploaded' ELSE 'processed' END,
+                   now() - i * interval '1 minute',
+                   now() - i * interval '1 minute',
+                   now() - i * interval '1 minute',
+                   now() - i * interval '1 minute' + interval '40 seconds',
+                   i % :niches + 1,
+                   CASE WHEN i % 10 = 0 THEN 'https://youtu.be/' || i END
+            FROM generate_series(1, :videos) i
+        """), {"niches": NICHE_COUNT, "videos": VIDEO_COUNT})
+    with pg_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE videos"))
+        conn.execute(text("ANALYZE niches"))
+    return pg_engine
+
+def plan_nodes(engine, sql: str, **params):
+    """Every node of the query's EXPLAIN plan, flattened."""
+    with engine.connect() as conn:
+        plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    nodes, stack = [], [plan[0]["Plan"]]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        stack.extend(node.get("Plans", []))
+    return nodes
+
+def assert_uses_index(nodes, index_name: str):
+    used = {node.get("Index Name") for node in nodes}
+    assert index_name in used, f"expected {index_name}, plan used {used - {None}}"
+    assert not any(
+        node["Node Type"] == "Seq Scan" and node.get("Relation Name") == "videos" for node in nodes
+    ), "videos is scanned sequentially"
+
+def test_processed_listing_first_page(videos):
+    nodes = plan_nodes(videos, """
+        SELECT id, title, created_at FROM videos
+        WHERE status = 'processed'
+        ORDER BY created_at DESC, id DESC LIMIT 21
+    """)
+    assert_uses_index(nodes, "ix_videos_status_created_at")
+
+def test_processed_listing_keyset_page(videos):
+    nodes = plan_nodes(videos, """
+        SELECT id, title, created_at FROM videos
+        WHERE status = 'processed' AND (created_at, id) < (now() - interval '300 days', 432000)
+        ORDER BY created_at DESC, id DESC LIMIT 21
+    """)
+    assert_uses_index(nodes, "ix_videos_status_created_at")
+
+def test_recent_videos(videos):
+    nodes = plan_nodes(videos, "SELECT id FROM videos ORDER BY created_at DESC LIMIT 10")
+    assert_uses_index(nodes, "ix_videos_created_at")
+
+def test_processing_history_range(videos):
+    nodes = plan_nodes(videos, """
+        SELECT date(created_at), count(id) FROM videos
+        WHERE created_at >= now() - interval '7 days'
+        GROUP BY date(created_at)
+    """)
+    assert_uses_index(nodes, "ix_videos_created_at")
+
+def test_videos_per_niche(videos):
+    nodes = plan_nodes(videos, "SELECT count(*) FROM videos WHERE niche_id = :niche_id", niche_id=7)
+    assert_uses_index(nodes, "ix_videos_niche_id")
+
+def test_uploads_per_niche(videos):
+    nodes = plan_nodes(videos, """
+        SELECT count(*) FROM videos WHERE niche_id = :niche_id AND youtube_url IS NOT NULL
+    """, niche_id=7)
+    assert_uses_index(nodes, "ix_videos_niche_id_uploaded")
+
+def test_delta_poll(videos):
+    # Delta polls span every status, so they can report videos leaving "processed"
+    nodes = plan_nodes(videos, """
+        SELECT id, title, status, updated_at FROM videos
+        WHERE updated_at > now() - interval '10 minutes'
+        ORDER BY created_at DESC, id DESC LIMIT 101
+    """)
+    assert_uses_index(nodes, "ix_videos_updated_at")
@@ -0,0 +1,46 @@
+"""Check that the video_status_counts triggers from migration 014 track every status change."""
+import pytest
+from sqlalchemy import text
+
+pytestmark = pytest.mark.postgres
+
+def status_counts(conn):
+    return dict(conn.execute(text("SELECT status, count FROM video_status_counts WHERE count <> 0")).all())
+
+def grouped_counts(conn):
+    return dict(conn.execute(text(
+        "SELECT COALESCE(status, ''), COUNT(*) FROM videos GROUP BY COALESCE(status, '')"
+    )).all())
+
+@pytest.fixture
+def conn(pg_engine):
+    with pg_engine.begin() as conn:
+        # TRUNCATE fires no row triggers, so reset the counts alongside the videos
+        conn.execute(text("TRUNCATE videos, video_status_counts RESTART IDENTITY CASCADE"))
+    with pg_engine.connect() as conn:
+        yield conn
+
+def test_counts_follow_inserts_updates_and_deletes(conn):
+    conn.execute(text(
+        "INSERT INTO videos (title, status) "
+        "SELECT 'video ' || i, CASE WHEN i % 4 = 0 THEN 'processed' ELSE 'uploaded' END "
+        "FROM generate_series(1, 100) i"
+    ))
+    assert status_counts(conn) == {"uploaded": 75, "processed": 25}
+
+    conn.execute(text("UPDATE videos SET status = 'processing' WHERE id <= 10 AND status = 'uploaded'"))
+    conn.execute(text("UPDATE videos SET status = status, title = 'renamed' WHERE id <= 20"))
+    conn.execute(text("UPDATE videos SET status = NULL WHERE id = 1"))
+    conn.execute(text("DELETE FROM videos WHERE id > 90"))
+    conn.commit()
+
+    assert status_counts(conn) == grouped_counts(conn)
+
+def test_rolled_back_changes_leave_counts_alone(conn):
+    conn.execute(text("INSERT INTO videos (title, status) VALUES ('kept', 'processed')"))
+    conn.commit()
+    conn.execute(text("INSERT INTO videos (title, status) VALUES ('dropped', 'processed')"))
+    conn.execute(text("UPDATE videos SET status = 'failed'"))
+    conn.rollback()
+
+    assert status_counts(conn) == {"processed": 1}
@@ -1,11 +1,13 @@
-from typing import Any, Optional
-import json
-from redis import Redis
-from datetime import timedelta
-import os
+from typing import Any, Callable, Optional
+import hashlib
+from datetime import date, datetime, timedelta
 from functools import wraps
+from utils.codec import payload_codec
+from utils.rate_limit import SlidingWindowRateLimiter
 
-redis_client = Redis.from_url(os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+from utils.redis_pool import redis_pools
+
+redis_client = redis_pools.client()
 
 class Cache:
     @staticmethod
@@ -15,7 +17,7 @@ class Cache:
             return redis_client.setex(
                 key,
                 timedelta(seconds=expire_in_seconds),
-                json.dumps(value)
+                payload_codec.dumps(value)
             )
         except Exception as e:
             print(f"Cache set error: {e}")
@@ -26,7 +28,7 @@ class Cache:
         """Get a cached value"""
         try:
             value = redis_client.get(key)
-            return json.loads(value) if value else None
+            return payload_codec.loads(value) if value else None
         except Exception as e:
             print(f"Cache get error: {e}")
             return None
@@ -40,13 +42,42 @@ class Cache:
             print(f"Cache delete error: {e}")
             return False
 
-def cached(expire_in_seconds: int = 3600):
-    """Decorator for caching function results"""
+def cache_key(namespace: str, *parts: Any, **params: Any) -> str:
+    """Build a stable cache key from primitive values.
+
+    Parts keep their order, params are sorted by name, and anything that is not
+    a primitive is rejected so keys never depend on object reprs.
+    """
+    values = [_key_part(part) for part in parts]
+    values += [f"{name}={_key_part(params[name])}" for name in sorted(params)]
+    key = ":".join([namespace] + values)
+    if len(key) > 200:
+        key = f"{namespace}:{hashlib.sha1(key.encode()).hexdigest()}"
+    return key
+
+def _key_part(value: Any) -> str:
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return ",".join(_key_part(v) for v in value)
+    raise TypeError(f"Cannot build a cache key from {type(value).__name__}")
+
+def cached(expire_in_seconds: int = 3600, key_builder: Optional[Callable[..., str]] = None):
+    """Decorator for caching function results
+
+    Keys come from key_builder(*args, **kwargs) when given, otherwise from the
+    function name and arguments via cache_key. Calls whose arguments cannot be
+    keyed (sessions, requests) run uncached instead of never hitting.
+    """
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            # Create a cache key from function name and arguments
-            key = f"{func.__name__}:{str(args)}:{str(kwargs)}"
+            try:
+                key = key_builder(*args, **kwargs) if key_builder else cache_key(func.__name__, *args, **kwargs)
+            except TypeError:
+                return await func(*args, **kwargs)
             
             # Try to get cached result
             cached_result = Cache.get(key)
@@ -71,18 +102,7 @@ class RateLimiter:
             period: Time period in seconds
         """
         try:
-            pipe = redis_client.pipeline()
-            current = pipe.get(f"ratelimit:{key}")
-            pipe.incr(f"ratelimit:{key}")
-            pipe.expire(f"ratelimit:{key}", period)
-            results = pipe.execute()
-            
-            # First request or expired key
-            if results[0] is None:
-                return True
-            
-            # Check if within limit
-            return int(results[0]) <= max_requests
+            return _rate_limiter.hit(key, max_requests, period).allowed
         except Exception as e:
             print(f"Rate limit error: {e}")
             return True  # Allow request on error
@@ -91,7 +111,9 @@ class RateLimiter:
     def reset_rate_limit(key: str) -> bool:
         """Reset rate limit counter for a key"""
         try:
-            return redis_client.delete(f"ratelimit:{key}") > 0
+            return _rate_limiter.reset(key)
         except Exception as e:
             print(f"Rate limit reset error: {e}")
-            return False
\ No newline at end of file
+            return False
+
+_rate_limiter = SlidingWindowRateLimiter(redis_client)
@@ -0,0 +1,67 @@
+import json
+import zlib
+from typing import Any, Dict
+import msgpack
+
+# Header byte layout: the low 7 bits name the codec, the high bit marks a
+# zlib-compressed body. Legacy JSON entries have no header and always start
+# with a printable character, so they never collide with a codec id.
+COMPRESSED_FLAG = 0x80
+
+class JsonCodec:
+    """Plain JSON, kept so entries can be rewritten in the old format if needed."""
+
+    version = 0x01
+
+    def encode(self, value: Any) -> bytes:
+        return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+    def decode(self, data: bytes) -> Any:
+        return json.loads(data)
+
+class MsgpackCodec:
+    """MessagePack: smaller than JSON and faster to build and parse."""
+
+    version = 0x02
+
+    def encode(self, value: Any) -> bytes:
+        return msgpack.packb(value, use_bin_type=True)
+
+    def decode(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False)
+
+CODECS: Dict[int, Any] = {codec.version: codec for codec in (JsonCodec(), MsgpackCodec())}
+
+class PayloadCodec:
+    """Versioned, optionally compressed encoding for cached payloads."""
+
+    def __init__(self, codec_version: int = MsgpackCodec.version,
+                 compress_threshold: int = 1024, compress_level: int = 1):
+        self.codec = CODECS[codec_version]
+        self.compress_threshold = compress_threshold
+        self.compress_level = compress_level
+
+    def dumps(self, value: Any) -> bytes:
+        """Encode a value with the configured codec, compressing large bodies."""
+        body = self.codec.encode(value)
+        header = self.codec.version
+        if len(body) >= self.compress_threshold:
+            compressed = zlib.compress(body, self.compress_level)
+            if len(compressed) < len(body):
+                body = compressed
+                header |= COMPRESSED_FLAG
+        return bytes([header]) + body
+
+    def loads(self, data: bytes) -> Any:
+        """Decode a value written by dumps() or a legacy json.dumps() entry."""
+        header = data[0]
+        codec = CODECS.get(header & ~COMPRESSED_FLAG)
+        if codec is None:
+            return json.loads(data)
+        body = data[1:]
+        if header & COMPRESSED_FLAG:
+            body = zlib.decompress(body)
+        return codec.decode(body)
+
+# Shared codec used by Cache
+payload_codec = PayloadCodec()
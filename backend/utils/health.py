@@ -3,11 +3,12 @@ import psutil
 import shutil
 from typing import Dict, Any
 from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 from redis import Redis
 from datetime import datetime
 
 class HealthCheck:
-    def __init__(self, db_session, redis_client: Redis):
+    def __init__(self, db_session: AsyncSession, redis_client: Redis):
         self.db_session = db_session
         self.redis_client = redis_client
 
@@ -1,27 +1,26 @@
 from fastapi import APIRouter, HTTPException
 from sqlalchemy import text
-from database import get_db
-import redis
+from database import AsyncSessionLocal, replica_monitor
 import os
 from typing import Dict, Any
 import psutil
 import shutil
 from utils.logging_config import CustomLogger, api_logger
+from utils.redis_pool import redis_pools
 
 router = APIRouter()
 logger = CustomLogger(api_logger, {'component': 'health_check'})
 
 class HealthChecker:
-    def __init__(self, redis_url: str = "redis://redis:6379/0"):
-        self.redis_url = redis_url
+    def __init__(self):
         self.required_dirs = ['uploads', 'processed', 'logs']
         self.min_disk_space = 1024 * 1024 * 1024  # 1GB
 
     async def check_database(self) -> Dict[str, Any]:
         """Check database connectivity."""
         try:
-            db = next(get_db())
-            db.execute(text('SELECT 1'))
+            async with AsyncSessionLocal() as db:
+                await db.execute(text('SELECT 1'))
             return {
                 "status": "healthy",
                 "message": "Database connection successful"
@@ -33,20 +32,47 @@ class HealthChecker:
                 "message": str(e)
             }
 
+    async def check_database_replica(self) -> Dict[str, Any]:
+        """Check read-replica reachability and lag."""
+        status = replica_monitor.status()
+        if not status["configured"]:
+            return {
+                "status": "healthy",
+                "message": "No read replica configured"
+            }
+
+        await replica_monitor.measure_lag()
+        status = replica_monitor.status()
+        if status["lag"] is None:
+            return {
+                "status": "warning",
+                "message": f"Replica unreachable, reads use the primary: {status['error']}"
+            }
+        if not status["usable"]:
+            return {
+                "status": "warning",
+                "message": f"Replica lag {status['lag']:.1f}s exceeds {status['maxLag']}s, reads use the primary"
+            }
+        return {
+            "status": "healthy",
+            "message": f"Replica lag {status['lag']:.1f}s"
+        }
+
     async def check_redis(self) -> Dict[str, Any]:
         """Check Redis connectivity."""
         try:
-            redis_client = redis.from_url(self.redis_url)
-            redis_client.ping()
+            await redis_pools.async_client().ping()
             return {
                 "status": "healthy",
-                "message": "Redis connection successful"
+                "message": "Redis connection successful",
+                "pools": redis_pools.stats()
             }
         except Exception as e:
             logger.error("Redis health check failed", exc_info=e)
             return {
                 "status": "unhealthy",
-                "message": str(e)
+                "message": str(e),
+                "pools": redis_pools.stats()
             }
 
     async def check_disk_space(self) -> Dict[str, Any]:
@@ -143,6 +169,7 @@ async def health_check():
     
     checks = {
         "database": await checker.check_database(),
+        "database_replica": await checker.check_database_replica(),
         "redis": await checker.check_redis(),
         "disk_space": await checker.check_disk_space(),
         "directories": await checker.check_directories(),
@@ -1,161 +1,500 @@
-from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, List, Optional, Set, Tuple
+from collections import Counter
 from redis import Redis
-import json
-from statistics import mean, median
+import atexit
+import os
+import socket
+import threading
+import time
+from utils.codec import payload_codec
+from utils.logging_config import CustomLogger, api_logger
+from utils.sketch import QuantileSketch
+from utils.redis_pool import redis_pools
+
+# Sketch resolutions (bucket width in seconds). Recent edges of a query
+# window come from minute buckets, the middle from hour and day buckets, so a
+# 30-day query reads a bounded number of hashes.
+MINUTE = 60
+HOUR = 3600
+DAY = 86400
+RESOLUTIONS = (MINUTE, HOUR, DAY)
+
+# Field holding the merged sketch of a compacted or rolled-up bucket
+ROLLUP_FIELD = "rollup"
+
+# Store a worker's cumulative sketch for a minute unless rollup() has already
+# sealed that minute; its fields were then read for compaction, and a late
+# write would be counted twice in the minute and never reach hour and day.
+# KEYS[1] = bucket, KEYS[2] = sealed-until key, KEYS[3] = bucket index
+# ARGV = worker, payload, bucket_start, expires_at
+_WRITE_SKETCH_SCRIPT = """
+local sealed = redis.call('GET', KEYS[2])
+if sealed and tonumber(ARGV[3]) <= tonumber(sealed) then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+redis.call('EXPIREAT', KEYS[1], math.ceil(ARGV[4]))
+redis.call('ZADD', KEYS[3], ARGV[4], KEYS[1])
+return 1
+"""
 
 class MetricsCollector:
-    def __init__(self, redis_client: Redis):
+    """Records samples into per-minute quantile sketches in Redis and rolls them up.
+
+    Each minute bucket is a hash with one field per worker process holding
+    that worker's sketch for the minute, so workers never contend on a key.
+    rollup(), run from a periodic task, later merges a closed minute's fields
+    into one and folds it into the minute's hour and day buckets. Queries
+    merge whatever fields a bucket holds. Metric names are discovered through
+    the `metrics:registry` set rather than KEYS.
+
+    Recording only touches process memory. A background thread writes every
+    changed sketch and outcome counter in one pipeline each `flush_interval`
+    seconds, or sooner once `flush_size` samples are waiting, and again at
+    shutdown. Together with compaction, retention keeps Redis memory bounded
+    by metrics x buckets retained, whatever the number of workers. Every
+    bucket and counter carries an EXPIREAT at the end of its tier's
+    retention, so it goes away even if the periodic trim() never runs.
+    """
+
+    def __init__(self, redis_client: Redis, flush_interval: float = 10.0, flush_size: int = 500,
+                 key_prefix: str = "metrics:"):
         self.redis_client = redis_client
-        self.metrics_key_prefix = "metrics:"
+        self.metrics_key_prefix = key_prefix
+        self.registry_key = f"{self.metrics_key_prefix}registry"
+        self.bucket_index_key = f"{self.metrics_key_prefix}buckets"
         self.retention_days = 30
+        self.retention = {
+            MINUTE: 6 * HOUR,
+            HOUR: 8 * DAY,
+            DAY: (self.retention_days + 1) * DAY
+        }
+        self.rollup_key = f"{self.metrics_key_prefix}rollup:watermark"
+        self.sealed_key = f"{self.metrics_key_prefix}rollup:sealed"
+        self.rollup_delay = 2 * MINUTE  # leave closed minutes open to late worker flushes
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.logger = CustomLogger(api_logger, {'component': 'metrics'})
+        self._lock = threading.Lock()
+        self._write_sketch = redis_client.register_script(_WRITE_SKETCH_SCRIPT)
+        self._reset_buffers()
+        atexit.register(self.flush)
+
+    def _reset_buffers(self) -> None:
+        self._pid = os.getpid()
+        self._worker = f"{socket.gethostname()}:{self._pid}"
+        self._sketches: Dict[str, Tuple[int, QuantileSketch]] = {}
+        self._dirty: Set[str] = set()
+        self._retired: List[Tuple[str, int, int, QuantileSketch]] = []
+        self._outcomes: Counter = Counter()
+        self._registered: Set[str] = set()
+        self._pending = 0
+        self._date_key = ""
+        self._date_key_until = 0.0
+        self._wakeup = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    def _ensure_flusher(self) -> None:
+        # Forked Celery children inherit the parent's buffers but not its
+        # thread; start over so they neither lose samples nor re-publish the
+        # parent's under their own worker id.
+        if os.getpid() != self._pid:
+            self._reset_buffers()
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name="metrics-flusher", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        pid = os.getpid()
+        while os.getpid() == pid:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _bucket_key(self, metric: str, resolution: int, bucket_start: int) -> str:
+        return f"{self.metrics_key_prefix}sketch:{metric}:{resolution}:{bucket_start}"
+
+    def record_sample(self, metric: str, value: float, count: int = 1) -> None:
+        """Add a sample to this worker's sketch for the current minute.
+
+        `count` weights the sample, e.g. by the sampling interval when only
+        every Nth event is recorded. Hour and day tiers are filled by rollup().
+        """
+        now = int(time.time())
+        bucket_start = now - now % MINUTE
+        with self._lock:
+            self._ensure_flusher()
+            current = self._sketches.get(metric)
+            if current is None or current[0] != bucket_start:
+                if current is not None and metric in self._dirty:
+                    # Publish what the finished bucket gathered since the last flush
+                    self._retired.append((metric, MINUTE, *current))
+                current = (bucket_start, QuantileSketch())
+                self._sketches[metric] = current
+            current[1].add(value, count)
+            self._dirty.add(metric)
+            self._pending += 1
+            if self._pending >= self.flush_size:
+                self._wakeup.set()
+
+    def flush(self) -> None:
+        """Write all changed sketches and counters in a single pipeline."""
+        with self._lock:
+            if os.getpid() != self._pid:
+                return
+            # One entry per bucket; a bucket's sketch object is cumulative, so
+            # repeats left over from failed flushes collapse into one write
+            buckets = {
+                (metric, resolution, bucket_start): sketch
+                for metric, resolution, bucket_start, sketch in self._retired + [
+                    (metric, MINUTE, *self._sketches[metric]) for metric in self._dirty
+                ]
+            }
+            sketches = [(*bucket, sketch) for bucket, sketch in buckets.items()]
+            outcomes = self._outcomes
+            new_metrics = {metric for metric, *_ in sketches} - self._registered
+            payloads = [
+                (metric, resolution, bucket_start, payload_codec.dumps(sketch.to_dict()))
+                for metric, resolution, bucket_start, sketch in sketches
+            ]
+            self._dirty, self._retired, self._outcomes = set(), [], Counter()
+            self._pending = 0
+        if not payloads and not outcomes:
+            return
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        for metric, resolution, bucket_start, payload in payloads:
+            key = self._bucket_key(metric, resolution, bucket_start)
+            self._write_sketch(
+                keys=[key, self.sealed_key, self.bucket_index_key],
+                args=[self._worker, payload, bucket_start, bucket_start + self.retention[resolution]],
+                client=pipe
+            )
+        for (counter, date_key, field), count in outcomes.items():
+            key = f"{self.metrics_key_prefix}{counter}:{date_key}"
+            pipe.hincrby(key, field, count)
+            expires_at = datetime.strptime(date_key, "%Y-%m-%d") + timedelta(days=self.retention_days)
+            pipe.expireat(key, expires_at)
+            pipe.zadd(self.bucket_index_key, {key: expires_at.timestamp()})
+        if new_metrics:
+            pipe.sadd(self.registry_key, *new_metrics)
+
+        try:
+            results = pipe.execute()
+        except Exception as e:
+            # Sketches are cumulative per bucket, so retrying them next time loses nothing
+            with self._lock:
+                self._retired = sketches + self._retired
+                self._outcomes.update(outcomes)
+            self.logger.error("Failed to flush metrics", exc_info=e, sketch_count=len(payloads))
+            return
+        with self._lock:
+            self._registered |= new_metrics
+        rejected = results[:len(payloads)].count(0)
+        if rejected:
+            self.logger.warning("Dropped samples of minutes already rolled up", sketch_count=rejected)
+
+    def trim(self) -> int:
+        """Delete buckets and outcome counters past their retention and prune the index.
+
+        Keys also expire on their own; this frees them promptly and keeps the
+        bucket index from growing.
+        """
+        now = time.time()
+        expired = self.redis_client.zrangebyscore(self.bucket_index_key, "-inf", now)
+        if expired:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.delete(*expired)
+            pipe.zremrangebyscore(self.bucket_index_key, "-inf", now)
+            pipe.execute()
+        return len(expired)
+
+    def rollup(self, max_minutes: int = 6 * 60) -> int:
+        """Compact closed minute buckets and fold them into the hour and day tiers.
+
+        A watermark records the last minute rolled up, so each minute is added
+        to its hour and day exactly once; the compaction, the tier updates and
+        the watermark are written in one transaction. Minutes are only rolled
+        up `rollup_delay` seconds after they close, so that workers' final
+        flushes land first, and are sealed before being read so that any
+        later flush is rejected rather than counted twice. Returns the number
+        of minutes rolled up.
+        """
+        lock_key = f"{self.metrics_key_prefix}rollup:lock"
+        if not self.redis_client.set(lock_key, os.getpid(), nx=True, ex=300):
+            return 0
+        try:
+            now = int(time.time())
+            last_eligible = now - now % MINUTE - MINUTE - self.rollup_delay
+            last_eligible -= last_eligible % MINUTE
+            watermark = self.redis_client.get(self.rollup_key)
+            # The first run starts from the present instead of re-adding history
+            first = int(watermark) + MINUTE if watermark else last_eligible
+            first = max(first, now - self.retention[MINUTE])
+            first -= first % MINUTE
+            minutes = list(range(first, last_eligible + 1, MINUTE))[:max_minutes]
+            if not minutes:
+                return 0
+            self.redis_client.set(self.sealed_key, minutes[-1])
+
+            metrics = self.registered_metrics()
+            pipe = self.redis_client.pipeline(transaction=False)
+            for metric in metrics:
+                for minute in minutes:
+                    pipe.hgetall(self._bucket_key(metric, MINUTE, minute))
+            results = iter(pipe.execute())
+
+            compacted: List[Tuple[str, List[bytes], QuantileSketch]] = []
+            rolled: Dict[Tuple[str, int, int], QuantileSketch] = {}
+            for metric in metrics:
+                for minute in minutes:
+                    fields = next(results)
+                    if not fields:
+                        continue
+                    merged = QuantileSketch.merged(
+                        QuantileSketch.from_dict(payload_codec.loads(value)) for value in fields.values()
+                    )
+                    compacted.append((self._bucket_key(metric, MINUTE, minute), list(fields), merged))
+                    for resolution in (HOUR, DAY):
+                        bucket = (metric, resolution, minute - minute % resolution)
+                        rolled.setdefault(bucket, QuantileSketch()).merge(merged)
+
+            # Add to what earlier runs already rolled into the same hours and days
+            buckets = list(rolled)
+            pipe = self.redis_client.pipeline(transaction=False)
+            for metric, resolution, bucket_start in buckets:
+                pipe.hget(self._bucket_key(metric, resolution, bucket_start), ROLLUP_FIELD)
+            for bucket, existing in zip(buckets, pipe.execute()):
+                if existing:
+                    rolled[bucket].merge(QuantileSketch.from_dict(payload_codec.loads(existing)))
+
+            pipe = self.redis_client.pipeline(transaction=True)
+            for key, fields, merged in compacted:
+                worker_fields = [field for field in fields if field != ROLLUP_FIELD.encode()]
+                if worker_fields:
+                    pipe.hdel(key, *worker_fields)
+                pipe.hset(key, ROLLUP_FIELD, payload_codec.dumps(merged.to_dict()))
+            for (metric, resolution, bucket_start), sketch in rolled.items():
+                key = self._bucket_key(metric, resolution, bucket_start)
+                pipe.hset(key, ROLLUP_FIELD, payload_codec.dumps(sketch.to_dict()))
+                pipe.expireat(key, bucket_start + self.retention[resolution])
+                pipe.zadd(self.bucket_index_key, {key: bucket_start + self.retention[resolution]})
+            pipe.set(self.rollup_key, minutes[-1])
+            pipe.execute()
+            return len(minutes)
+        finally:
+            self.redis_client.delete(lock_key)
+
+    def _rolled_up_until(self) -> Optional[int]:
+        """End of the time already folded into hour and day buckets, if rollups have run."""
+        watermark = self.redis_client.get(self.rollup_key)
+        return int(watermark) + MINUTE if watermark else None
+
+    def _window_buckets(self, start: int, end: int,
+                        rolled_until: Optional[int] = None) -> List[Tuple[int, int]]:
+        """Cover [start, end] with as few (resolution, bucket_start) pairs as possible.
+
+        The start is rounded up to the finest resolution still retained at
+        that age, so long windows lose at most part of their oldest hour or day.
+        Hour and day buckets are only used where rollup() has completed them
+        (before `rolled_until`); the rest, and everything while no rollup has
+        run yet, comes from minute buckets.
+        """
+        start -= start % MINUTE
+        for finer, coarser in ((MINUTE, HOUR), (HOUR, DAY)):
+            if end - start > self.retention[finer] and start % coarser:
+                start += coarser - start % coarser
+
+        buckets = []
+        t = start
+        while t <= end:
+            for resolution in (DAY, HOUR, MINUTE):
+                complete = resolution == MINUTE or (rolled_until is not None and t + resolution <= rolled_until)
+                if t % resolution == 0 and t + resolution <= end + 1 and complete:
+                    break
+            else:
+                resolution = MINUTE  # partially elapsed current minute
+            buckets.append((resolution, t))
+            t += resolution
+        return buckets
+
+    def get_sketches(self, metrics: List[str], days: float,
+                     end: Optional[float] = None) -> Dict[str, QuantileSketch]:
+        """Merge every worker's sketches for each metric over the `days` days before `end` (now)."""
+        end = int(time.time() if end is None else end) - 1
+        buckets = self._window_buckets(end + 1 - int(days * DAY), end, self._rolled_up_until())
+        pipe = self.redis_client.pipeline(transaction=False)
+        for metric in metrics:
+            for resolution, bucket_start in buckets:
+                pipe.hvals(self._bucket_key(metric, resolution, bucket_start))
+        results = iter(pipe.execute())
+
+        sketches = {}
+        for metric in metrics:
+            merged = QuantileSketch()
+            for _ in buckets:
+                for value in next(results):
+                    merged.merge(QuantileSketch.from_dict(payload_codec.loads(value)))
+            sketches[metric] = merged
+        return sketches
+
+    def registered_metrics(self, prefix: str = "") -> List[str]:
+        """Metric names recorded so far, optionally limited to a prefix."""
+        names = [name.decode() for name in self.redis_client.smembers(self.registry_key)]
+        return sorted(name for name in names if name.startswith(prefix))
 
     def record_processing_time(self, video_id: str, duration: float) -> None:
         """Record video processing duration"""
-        key = f"{self.metrics_key_prefix}processing_times"
-        timestamp = datetime.now().timestamp()
-        self.redis_client.zadd(key, {f"{video_id}:{duration}": timestamp})
-        # Clean up old entries
-        cutoff = datetime.now() - timedelta(days=self.retention_days)
-        self.redis_client.zremrangebyscore(key, "-inf", cutoff.timestamp())
+        self.record_sample("processing_times", duration)
 
     def record_upload_size(self, video_id: str, size_bytes: int) -> None:
         """Record uploaded video size"""
-        key = f"{self.metrics_key_prefix}upload_sizes"
-        timestamp = datetime.now().timestamp()
-        self.redis_client.zadd(key, {f"{video_id}:{size_bytes}": timestamp})
-        self.redis_client.zremrangebyscore(
-            key,
-            "-inf",
-            (datetime.now() - timedelta(days=self.retention_days)).timestamp()
-        )
+        self.record_sample("upload_sizes", size_bytes)
+
+    def _today(self) -> str:
+        # Formatting the date costs more than the rest of a hot-path increment,
+        # so reuse it until local midnight
+        now = time.time()
+        if now >= self._date_key_until:
+            today = datetime.fromtimestamp(now).date()
+            self._date_key = today.strftime("%Y-%m-%d")
+            self._date_key_until = datetime.combine(today + timedelta(days=1), datetime.min.time()).timestamp()
+        return self._date_key
+
+    def _increment(self, counter: str, field: str, amount: int = 1) -> None:
+        """Add to a field of today's `counter` hash at the next flush."""
+        with self._lock:
+            self._ensure_flusher()
+            self._outcomes[(counter, self._today(), field)] += amount
+
+    def _daily_counts(self, counter: str, days: int, end: Optional[float] = None) -> Counter:
+        """Sum the fields of a daily counter hash over the `days` days before `end` (now)."""
+        last_day = datetime.now() if end is None else datetime.fromtimestamp(end - 1)
+        pipe = self.redis_client.pipeline(transaction=False)
+        for i in range(days):
+            date_key = (last_day - timedelta(days=i)).strftime("%Y-%m-%d")
+            pipe.hgetall(f"{self.metrics_key_prefix}{counter}:{date_key}")
+        totals: Counter = Counter()
+        for counts in pipe.execute():
+            for field, count in counts.items():
+                totals[field.decode()] += int(count)
+        return totals
 
     def record_processing_outcome(self, video_id: str, success: bool) -> None:
         """Record processing success/failure"""
-        date_key = datetime.now().strftime("%Y-%m-%d")
-        key = f"{self.metrics_key_prefix}outcomes:{date_key}"
-        self.redis_client.hincrby(key, "success" if success else "failure", 1)
-        self.redis_client.expire(key, timedelta(days=self.retention_days))
+        self._increment("outcomes", "success" if success else "failure")
 
     def record_youtube_upload_time(self, video_id: str, duration: float) -> None:
         """Record YouTube upload duration"""
-        key = f"{self.metrics_key_prefix}youtube_upload_times"
-        timestamp = datetime.now().timestamp()
-        self.redis_client.zadd(key, {f"{video_id}:{duration}": timestamp})
-        self.redis_client.zremrangebyscore(
-            key,
-            "-inf",
-            (datetime.now() - timedelta(days=self.retention_days)).timestamp()
-        )
+        self.record_sample("youtube_upload_times", duration)
 
     def record_api_latency(self, endpoint: str, duration: float) -> None:
         """Record API endpoint latency"""
-        key = f"{self.metrics_key_prefix}api_latency:{endpoint}"
-        timestamp = datetime.now().timestamp()
-        self.redis_client.zadd(key, {f"{timestamp}:{duration}": timestamp})
-        self.redis_client.zremrangebyscore(
-            key,
-            "-inf",
-            (datetime.now() - timedelta(days=self.retention_days)).timestamp()
-        )
-
-    def get_processing_metrics(self, days: int = 7) -> Dict[str, Any]:
+        self.record_sample(f"api_latency:{endpoint}", duration)
+
+    def record_api_response(self, endpoint: str, duration: float, status: int,
+                            size_bytes: int, weight: int = 1) -> None:
+        """Record one API response's latency, size and status, `weight` times when sampled"""
+        self.record_sample(f"api_latency:{endpoint}", duration, weight)
+        self.record_sample(f"api_response_bytes:{endpoint}", size_bytes, weight)
+        self._increment("api_status", f"{endpoint}|{status}", weight)
+
+    def record_queue_wait(self, priority_class: str, video_id: int, duration: float) -> None:
+        """Record how long a job waited in the queue before a worker picked it up"""
+        self.record_sample(f"queue_wait:{priority_class}", duration)
+
+    def get_processing_metrics(self, days: int = 7, end: Optional[float] = None) -> Dict[str, Any]:
         """Get video processing metrics for the specified period"""
-        cutoff = datetime.now() - timedelta(days=days)
-        processing_times_key = f"{self.metrics_key_prefix}processing_times"
-        
-        # Get recent processing times
-        times = []
-        for item in self.redis_client.zrangebyscore(
-            processing_times_key,
-            cutoff.timestamp(),
-            "+inf"
-        ):
-            _, duration = item.decode().split(":")
-            times.append(float(duration))
+        times = self.get_sketches(["processing_times"], days, end)["processing_times"]
 
         # Calculate success rate
-        success_count = 0
-        failure_count = 0
-        for i in range(days):
-            date_key = (datetime.now() - timedelta(days=i)).strftime("%Y-%m-%d")
-            outcomes = self.redis_client.hgetall(f"{self.metrics_key_prefix}outcomes:{date_key}")
-            success_count += int(outcomes.get(b"success", 0))
-            failure_count += int(outcomes.get(b"failure", 0))
+        outcomes = self._daily_counts("outcomes", days, end)
+        success_count = outcomes["success"]
+        failure_count = outcomes["failure"]
 
         total_count = success_count + failure_count
 
         return {
             "total_videos_processed": total_count,
             "success_rate": (success_count / total_count * 100) if total_count > 0 else 0,
-            "average_processing_time": mean(times) if times else 0,
-            "median_processing_time": median(times) if times else 0,
-            "min_processing_time": min(times) if times else 0,
-            "max_processing_time": max(times) if times else 0,
-            "processing_time_samples": len(times)
+            "average_processing_time": times.mean() or 0,
+            "median_processing_time": times.quantile(0.5) or 0,
+            "min_processing_time": times.min if times.count else 0,
+            "max_processing_time": times.max if times.count else 0,
+            "processing_time_samples": times.count
         }
 
-    def get_api_metrics(self, days: int = 7) -> Dict[str, Dict[str, float]]:
+    def get_api_metrics(self, days: int = 7, end: Optional[float] = None) -> Dict[str, Dict[str, float]]:
         """Get API performance metrics for the specified period"""
-        cutoff = datetime.now() - timedelta(days=days)
+        names = self.registered_metrics("api_latency:")
+        endpoints = [name.split(":", 1)[1] for name in names]
+        sizes = self.get_sketches([f"api_response_bytes:{endpoint}" for endpoint in endpoints], days, end)
+        status_counts = self._daily_counts("api_status", days, end)
         metrics = {}
-
-        # Get all API latency keys
-        keys = self.redis_client.keys(f"{self.metrics_key_prefix}api_latency:*")
-        for key in keys:
-            endpoint = key.decode().split(":")[-1]
-            latencies = []
-            
-            # Get latencies for this endpoint
-            for item in self.redis_client.zrangebyscore(
-                key,
-                cutoff.timestamp(),
-                "+inf"
-            ):
-                _, duration = item.decode().split(":")
-                latencies.append(float(duration))
-
-            if latencies:
+        for name, latencies in self.get_sketches(names, days, end).items():
+            if latencies.count:
+                endpoint = name.split(":", 1)[1]
+                response_bytes = sizes[f"api_response_bytes:{endpoint}"]
                 metrics[endpoint] = {
-                    "average_latency": mean(latencies),
-                    "median_latency": median(latencies),
-                    "p95_latency": sorted(latencies)[int(len(latencies) * 0.95)],
-                    "min_latency": min(latencies),
-                    "max_latency": max(latencies),
-                    "sample_count": len(latencies)
+                    "average_latency": latencies.mean(),
+                    "median_latency": latencies.quantile(0.5),
+                    "p95_latency": latencies.quantile(0.95),
+                    "min_latency": latencies.min,
+                    "max_latency": latencies.max,
+                    "sample_count": latencies.count,
+                    "average_response_bytes": response_bytes.mean() or 0,
+                    "p95_response_bytes": response_bytes.quantile(0.95) or 0,
+                    "status_counts": {
+                        field.rsplit("|", 1)[1]: count
+                        for field, count in status_counts.items()
+                        if field.rsplit("|", 1)[0] == endpoint
+                    }
                 }
 
         return metrics
 
-    def get_storage_metrics(self, days: int = 7) -> Dict[str, Any]:
+    def get_queue_wait_metrics(self, days: int = 7, end: Optional[float] = None) -> Dict[str, Dict[str, float]]:
+        """Get queue wait time metrics per priority class for the specified period"""
+        names = [
+            f"queue_wait:{priority_class}"
+            for priority_class in ("interactive_short", "interactive_long", "batch_short", "batch_long")
+        ]
+        metrics = {}
+        for name, waits in self.get_sketches(names, days, end).items():
+            if waits.count:
+                metrics[name.split(":", 1)[1]] = {
+                    "average_wait": waits.mean(),
+                    "median_wait": waits.quantile(0.5),
+                    "p95_wait": waits.quantile(0.95),
+                    "max_wait": waits.max,
+                    "sample_count": waits.count
+                }
+
+        return metrics
+
+    def get_storage_metrics(self, days: int = 7, end: Optional[float] = None) -> Dict[str, Any]:
         """Get storage usage metrics"""
-        cutoff = datetime.now() - timedelta(days=days)
-        sizes = []
-        
-        # Get upload sizes for the period
-        upload_sizes_key = f"{self.metrics_key_prefix}upload_sizes"
-        for item in self.redis_client.zrangebyscore(
-            upload_sizes_key,
-            cutoff.timestamp(),
-            "+inf"
-        ):
-            _, size = item.decode().split(":")
-            sizes.append(int(size))
+        sizes = self.get_sketches(["upload_sizes"], days, end)["upload_sizes"]
 
         return {
-            "total_uploads": len(sizes),
-            "total_storage_used": sum(sizes),
-            "average_file_size": mean(sizes) if sizes else 0,
-            "median_file_size": median(sizes) if sizes else 0,
-            "max_file_size": max(sizes) if sizes else 0,
-            "min_file_size": min(sizes) if sizes else 0
+            "total_uploads": sizes.count,
+            "total_storage_used": int(sizes.sum),
+            "average_file_size": sizes.mean() or 0,
+            "median_file_size": sizes.quantile(0.5) or 0,
+            "max_file_size": sizes.max if sizes.count else 0,
+            "min_file_size": sizes.min if sizes.count else 0
         }
 
-    async def collect_daily_metrics(self) -> Dict[str, Any]:
-        """Collect all metrics for daily report"""
+    def collect_daily_metrics(self, day: date) -> Dict[str, Any]:
+        """Collect all metrics of one calendar day (local time) for the daily report"""
+        end = datetime.combine(day + timedelta(days=1), datetime.min.time()).timestamp()
         return {
-            "timestamp": datetime.now().isoformat(),
-            "processing_metrics": self.get_processing_metrics(days=1),
-            "api_metrics": self.get_api_metrics(days=1),
-            "storage_metrics": self.get_storage_metrics(days=1)
-        }
\ No newline at end of file
+            "processing_metrics": self.get_processing_metrics(days=1, end=end),
+            "api_metrics": self.get_api_metrics(days=1, end=end),
+            "storage_metrics": self.get_storage_metrics(days=1, end=end),
+            "queue_wait_metrics": self.get_queue_wait_metrics(days=1, end=end)
+        }
+
+# Shared per-process collector used by the API and the Celery tasks
+metrics_collector = MetricsCollector(redis_pools.client())
@@ -0,0 +1,36 @@
+import base64
+import hashlib
+from datetime import datetime, timezone
+from typing import Any, Optional, Tuple
+from fastapi import HTTPException
+
+def encode_cursor(*values: Any) -> str:
+    """Encode the sort key of the last row on a page as an opaque cursor."""
+    parts = [v.isoformat() if isinstance(v, datetime) else str(v) for v in values]
+    return base64.urlsafe_b64encode("|".join(parts).encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[str, ...]:
+    """Decode a cursor produced by encode_cursor back into its string parts."""
+    try:
+        return tuple(base64.urlsafe_b64decode(cursor.encode()).decode().split("|"))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def decode_timestamp_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a (created_at, id) keyset cursor."""
+    try:
+        timestamp, row_id = decode_cursor(cursor)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def to_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Normalise a client-supplied datetime to the naive UTC values stored in the database."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def compute_etag(*parts: Any) -> str:
+    """Weak ETag over the values that identify a response's content."""
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return f'W/"{digest}"'
@@ -0,0 +1,189 @@
+import os
+import socket
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from redis import Redis
+from config import settings
+from utils.codec import payload_codec
+from utils.logging_config import CustomLogger, api_logger
+from utils.redis_pool import redis_pools
+
+def process_name(pid: Optional[int] = None) -> str:
+    """Name a process is addressed by, e.g. worker-1:4121."""
+    return f"{socket.gethostname()}:{pid or os.getpid()}"
+
+class SamplingProfiler:
+    """Statistical profiler built on periodic sys._current_frames() snapshots.
+
+    While running, a daemon thread records every other thread's stack each
+    `interval` seconds and counts identical stacks, which is exactly the
+    collapsed-stack format flamegraph.pl and speedscope read. Nothing runs
+    while it is stopped.
+    """
+
+    def __init__(self):
+        self._thread: Optional[threading.Thread] = None
+        self._labels: Dict[Any, str] = {}
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration: float, interval: float = 0.01) -> bool:
+        """Sample for `duration` seconds; returns False if a profile is already running."""
+        if self.running:
+            return False
+        self.stacks = Counter()
+        self.samples = 0
+        self.started_at = time.time()
+        self.finished_at = None
+        self._thread = threading.Thread(
+            target=self._run, args=(duration, interval), name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)})"
+        return label
+
+    def _run(self, duration: float, interval: float) -> None:
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            time.sleep(interval)
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+        self.finished_at = time.time()
+
+    def collapsed(self) -> str:
+        """One "thread;outer;...;inner count" line per distinct stack, hottest first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+class ProfilerControl:
+    """Lets an admin start the profiler in any named API or worker process.
+
+    Each process runs a watcher thread that, every `poll_interval` seconds,
+    refreshes its entry in the `profiler:processes` set and checks its own
+    request key; that single round trip is all the profiler costs while idle.
+    Finished profiles are written to `output_dir` and kept in Redis for a
+    day so the API can serve them whichever host ran them. Unless `enabled`,
+    no watcher starts and processes cannot be profiled at all.
+    """
+
+    def __init__(self, redis_client: Redis, output_dir: str, max_duration: float,
+                 poll_interval: float = 2.0, enabled: bool = True):
+        self.redis_client = redis_client
+        self.output_dir = Path(output_dir)
+        self.max_duration = max_duration
+        self.poll_interval = poll_interval
+        self.enabled = enabled
+        self.key_prefix = "profiler:"
+        self.processes_key = f"{self.key_prefix}processes"
+        self.profiler = SamplingProfiler()
+        self.logger = CustomLogger(api_logger, {'component': 'profiler'})
+        self._watcher_pid: Optional[int] = None
+        self._unsaved = False
+
+    def start_watcher(self, role: str) -> None:
+        """Make this process addressable; call once per process (after forking)."""
+        if not self.enabled or self._watcher_pid == os.getpid():
+            return
+        self._watcher_pid = os.getpid()
+        self.profiler = SamplingProfiler()
+        threading.Thread(target=self._watch, args=(role,), name="profiler-watcher", daemon=True).start()
+
+    def _watch(self, role: str) -> None:
+        name = process_name()
+        pid = os.getpid()
+        while os.getpid() == pid:
+            try:
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.zadd(self.processes_key, {f"{name}|{role}": time.time()})
+                pipe.get(f"{self.key_prefix}request:{name}")
+                pipe.delete(f"{self.key_prefix}request:{name}")
+                _, request, _ = pipe.execute()
+                if request:
+                    self._start(name, payload_codec.loads(request))
+                if self._unsaved and not self.profiler.running:
+                    self._save(name)
+            except Exception as e:
+                self.logger.error("Profiler watcher error", exc_info=e)
+            time.sleep(self.poll_interval)
+
+    def _start(self, name: str, request: Dict[str, Any]) -> None:
+        duration = min(float(request.get("duration", 30)), self.max_duration)
+        interval = float(request.get("interval", 0.01))
+        if self.profiler.start(duration, interval):
+            self._unsaved = True
+            self.logger.info("Profiling started", target=name, duration=duration, interval=interval)
+
+    def _save(self, name: str) -> None:
+        self._unsaved = False
+        output = self.profiler.collapsed()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        timestamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(self.profiler.started_at))
+        path = self.output_dir / f"{name.replace(':', '-')}-{timestamp}.collapsed"
+        path.write_text(output)
+        self.redis_client.set(f"{self.key_prefix}result:{name}", payload_codec.dumps({
+            "process": name,
+            "startedAt": self.profiler.started_at,
+            "finishedAt": self.profiler.finished_at,
+            "samples": self.profiler.samples,
+            "file": str(path),
+            "collapsed": output
+        }), ex=86400)
+        self.logger.info("Profiling finished", target=name, samples=self.profiler.samples, file=str(path))
+
+    def processes(self, max_age: float = 30.0) -> List[Dict[str, str]]:
+        """Processes whose watcher checked in within the last `max_age` seconds."""
+        now = time.time()
+        self.redis_client.zremrangebyscore(self.processes_key, "-inf", now - max_age)
+        members = self.redis_client.zrangebyscore(self.processes_key, now - max_age, "+inf")
+        processes = []
+        for member in members:
+            name, role = member.decode().rsplit("|", 1)
+            processes.append({"process": name, "role": role})
+        return processes
+
+    def request(self, name: str, duration: float, interval: float = 0.01) -> Dict[str, Any]:
+        """Ask a named process to profile itself; it starts within poll_interval seconds."""
+        duration = min(duration, self.max_duration)
+        self.redis_client.set(
+            f"{self.key_prefix}request:{name}",
+            payload_codec.dumps({"duration": duration, "interval": interval}),
+            ex=int(self.poll_interval * 5) + 1
+        )
+        return {"process": name, "duration": duration, "interval": interval}
+
+    def result(self, name: str) -> Optional[Dict[str, Any]]:
+        """The latest finished profile of a process, if one is still kept."""
+        value = self.redis_client.get(f"{self.key_prefix}result:{name}")
+        return payload_codec.loads(value) if value else None
+
+# Shared per-process control used by the API, the Celery workers and their control command
+profiler_control = ProfilerControl(
+    redis_pools.client(),
+    settings.PROFILE_DIR,
+    settings.PROFILER_MAX_DURATION,
+    enabled=settings.PROFILER_ENABLED
+)
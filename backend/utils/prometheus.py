@@ -0,0 +1,103 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Tuple
+from prometheus_client import (
+    CollectorRegistry,
+    CONTENT_TYPE_LATEST,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+    start_http_server
+)
+
+# With PROMETHEUS_MULTIPROC_DIR set (see the Dockerfile), every process writes
+# its samples to mmap'd files in that directory and a scrape merges them, so
+# Celery prefork children are reported alongside their parent. The directory
+# must be emptied before the API or worker starts.
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+API_REQUEST_SECONDS = Histogram(
+    "api_request_duration_seconds",
+    "API request latency by route template",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+
+STAGE_SECONDS = Histogram(
+    "video_stage_duration_seconds",
+    "VideoProcessor stage duration",
+    ["stage", "outcome"],
+    buckets=(0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300, 600)
+)
+
+YOUTUBE_UPLOAD_SECONDS = Histogram(
+    "youtube_upload_duration_seconds",
+    "Time to upload a video to YouTube",
+    ["outcome"],
+    buckets=(1, 2, 5, 10, 20, 30, 60, 120, 300)
+)
+
+YOUTUBE_UPLOAD_BYTES = Histogram(
+    "youtube_upload_size_bytes",
+    "Size of videos uploaded to YouTube",
+    buckets=tuple(mb * 1024 * 1024 for mb in (1, 2, 5, 10, 20, 50, 100, 200))
+)
+
+CACHE_LOOKUP_SECONDS = Histogram(
+    "response_cache_lookup_duration_seconds",
+    "Response cache lookups by result (local_hit, redis_hit, miss)",
+    ["result"],
+    buckets=(0.00001, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5)
+)
+
+QUEUE_WAIT_SECONDS = Histogram(
+    "job_queue_wait_seconds",
+    "Time a processing job waited between submission and start",
+    ["priority_class"],
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+)
+
+@contextmanager
+def time_stage(stage: str):
+    """Observe a VideoProcessor stage's duration, labelled by whether it raised."""
+    start = time.perf_counter()
+    outcome = "failed"
+    try:
+        yield
+        outcome = "completed"
+    finally:
+        STAGE_SECONDS.labels(stage=stage, outcome=outcome).observe(time.perf_counter() - start)
+
+@contextmanager
+def time_youtube_upload(file_path: str):
+    """Observe a YouTube upload's duration and, once it succeeds, the file size."""
+    start = time.perf_counter()
+    outcome = "failed"
+    try:
+        yield
+        outcome = "completed"
+        YOUTUBE_UPLOAD_BYTES.observe(os.path.getsize(file_path))
+    finally:
+        YOUTUBE_UPLOAD_SECONDS.labels(outcome=outcome).observe(time.perf_counter() - start)
+
+def _registry() -> CollectorRegistry:
+    if not MULTIPROCESS:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+def exposition() -> Tuple[bytes, str]:
+    """Current metrics in the Prometheus text format, merged across processes."""
+    return generate_latest(_registry()), CONTENT_TYPE_LATEST
+
+def serve(port: int) -> None:
+    """Expose this host's metrics on a background HTTP server (Celery workers)."""
+    start_http_server(port, registry=_registry())
+
+def mark_process_dead(pid: int) -> None:
+    """Drop live gauge files of an exited prefork child."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid)
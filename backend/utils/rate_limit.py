@@ -0,0 +1,243 @@
+import asyncio
+import math
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional
+from redis import Redis, RedisError
+from redis.asyncio import Redis as AsyncRedis
+
+# Sliding-window log in a single round trip. Each key is a sorted set of the
+# requests admitted in the last period, scored by arrival time in
+# milliseconds, so no rolling period ever admits more than `limit` requests
+# (a fixed window lets through up to twice that around its boundary).
+#
+# KEYS[1] = limiter key
+# ARGV = now_ms, limit, period_ms, member prefix, requested slots
+# Returns {granted, remaining, reset_after_ms}, where reset_after_ms is the
+# time until the oldest admitted request leaves the window. Up to `requested`
+# slots are granted at once so callers can lease quota in blocks.
+_SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local period = tonumber(ARGV[3])
+local requested = tonumber(ARGV[5])
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - period)
+local count = redis.call('ZCARD', KEYS[1])
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+local reset_after = period
+if #oldest > 0 then
+    reset_after = tonumber(oldest[2]) + period - now
+end
+
+local granted = math.min(requested, limit - count)
+if granted <= 0 then
+    return {0, 0, reset_after}
+end
+
+local members = {}
+for i = 1, granted do
+    members[#members + 1] = now
+    members[#members + 1] = ARGV[4] .. ':' .. i
+end
+redis.call('ZADD', KEYS[1], unpack(members))
+redis.call('PEXPIRE', KEYS[1], period)
+return {granted, limit - count - granted, reset_after}
+"""
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: float  # seconds until the oldest counted request expires
+
+    def headers(self) -> Dict[str, str]:
+        """Standard rate limit response headers."""
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(math.ceil(self.reset_after))
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(math.ceil(self.reset_after))
+        return headers
+
+def _script_args(limit: int, period: float, requested: int) -> list:
+    now_ms = int(time.time() * 1000)
+    return [now_ms, limit, int(period * 1000), f"{now_ms}:{uuid.uuid4().hex[:12]}", requested]
+
+class SlidingWindowRateLimiter:
+    """Atomic Redis rate limiter allowing `limit` requests in any `period` seconds."""
+
+    def __init__(self, redis_client: Redis, key_prefix: str = "ratelimit:"):
+        self.redis_client = redis_client
+        self.key_prefix = key_prefix
+        self._script = redis_client.register_script(_SLIDING_WINDOW_SCRIPT)
+
+    def hit(self, key: str, limit: int, period: float) -> RateLimitResult:
+        """Count a request against `key` and report whether it is allowed."""
+        granted, remaining, reset_after_ms = self._script(
+            keys=[f"{self.key_prefix}{key}"],
+            args=_script_args(limit, period, 1)
+        )
+        return RateLimitResult(
+            allowed=granted > 0,
+            limit=limit,
+            remaining=int(remaining),
+            reset_after=max(int(reset_after_ms), 0) / 1000
+        )
+
+    def reset(self, key: str) -> bool:
+        """Forget all requests counted against `key`."""
+        return self.redis_client.delete(f"{self.key_prefix}{key}") > 0
+
+class _Bucket:
+    __slots__ = ("tokens", "expires_at", "shared_remaining", "reset_at", "retry_at", "refill")
+
+    def __init__(self):
+        self.tokens = 0
+        self.expires_at = 0.0
+        self.shared_remaining = 0
+        self.reset_at = 0.0
+        self.retry_at = 0.0
+        self.refill: Optional[asyncio.Task] = None
+
+class _FallbackBucket:
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, capacity: float):
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+class LeasedRateLimiter:
+    """Per-process token buckets that lease quota from the shared sliding window.
+
+    Each key's local bucket is filled with blocks of `block_size` slots granted
+    atomically by the Redis script, so most requests are decided without a
+    round trip. When the bucket runs low a refill is leased in the background;
+    only a request that finds it empty waits for Redis. Leased slots count
+    against the shared window as soon as they are granted, but may be spent
+    until `period` after that, so a rolling period can admit slots granted in
+    the period before it. The cluster admits at most `limit` plus the slots
+    each process held when the period began: one and a half blocks per
+    process (a refill is leased once half a block is left). A period starting
+    from an idle key admits at most `limit`, and at worst one unused block
+    per process goes to waste.
+
+    If Redis is unreachable the limiter does not fail open: each process
+    enforces `fallback_fraction` of the limit on its own until `retry_interval`
+    has passed and Redis is tried again.
+    """
+
+    def __init__(self, redis_client: AsyncRedis, key_prefix: str = "ratelimit:",
+                 block_fraction: float = 0.1, fallback_fraction: float = 0.25,
+                 retry_interval: float = 5.0, max_keys: int = 10000):
+        self.key_prefix = key_prefix
+        self.block_fraction = block_fraction
+        self.fallback_fraction = fallback_fraction
+        self.retry_interval = retry_interval
+        self.max_keys = max_keys
+        self._script = redis_client.register_script(_SLIDING_WINDOW_SCRIPT)
+        self._buckets: "OrderedDict[str, _Bucket]" = OrderedDict()
+        self._fallback: "OrderedDict[str, _FallbackBucket]" = OrderedDict()
+        self._redis_down_until = 0.0
+        self.counters = {"local": 0, "leases": 0, "fallback": 0, "redis_errors": 0}
+
+    @property
+    def degraded(self) -> bool:
+        """Whether decisions are currently made from local fallback limits."""
+        return time.monotonic() < self._redis_down_until
+
+    def block_size(self, limit: int) -> int:
+        return max(1, int(limit * self.block_fraction))
+
+    async def hit(self, key: str, limit: int, period: float) -> RateLimitResult:
+        """Count a request against `key` and report whether it is allowed."""
+        if self.degraded:
+            return self._fallback_hit(key, limit, period)
+
+        bucket = self._bucket(key)
+        now = time.monotonic()
+        if bucket.expires_at <= now:
+            bucket.tokens = 0
+        low = bucket.tokens <= self.block_size(limit) // 2
+        if low and bucket.refill is None and now >= bucket.retry_at:
+            self._start_lease(key, bucket, limit, period)
+
+        # Only a request that finds the bucket empty waits for a lease
+        while bucket.tokens == 0:
+            now = time.monotonic()
+            if now < bucket.retry_at:
+                # The shared window was full at the last lease; deny without asking again
+                return RateLimitResult(False, limit, 0, bucket.retry_at - now)
+            if bucket.refill is None:
+                self._start_lease(key, bucket, limit, period)
+            try:
+                await asyncio.shield(bucket.refill)
+            except (RedisError, OSError):
+                return self._fallback_hit(key, limit, period)
+
+        bucket.tokens -= 1
+        self.counters["local"] += 1
+        reset_after = max(bucket.reset_at - time.monotonic(), 0)
+        return RateLimitResult(True, limit, bucket.tokens + bucket.shared_remaining, reset_after)
+
+    def _bucket(self, key: str) -> _Bucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket()
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        self._buckets.move_to_end(key)
+        return bucket
+
+    def _start_lease(self, key: str, bucket: _Bucket, limit: int, period: float) -> None:
+        bucket.refill = asyncio.create_task(self._lease(key, bucket, limit, period))
+        bucket.refill.add_done_callback(lambda task: self._lease_done(bucket, task))
+
+    async def _lease(self, key: str, bucket: _Bucket, limit: int, period: float) -> None:
+        try:
+            granted, remaining, reset_after_ms = await self._script(
+                keys=[f"{self.key_prefix}{key}"],
+                args=_script_args(limit, period, self.block_size(limit))
+            )
+        except (RedisError, OSError):
+            self.counters["redis_errors"] += 1
+            self._redis_down_until = time.monotonic() + self.retry_interval
+            raise
+
+        now = time.monotonic()
+        self.counters["leases"] += 1
+        if bucket.expires_at <= now:
+            bucket.tokens = 0
+        bucket.tokens += int(granted)
+        bucket.expires_at = now + period
+        bucket.shared_remaining = int(remaining)
+        bucket.reset_at = now + max(int(reset_after_ms), 0) / 1000
+        bucket.retry_at = bucket.reset_at if not granted else 0.0
+
+    def _lease_done(self, bucket: _Bucket, task: asyncio.Task) -> None:
+        bucket.refill = None
+        if not task.cancelled():
+            task.exception()  # errors already switched the limiter to fallback
+
+    def _fallback_hit(self, key: str, limit: int, period: float) -> RateLimitResult:
+        """Local-only token bucket holding a fraction of the shared limit."""
+        capacity = max(1.0, limit * self.fallback_fraction)
+        rate = capacity / period
+        bucket = self._fallback.get(key)
+        if bucket is None:
+            bucket = self._fallback[key] = _FallbackBucket(capacity)
+            if len(self._fallback) > self.max_keys:
+                self._fallback.popitem(last=False)
+        self._fallback.move_to_end(key)
+
+        now = time.monotonic()
+        bucket.tokens = min(capacity, bucket.tokens + (now - bucket.updated_at) * rate)
+        bucket.updated_at = now
+        self.counters["fallback"] += 1
+        if bucket.tokens < 1:
+            return RateLimitResult(False, limit, 0, (1 - bucket.tokens) / rate)
+        bucket.tokens -= 1
+        return RateLimitResult(True, limit, int(bucket.tokens), (capacity - bucket.tokens) / rate)
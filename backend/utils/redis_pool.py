@@ -0,0 +1,161 @@
+import time
+from typing import Any, Callable, Dict, List, Optional
+from redis import Redis, BlockingConnectionPool
+from redis.asyncio import Redis as AsyncRedis
+from redis.asyncio import BlockingConnectionPool as AsyncBlockingConnectionPool
+from config import settings
+
+# Called with the seconds each checkout spent waiting for and holding a
+# connection, i.e. one command or pipeline; used to attribute Redis time to
+# the current request and trace span
+checkout_listeners: List[Callable[[float], None]] = []
+
+class _PoolStats:
+    """Checkout counters shared by the sync and asyncio pools."""
+
+    def _reset_stats(self) -> None:
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.checkouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.errors = 0
+
+    def _checked_out(self, connection, waited: float) -> None:
+        connection._checkout_started = time.perf_counter() - waited
+        self.in_use += 1
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+        self.checkouts += 1
+        self.wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def _released(self, connection) -> None:
+        self.in_use = max(self.in_use - 1, 0)
+        started = getattr(connection, "_checkout_started", None)
+        if started is not None and checkout_listeners:
+            seconds = time.perf_counter() - started
+            for listener in checkout_listeners:
+                listener(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "maxConnections": self.max_connections,
+            "created": len(self._connections),
+            "inUse": self.in_use,
+            "peakInUse": self.peak_in_use,
+            "checkouts": self.checkouts,
+            "avgWaitMs": self.wait_seconds / self.checkouts * 1000 if self.checkouts else 0,
+            "maxWaitMs": self.max_wait_seconds * 1000,
+            "errors": self.errors
+        }
+
+class InstrumentedConnectionPool(_PoolStats, BlockingConnectionPool):
+    """Blocking pool that records how long callers wait for a connection."""
+
+    def reset(self) -> None:
+        # Also runs after a fork, so each Celery child starts with its own counters
+        super().reset()
+        self._reset_stats()
+
+    def get_connection(self, command_name, *keys, **options):
+        start = time.perf_counter()
+        try:
+            connection = super().get_connection(command_name, *keys, **options)
+        except Exception:
+            self.errors += 1
+            raise
+        self._checked_out(connection, time.perf_counter() - start)
+        return connection
+
+    def release(self, connection) -> None:
+        self._released(connection)
+        super().release(connection)
+
+class AsyncInstrumentedConnectionPool(_PoolStats, AsyncBlockingConnectionPool):
+    """asyncio counterpart of InstrumentedConnectionPool."""
+
+    def reset(self) -> None:
+        super().reset()
+        self._reset_stats()
+
+    async def get_connection(self, command_name, *keys, **options):
+        start = time.perf_counter()
+        try:
+            connection = await super().get_connection(command_name, *keys, **options)
+        except Exception:
+            self.errors += 1
+            raise
+        self._checked_out(connection, time.perf_counter() - start)
+        return connection
+
+    async def release(self, connection) -> None:
+        self._released(connection)
+        await super().release(connection)
+
+class RedisPools:
+    """Process-wide Redis clients built from settings.REDIS_URL.
+
+    The sync client serves Celery tasks and other blocking code; the asyncio
+    client serves request handlers and middleware. Both are created on first
+    use and share nothing, so each has its own bounded pool. Connects and
+    commands time out after a few seconds, so an unreachable Redis raises
+    and callers fall back instead of hanging.
+    """
+
+    def __init__(self, url: str, max_connections: int, timeout: float,
+                 socket_timeout: float = 2.0, socket_connect_timeout: float = 1.0):
+        self.url = url
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.socket_timeout = socket_timeout
+        self.socket_connect_timeout = socket_connect_timeout
+        self._client: Optional[Redis] = None
+        self._async_client: Optional[AsyncRedis] = None
+
+    def client(self) -> Redis:
+        """Shared synchronous client."""
+        if self._client is None:
+            pool = InstrumentedConnectionPool.from_url(
+                self.url,
+                max_connections=self.max_connections,
+                timeout=self.timeout,
+                socket_timeout=self.socket_timeout,
+                socket_connect_timeout=self.socket_connect_timeout
+            )
+            self._client = Redis(connection_pool=pool)
+        return self._client
+
+    def async_client(self) -> AsyncRedis:
+        """Shared redis.asyncio client for the request path."""
+        if self._async_client is None:
+            pool = AsyncInstrumentedConnectionPool.from_url(
+                self.url,
+                max_connections=self.max_connections,
+                timeout=self.timeout,
+                socket_timeout=self.socket_timeout,
+                socket_connect_timeout=self.socket_connect_timeout
+            )
+            self._async_client = AsyncRedis(connection_pool=pool)
+        return self._async_client
+
+    def stats(self) -> Dict[str, Any]:
+        """Usage and checkout wait times of the pools created in this process."""
+        return {
+            "sync": self._client.connection_pool.stats() if self._client else None,
+            "async": self._async_client.connection_pool.stats() if self._async_client else None
+        }
+
+    async def close(self) -> None:
+        """Disconnect the asyncio pool; call on application shutdown."""
+        if self._async_client is not None:
+            await self._async_client.close()
+            await self._async_client.connection_pool.disconnect()
+            self._async_client = None
+
+redis_pools = RedisPools(
+    settings.REDIS_URL,
+    settings.REDIS_MAX_CONNECTIONS,
+    settings.REDIS_POOL_TIMEOUT,
+    socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+    socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT
+)
@@ -0,0 +1,64 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from utils.redis_pool import checkout_listeners
+
+# Sub-timings (seconds per category) of the request being served. The dict is
+# shared, not copied, by tasks, threadpool calls and SQLAlchemy's greenlets
+# spawned while handling the request, so their time lands in the same totals.
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+def start_request_timing() -> Token:
+    """Begin collecting sub-timings for the current request."""
+    return _timings.set({})
+
+def finish_request_timing(token: Token) -> None:
+    _timings.reset(token)
+
+def request_timings() -> Optional[Dict[str, float]]:
+    """Sub-timings gathered so far, or None outside a timed request."""
+    return _timings.get()
+
+def add_timing(name: str, seconds: float) -> None:
+    """Add time spent in `name` (db, cache, redis) to the current request, if timed."""
+    timings = _timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+@contextmanager
+def timed(name: str):
+    """Time the enclosed block into the current request's `name` sub-timing."""
+    if _timings.get() is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_timing(name, time.perf_counter() - start)
+
+def server_timing_header(total: float) -> str:
+    """Server-Timing value with the total and each sub-timing in milliseconds."""
+    parts = [f"app;dur={total * 1000:.1f}"]
+    for name, seconds in (_timings.get() or {}).items():
+        parts.append(f"{name};dur={seconds * 1000:.1f}")
+    return ", ".join(parts)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _timings.get() is not None:
+        context._timing_start = time.perf_counter()
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_timing_start", None)
+    if start is not None:
+        add_timing("db", time.perf_counter() - start)
+
+def _redis_checkout(seconds: float) -> None:
+    add_timing("redis", seconds)
+
+checkout_listeners.append(_redis_checkout)
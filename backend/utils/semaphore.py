@@ -0,0 +1,191 @@
+import asyncio
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from typing import Optional
+from utils.logging_config import CustomLogger, video_logger
+
+logger = CustomLogger(video_logger, {'component': 'semaphore'})
+
+# Holders live in a sorted set scored by lease expiry. Expired leases belong
+# to holders that crashed or stopped heart-beating and are reclaimed before
+# counting, so a slot can never leak for longer than one lease. Expiry is
+# measured on the Redis server's clock (TIME), so clock skew between API and
+# worker hosts cannot make one node reclaim another's live leases.
+# replicate_commands() lets the script write after reading TIME on Redis < 7.
+_NOW = """
+redis.replicate_commands()
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+"""
+
+# KEYS[1] = holders set; ARGV = limit, holder, lease_ttl
+_ACQUIRE_SCRIPT = _NOW + """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZSCORE', KEYS[1], ARGV[2]) then
+    redis.call('ZADD', KEYS[1], now + ARGV[3], ARGV[2])
+    return 1
+end
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + ARGV[3], ARGV[2])
+redis.call('EXPIRE', KEYS[1], math.ceil(ARGV[3] * 2))
+return 1
+"""
+
+# Extend a lease only while it is still held; returns 0 if it was reclaimed.
+# KEYS[1] = holders set; ARGV = holder, lease_ttl
+_RENEW_SCRIPT = _NOW + """
+local expires_at = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if not expires_at or tonumber(expires_at) <= now then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + ARGV[2], ARGV[1])
+redis.call('EXPIRE', KEYS[1], math.ceil(ARGV[2] * 2))
+return 1
+"""
+
+# KEYS[1] = holders set
+_IN_USE_SCRIPT = _NOW + """
+return redis.call('ZCOUNT', KEYS[1], now, '+inf')
+"""
+
+class SemaphoreTimeout(Exception):
+    """Raised when no slot became free within the acquire timeout."""
+    pass
+
+class _SemaphoreBase:
+    def __init__(self, redis_client, name: str, limit: int, lease_ttl: float = 60.0,
+                 poll_interval: float = 0.5):
+        self.name = name
+        self.limit = limit
+        self.lease_ttl = lease_ttl
+        self.heartbeat_interval = lease_ttl / 3
+        self.poll_interval = poll_interval
+        self.key = f"semaphore:{name}"
+        self.redis_client = redis_client
+        self._acquire_script = redis_client.register_script(_ACQUIRE_SCRIPT)
+        self._renew_script = redis_client.register_script(_RENEW_SCRIPT)
+        self._in_use_script = redis_client.register_script(_IN_USE_SCRIPT)
+
+    def _acquire_args(self, holder: str) -> list:
+        return [self.limit, holder, self.lease_ttl]
+
+    def _renew_args(self, holder: str) -> list:
+        return [holder, self.lease_ttl]
+
+    def _lost(self, holder: str) -> None:
+        logger.warning("Semaphore lease lost", semaphore=self.name, holder=holder)
+
+class DistributedSemaphore(_SemaphoreBase):
+    """Cluster-wide counting semaphore for Celery tasks and other sync code.
+
+    Leases expire after `lease_ttl` seconds unless a background thread renews
+    them, so slots held by crashed workers are reclaimed automatically.
+    """
+
+    def try_acquire(self, holder: str) -> bool:
+        """Take a slot for `holder` if one is free."""
+        return bool(self._acquire_script(keys=[self.key], args=self._acquire_args(holder)))
+
+    def release(self, holder: str) -> None:
+        """Give back the holder's slot."""
+        self.redis_client.zrem(self.key, holder)
+
+    def in_use(self) -> int:
+        """Number of live leases."""
+        return self._in_use_script(keys=[self.key])
+
+    def acquire(self, timeout: Optional[float] = None, holder: Optional[str] = None) -> str:
+        """Wait for a slot and return its holder id; raises SemaphoreTimeout."""
+        holder = holder or uuid.uuid4().hex
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.try_acquire(holder):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise SemaphoreTimeout(f"No {self.name} slot free after {timeout}s")
+            time.sleep(self.poll_interval)
+        return holder
+
+    @contextmanager
+    def hold(self, timeout: Optional[float] = None, holder: Optional[str] = None):
+        """Wait for a slot, keep its lease alive while the block runs, then release it."""
+        with self.held(self.acquire(timeout, holder)) as holder:
+            yield holder
+
+    @contextmanager
+    def held(self, holder: str):
+        """Keep an acquired slot's lease alive while the block runs, then release it."""
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(holder, stop), daemon=True)
+        heartbeat.start()
+        try:
+            yield holder
+        finally:
+            stop.set()
+            heartbeat.join()
+            try:
+                self.release(holder)
+            except Exception as e:
+                # The lease expires on its own if the release cannot be delivered
+                logger.error("Failed to release semaphore", exc_info=e, semaphore=self.name)
+
+    def _heartbeat(self, holder: str, stop: threading.Event) -> None:
+        while not stop.wait(self.heartbeat_interval):
+            try:
+                if not self._renew_script(keys=[self.key], args=self._renew_args(holder)):
+                    self._lost(holder)
+                    return
+            except Exception as e:
+                logger.error("Failed to renew semaphore lease", exc_info=e, semaphore=self.name)
+
+class AsyncDistributedSemaphore(_SemaphoreBase):
+    """The same semaphore for the request path, using redis.asyncio."""
+
+    async def try_acquire(self, holder: str) -> bool:
+        """Take a slot for `holder` if one is free."""
+        return bool(await self._acquire_script(keys=[self.key], args=self._acquire_args(holder)))
+
+    async def release(self, holder: str) -> None:
+        """Give back the holder's slot."""
+        await self.redis_client.zrem(self.key, holder)
+
+    async def acquire(self, timeout: Optional[float] = None, holder: Optional[str] = None) -> str:
+        """Wait for a slot (timeout=0 fails immediately) and return its holder id."""
+        holder = holder or uuid.uuid4().hex
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not await self.try_acquire(holder):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise SemaphoreTimeout(f"No {self.name} slot free after {timeout}s")
+            await asyncio.sleep(self.poll_interval)
+        return holder
+
+    @asynccontextmanager
+    async def hold(self, timeout: Optional[float] = None, holder: Optional[str] = None):
+        """Wait for a slot, renewing its lease until the block exits."""
+        async with self.held(await self.acquire(timeout, holder)) as holder:
+            yield holder
+
+    @asynccontextmanager
+    async def held(self, holder: str):
+        """Renew an acquired slot's lease while the block runs, then release it."""
+        heartbeat = asyncio.create_task(self._heartbeat(holder))
+        try:
+            yield holder
+        finally:
+            heartbeat.cancel()
+            try:
+                await self.release(holder)
+            except Exception as e:
+                logger.error("Failed to release semaphore", exc_info=e, semaphore=self.name)
+
+    async def _heartbeat(self, holder: str) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                if not await self._renew_script(keys=[self.key], args=self._renew_args(holder)):
+                    self._lost(holder)
+                    return
+            except Exception as e:
+                logger.error("Failed to renew semaphore lease", exc_info=e, semaphore=self.name)
@@ -0,0 +1,342 @@
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+from utils.cache import Cache, redis_client, cache_key
+from utils.codec import payload_codec
+from utils.prometheus import CACHE_LOOKUP_SECONDS
+from utils.request_timing import timed
+from utils.redis_pool import redis_pools
+from utils.logging_config import CustomLogger, api_logger
+
+logger = CustomLogger(api_logger, {'component': 'tiered_cache'})
+
+_MISSING = object()
+
+# Stores a loaded value only if none of its tags was invalidated since the
+# load began, so a slow load cannot write back data older than an invalidation.
+# KEYS: value key, then n tag generation keys, then n tag index keys
+# ARGV: ttl, payload, cache key, tag index ttl, then the n generations seen
+_STORE_SCRIPT = """
+local n = (#KEYS - 1) / 2
+for i = 1, n do
+    if (redis.call('GET', KEYS[1 + i]) or '0') ~= ARGV[4 + i] then
+        return 0
+    end
+end
+redis.call('SETEX', KEYS[1], ARGV[1], ARGV[2])
+for i = 1, n do
+    redis.call('SADD', KEYS[1 + n + i], ARGV[3])
+    redis.call('EXPIRE', KEYS[1 + n + i], ARGV[4])
+end
+return 1
+"""
+
+GENERATION_TTL = 86400  # seconds; far longer than any load
+
+class TieredCache:
+    """In-process LRU in front of the Redis-backed Cache.
+
+    - Local entries live at most `local_ttl` seconds, which bounds how stale
+      another process's copy can be after an invalidation.
+    - Concurrent misses for one key are collapsed: coroutines in this process
+      share one in-flight load, and processes coordinate through a short Redis
+      lock so only one of them recomputes while the others wait for its result;
+      if that load fails or is not stored, the next waiter to see the lock
+      free takes over.
+    - Entries are tagged (e.g. "videos", "niche:5"); invalidate_tags drops every
+      key carrying any of the tags from both tiers and bumps each tag's
+      generation, so loads that started before it are returned but not stored.
+      Tags travel with the Redis payload, so entries copied into another
+      process's local tier are dropped by its invalidations too.
+    """
+
+    def __init__(self, max_entries: int = 1024, local_ttl: float = 5.0,
+                 lock_timeout: float = 10.0, poll_interval: float = 0.05):
+        self.max_entries = max_entries
+        self.local_ttl = local_ttl
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        # v2 payloads carry their tags; a new prefix keeps them apart from plain values
+        self.key_prefix = "cache:v2:"
+        self._local: "OrderedDict[str, Tuple[float, Any, Tuple[str, ...]]]" = OrderedDict()
+        self._local_lock = threading.Lock()
+        self._generations: Dict[str, int] = {}
+        self._store_script = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._counters = {
+            "local_hits": 0,
+            "redis_hits": 0,
+            "misses": 0,
+            "loads": 0,
+            "lock_waits": 0,
+            "errors": 0,
+            "stale_loads": 0,
+            "redis_get_seconds": 0.0,
+            "load_seconds": 0.0
+        }
+
+    def _count(self, name: str, amount: float = 1) -> None:
+        self._counters[name] += amount
+
+    def _get_local(self, key: str) -> Any:
+        with self._local_lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value, _ = entry
+            if expires_at < time.monotonic():
+                del self._local[key]
+                return _MISSING
+            self._local.move_to_end(key)
+            return value
+
+    def _set_local(self, key: str, value: Any, ttl: float, tags: Tuple[str, ...]) -> None:
+        with self._local_lock:
+            self._local[key] = (time.monotonic() + min(ttl, self.local_ttl), value, tags)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def _local_generations(self, tags: Tuple[str, ...]) -> Tuple[int, ...]:
+        with self._local_lock:
+            return tuple(self._generations.get(tag, 0) for tag in tags)
+
+    def _generation_key(self, tag: str) -> str:
+        return f"{self.key_prefix}gen:{tag}"
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.key_prefix}tag:{tag}"
+
+    def _get_redis(self, key: str) -> Tuple[Any, Tuple[str, ...]]:
+        start = time.perf_counter()
+        entry = Cache.get(f"{self.key_prefix}{key}")
+        self._count("redis_get_seconds", time.perf_counter() - start)
+        if entry is None:
+            return _MISSING, ()
+        tags, value = entry
+        return value, tuple(tags)
+
+    async def _aget_redis(self, key: str, tags: Tuple[str, ...] = ()) -> Tuple[Any, Tuple[str, ...], Optional[list]]:
+        """Fetch (value, stored tags, generations of `tags`) in one round trip.
+
+        The generations are None if Redis could not be read.
+        """
+        start = time.perf_counter()
+        try:
+            with timed("cache"):
+                entry, *generations = await redis_pools.async_client().mget(
+                    f"{self.key_prefix}{key}", *(self._generation_key(tag) for tag in tags)
+                )
+        except Exception as e:
+            self._count("errors")
+            logger.error("Cache get error", exc_info=e, key=key)
+            return _MISSING, (), None
+        finally:
+            self._count("redis_get_seconds", time.perf_counter() - start)
+        generations = [generation or b"0" for generation in generations]
+        if not entry:
+            return _MISSING, (), generations
+        stored_tags, value = payload_codec.loads(entry)
+        return value, tuple(stored_tags), generations
+
+    async def _aset(self, key: str, value: Any, ttl: int, tags: Tuple[str, ...],
+                    generations: Optional[list], local_generations: Tuple[int, ...]) -> None:
+        """Store a loaded value and its tag index entries unless a tag was invalidated meanwhile."""
+        if generations is None:
+            # Redis was unreachable when the load began; keep the result local only
+            stored = True
+        else:
+            if self._store_script is None:
+                self._store_script = redis_pools.async_client().register_script(_STORE_SCRIPT)
+            try:
+                with timed("cache"):
+                    stored = await self._store_script(
+                        keys=[f"{self.key_prefix}{key}"]
+                        + [self._generation_key(tag) for tag in tags]
+                        + [self._tag_key(tag) for tag in tags],
+                        args=[ttl, payload_codec.dumps([list(tags), value]), key, max(ttl, 3600)] + generations
+                    )
+            except Exception as e:
+                self._count("errors")
+                logger.error("Cache set error", exc_info=e, key=key)
+                stored = True
+        if stored and self._local_generations(tags) == local_generations:
+            self._set_local(key, value, ttl, tags)
+        elif not stored:
+            self._count("stale_loads")
+
+    def get(self, key: str) -> Any:
+        """Return the cached value or None, checking the local tier first."""
+        value = self._get_local(key)
+        if value is not _MISSING:
+            self._count("local_hits")
+            return value
+        value, tags = self._get_redis(key)
+        if value is not _MISSING:
+            self._count("redis_hits")
+            self._set_local(key, value, self.local_ttl, tags)
+            return value
+        self._count("misses")
+        return None
+
+    def set(self, key: str, value: Any, ttl: int, tags: Iterable[str] = ()) -> None:
+        """Store a value in both tiers and index it under its tags."""
+        tags = tuple(tags)
+        self._set_local(key, value, ttl, tags)
+        if not Cache.set(f"{self.key_prefix}{key}", [list(tags), value], ttl):
+            self._count("errors")
+            return
+        try:
+            pipe = redis_client.pipeline()
+            for tag in tags:
+                pipe.sadd(self._tag_key(tag), key)
+                pipe.expire(self._tag_key(tag), max(ttl, 3600))
+            pipe.execute()
+        except Exception as e:
+            self._count("errors")
+            logger.error("Cache tag index error", exc_info=e, key=key)
+
+    async def get_or_set(self, key: str, loader: Callable[[], Awaitable[Any]],
+                         ttl: int, tags: Iterable[str] = ()) -> Any:
+        """Return the cached value, or compute it once across concurrent callers.
+
+        Only the cache's own Redis calls count towards the request's "cache"
+        sub-timing; the loader's queries are reported under "db".
+        """
+        start = time.perf_counter()
+        value = self._get_local(key)
+        if value is not _MISSING:
+            self._count("local_hits")
+            CACHE_LOOKUP_SECONDS.labels(result="local_hit").observe(time.perf_counter() - start)
+            return value
+
+        # Share one load among coroutines of this process
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._load(key, loader, ttl, tuple(tags))
+        except BaseException as e:
+            if isinstance(e, Exception):
+                future.set_exception(e)
+                future.exception()  # mark retrieved; waiters still receive it
+            else:
+                future.cancel()
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            del self._inflight[key]
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Any]],
+                    ttl: int, tags: Tuple[str, ...]) -> Any:
+        start = time.perf_counter()
+        local_generations = self._local_generations(tags)
+        value, stored_tags, generations = await self._aget_redis(key, tags)
+        if value is not _MISSING:
+            self._count("redis_hits")
+            CACHE_LOOKUP_SECONDS.labels(result="redis_hit").observe(time.perf_counter() - start)
+            self._set_local(key, value, ttl, stored_tags)
+            return value
+        self._count("misses")
+        CACHE_LOOKUP_SECONDS.labels(result="miss").observe(time.perf_counter() - start)
+
+        # Only one process recomputes; the others wait for its result
+        lock_key = f"{self.key_prefix}lock:{key}"
+        token = uuid.uuid4().hex
+        client = redis_pools.async_client()
+        acquired = await self._acquire(client, lock_key, token)
+
+        if not acquired:
+            self._count("lock_waits")
+            deadline = time.monotonic() + self.lock_timeout
+            while not acquired and time.monotonic() < deadline:
+                await asyncio.sleep(self.poll_interval)
+                local_generations = self._local_generations(tags)
+                value, stored_tags, generations = await self._aget_redis(key, tags)
+                if value is not _MISSING:
+                    self._set_local(key, value, ttl, stored_tags)
+                    return value
+                # A free lock with nothing stored means the leader's load failed
+                # or was rejected as stale: take over rather than wait out the timeout
+                acquired = await self._acquire(client, lock_key, token)
+
+        try:
+            start = time.perf_counter()
+            value = await loader()
+            self._count("loads")
+            self._count("load_seconds", time.perf_counter() - start)
+            await self._aset(key, value, ttl, tags, generations, local_generations)
+            return value
+        finally:
+            if acquired:
+                try:
+                    with timed("cache"):
+                        if await client.get(lock_key) == token.encode():
+                            await client.delete(lock_key)
+                except Exception:
+                    self._count("errors")
+
+    async def _acquire(self, client, lock_key: str, token: str) -> bool:
+        """Take the load lock; True if Redis is unreachable, so loads go ahead unlocked."""
+        try:
+            with timed("cache"):
+                return bool(await client.set(lock_key, token, nx=True, px=int(self.lock_timeout * 1000)))
+        except Exception:
+            self._count("errors")
+            return True
+
+    def invalidate_tags(self, *tags: str) -> None:
+        """Drop every cached key carrying any of the given tags from both tiers."""
+        tag_set = set(tags)
+        with self._local_lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+            for key in [k for k, (_, _, entry_tags) in self._local.items() if tag_set & set(entry_tags)]:
+                del self._local[key]
+        try:
+            # Bump the generations before reading the index: a load storing in
+            # between either sees the new generation or is in the index read here
+            pipe = redis_client.pipeline()
+            for tag in tags:
+                pipe.incr(self._generation_key(tag))
+                pipe.expire(self._generation_key(tag), GENERATION_TTL)
+            for tag in tags:
+                pipe.smembers(self._tag_key(tag))
+            keys = set().union(*pipe.execute()[2 * len(tags):]) if tags else set()
+
+            pipe = redis_client.pipeline()
+            for key in keys:
+                pipe.delete(f"{self.key_prefix}{key.decode()}")
+            for tag in tags:
+                pipe.delete(self._tag_key(tag))
+            pipe.execute()
+        except Exception as e:
+            self._count("errors")
+            logger.error("Cache invalidation error", exc_info=e, tags=list(tags))
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and average latencies for this process."""
+        lookups = self._counters["local_hits"] + self._counters["redis_hits"] + self._counters["misses"]
+        redis_lookups = self._counters["redis_hits"] + self._counters["misses"]
+        return {
+            **self._counters,
+            "local_entries": len(self._local),
+            "hit_rate": (lookups - self._counters["misses"]) / lookups if lookups else 0,
+            "avg_redis_get_ms": self._counters["redis_get_seconds"] / redis_lookups * 1000 if redis_lookups else 0,
+            "avg_load_ms": self._counters["load_seconds"] / self._counters["loads"] * 1000 if self._counters["loads"] else 0
+        }
+
+# Shared response cache for API handlers and the tasks that invalidate it
+response_cache = TieredCache()
+
+def video_tags(niche_id: Optional[int] = None) -> Tuple[str, ...]:
+    """Tags to invalidate when a video changes state."""
+    return ("videos", f"niche:{niche_id}") if niche_id else ("videos",)
@@ -0,0 +1,382 @@
+import atexit
+import json
+import os
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Any, Dict, List, Optional, Tuple
+from redis import Redis
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from config import settings
+from utils.codec import payload_codec
+from utils.logging_config import CustomLogger, video_logger
+from utils.redis_pool import redis_pools, checkout_listeners
+
+class Span:
+    """One timed operation in a trace; times are epoch seconds."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start", "end", "attributes", "status")
+
+    def __init__(self, trace_id: str, parent_id: Optional[str], name: str,
+                 start: Optional[float] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.time() if start is None else start
+        self.end: Optional[float] = None
+        self.attributes = attributes or {}
+        self.status = "ok"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def traceparent(self) -> str:
+        """W3C trace context header value pointing at this span."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentId": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "end": self.end,
+            "attributes": self.attributes,
+            "status": self.status
+        }
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str]]:
+    """(trace_id, parent span_id) from a traceparent header, or None if malformed."""
+    parts = value.split("-") if value else []
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+class RedisSpanStore:
+    """Keeps recent traces in Redis for the trace query endpoint.
+
+    Spans of a trace are appended to one list, and each video points at the
+    trace started by its upload, so later tasks for the video can join it.
+    """
+
+    def __init__(self, redis_client: Redis, retention: int):
+        self.redis_client = redis_client
+        self.retention = retention
+        self.key_prefix = "traces:"
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        pipe = self.redis_client.pipeline(transaction=False)
+        for trace_id in {span["traceId"] for span in spans}:
+            key = f"{self.key_prefix}{trace_id}"
+            pipe.rpush(key, *[payload_codec.dumps(span) for span in spans if span["traceId"] == trace_id])
+            pipe.expire(key, self.retention)
+        pipe.execute()
+
+    def get_trace(self, trace_id: str) -> List[Dict[str, Any]]:
+        return [payload_codec.loads(span) for span in self.redis_client.lrange(f"{self.key_prefix}{trace_id}", 0, -1)]
+
+    def index_video(self, video_id: int, traceparent: str) -> None:
+        self.redis_client.set(f"{self.key_prefix}video:{video_id}", traceparent, ex=self.retention)
+
+    def video_traceparent(self, video_id: int) -> Optional[str]:
+        value = self.redis_client.get(f"{self.key_prefix}video:{video_id}")
+        return value.decode() if value else None
+
+class FileSpanExporter:
+    """Appends finished spans to a JSON-lines file, one write per batch."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        lines = "".join(json.dumps(span, separators=(",", ":"), default=str) + "\n" for span in spans)
+        with open(self.path, "a") as f:
+            f.write(lines)
+
+class OTLPSpanExporter:
+    """Posts spans to an OTLP/HTTP collector (e.g. an OpenTelemetry Collector or Jaeger) as JSON."""
+
+    def __init__(self, endpoint: str, service_name: str, timeout: float = 5.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.timeout = timeout
+
+    @staticmethod
+    def _value(value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {"boolValue": value}
+        if isinstance(value, int):
+            return {"intValue": str(value)}
+        if isinstance(value, float):
+            return {"doubleValue": value}
+        return {"stringValue": str(value)}
+
+    def _span(self, span: Dict[str, Any]) -> Dict[str, Any]:
+        otlp_span = {
+            "traceId": span["traceId"],
+            "spanId": span["spanId"],
+            "name": span["name"],
+            "kind": 1,
+            "startTimeUnixNano": str(int(span["start"] * 1e9)),
+            "endTimeUnixNano": str(int(span["end"] * 1e9)),
+            "attributes": [{"key": key, "value": self._value(value)} for key, value in span["attributes"].items()],
+            "status": {"code": 2 if span["status"] == "error" else 1}
+        }
+        if span["parentId"]:
+            otlp_span["parentSpanId"] = span["parentId"]
+        return otlp_span
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        body = {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{"scope": {"name": "tracing"}, "spans": [self._span(span) for span in spans]}]
+            }]
+        }
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(body).encode("utf-8"),
+            headers={"Content-Type": "application/json"}
+        )
+        urllib.request.urlopen(request, timeout=self.timeout).close()
+
+_current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+class Tracer:
+    """Minimal tracer: spans nest through a context variable and are exported in batches.
+
+    Spans are only recorded inside a trace, which is started by the upload
+    request and carried to Celery tasks in a `traceparent` task header, so
+    untraced code (periodic tasks, other endpoints) pays almost nothing.
+    Finished spans are buffered and written by a background thread every
+    `flush_interval` seconds to the Redis store and the configured exporter.
+    """
+
+    def __init__(self, store: RedisSpanStore, exporter: Any = None, flush_interval: float = 5.0,
+                 max_buffer: int = 10000):
+        self.store = store
+        self.exporter = exporter
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.logger = CustomLogger(video_logger, {'component': 'tracing'})
+        self._lock = threading.Lock()
+        self._task_spans: Dict[str, Tuple[Span, Token]] = {}
+        self._reset_buffer()
+        atexit.register(self.flush)
+
+    def _reset_buffer(self) -> None:
+        self._pid = os.getpid()
+        self._buffer: List[Dict[str, Any]] = []
+        self._flusher: Optional[threading.Thread] = None
+
+    def _finish(self, span: Span, end: Optional[float] = None) -> None:
+        span.end = time.time() if end is None else end
+        with self._lock:
+            # Forked Celery children start with an empty buffer and their own flusher
+            if os.getpid() != self._pid:
+                self._reset_buffer()
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="trace-flusher", daemon=True)
+                self._flusher.start()
+            if len(self._buffer) < self.max_buffer:
+                self._buffer.append(span.to_dict())
+
+    def _flush_loop(self) -> None:
+        pid = os.getpid()
+        while os.getpid() == pid:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self) -> None:
+        """Export buffered spans; spans that fail to export are dropped."""
+        with self._lock:
+            if os.getpid() != self._pid or not self._buffer:
+                return
+            spans, self._buffer = self._buffer, []
+        for exporter in (self.store, self.exporter):
+            if exporter is None:
+                continue
+            try:
+                exporter.export(spans)
+            except Exception as e:
+                self.logger.error("Failed to export spans", exc_info=e,
+                                  exporter=type(exporter).__name__, span_count=len(spans))
+
+    def current_span(self) -> Optional[Span]:
+        return _current.get()
+
+    def traceparent(self) -> Optional[str]:
+        """Header value linking new work to the current span, or None outside a trace."""
+        span = _current.get()
+        return span.traceparent() if span else None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        span = _current.get()
+        if span is not None:
+            span.set_attribute(key, value)
+
+    @contextmanager
+    def _activate(self, span: Span):
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.set_attribute("error", f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            _current.reset(token)
+            self._finish(span)
+
+    def start_trace(self, name: str, **attributes):
+        """Context manager for the root span of a new trace."""
+        return self._activate(Span(os.urandom(16).hex(), None, name, attributes=attributes))
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Child span of the current one; does nothing outside a trace."""
+        parent = _current.get()
+        if parent is None:
+            yield None
+            return
+        with self._activate(Span(parent.trace_id, parent.span_id, name, attributes=attributes)) as span:
+            yield span
+
+    def record_span(self, name: str, duration: float, **attributes) -> None:
+        """Record an already-timed operation that just ended as a child of the current span."""
+        parent = _current.get()
+        if parent is None:
+            return
+        now = time.time()
+        span = Span(parent.trace_id, parent.span_id, name, start=now - duration, attributes=attributes)
+        self._finish(span, end=now)
+
+    def start_task(self, task_id: str, name: str, traceparent: Optional[str] = None,
+                   video_id: Optional[int] = None) -> None:
+        """Open a span for a Celery task joining the sender's trace, or else its video's trace."""
+        if traceparent is None and video_id is not None:
+            traceparent = self.store.video_traceparent(video_id)
+        remote = parse_traceparent(traceparent)
+        if remote is None:
+            return
+        span = Span(remote[0], remote[1], name, attributes={"video_id": video_id} if video_id else {})
+        self._task_spans[task_id] = (span, _current.set(span))
+
+    def finish_task(self, task_id: str, state: Optional[str] = None) -> None:
+        entry = self._task_spans.pop(task_id, None)
+        if entry is None:
+            return
+        span, token = entry
+        if state and state != "SUCCESS":
+            span.status = "error"
+            span.set_attribute("state", state)
+        _current.reset(token)
+        self._finish(span)
+
+    def index_video(self, video_id: int) -> None:
+        """Make the current trace the one that the video's later tasks join."""
+        span = _current.get()
+        if span is not None:
+            span.set_attribute("video_id", video_id)
+            self.store.index_video(video_id, span.traceparent())
+
+    def video_trace(self, video_id: int) -> Optional[List[Dict[str, Any]]]:
+        """Spans of the trace started by the video's upload, or None if it has expired."""
+        remote = parse_traceparent(self.store.video_traceparent(video_id))
+        if remote is None:
+            return None
+        return self.store.get_trace(remote[0])
+
+def critical_path(spans: List[Dict[str, Any]], min_segment: float = 0.001) -> List[Dict[str, Any]]:
+    """Split a trace's wall time into the sequence of spans that determined it.
+
+    Walking back from the end of the trace, each span's time is given to the
+    child that finished last before the current point, recursively; the
+    remainder is the span's own work. Time after a span ended but before its
+    next descendant started (e.g. waiting for a worker) shows up as "waiting".
+    """
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    ids = {span["spanId"] for span in spans}
+    for span in spans:
+        parent = span["parentId"] if span["parentId"] in ids else None
+        children.setdefault(parent, []).append(span)
+
+    effective_end: Dict[str, float] = {}
+
+    def end_of(span: Dict[str, Any]) -> float:
+        if span["spanId"] not in effective_end:
+            effective_end[span["spanId"]] = max(
+                [span["end"]] + [end_of(child) for child in children.get(span["spanId"], [])]
+            )
+        return effective_end[span["spanId"]]
+
+    segments: List[Tuple[str, float, float]] = []
+
+    def own(span: Dict[str, Any], start: float, end: float) -> None:
+        # Prepend, since the walk goes backwards in time
+        if end > span["end"]:
+            segments.insert(0, ("waiting", max(start, span["end"]), end))
+            end = max(start, span["end"])
+        if end > start:
+            segments.insert(0, (span["name"], start, end))
+
+    def walk(span: Dict[str, Any], end: float) -> None:
+        cursor = end
+        for child in sorted(children.get(span["spanId"], []), key=end_of, reverse=True):
+            if child["start"] >= cursor:
+                continue
+            child_end = min(end_of(child), cursor)
+            own(span, child_end, cursor)
+            walk(child, child_end)
+            cursor = child["start"]
+        own(span, span["start"], cursor)
+
+    roots = children.get(None, [])
+    if not roots:
+        return []
+    root = min(roots, key=lambda span: span["start"])
+    walk(root, end_of(root))
+
+    # Drop slivers of parent time between back-to-back children and merge
+    # what becomes adjacent, so the path reads as the stages that mattered
+    path: List[Dict[str, Any]] = []
+    trace_start = root["start"]
+    for name, start, end in segments:
+        if end - start < min_segment:
+            continue
+        if path and path[-1]["name"] == name:
+            path[-1]["durationMs"] = (end - trace_start) * 1000 - path[-1]["startMs"]
+            continue
+        path.append({"name": name, "startMs": (start - trace_start) * 1000, "durationMs": (end - start) * 1000})
+    return path
+
+def _exporter() -> Any:
+    if settings.TRACE_EXPORTER == "file":
+        return FileSpanExporter(settings.TRACE_FILE)
+    if settings.TRACE_EXPORTER == "otlp":
+        return OTLPSpanExporter(settings.OTLP_ENDPOINT, settings.TRACE_SERVICE_NAME)
+    return None
+
+# Shared per-process tracer used by the API and the Celery tasks
+tracer = Tracer(RedisSpanStore(redis_pools.client(), settings.TRACE_RETENTION), _exporter())
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _trace_query_start(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current.get() is not None:
+        context._trace_start = time.perf_counter()
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _trace_query_end(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_trace_start", None)
+    if start is not None:
+        tracer.record_span("db", time.perf_counter() - start, statement=statement.split(None, 1)[0].upper())
+
+def _trace_redis_checkout(seconds: float) -> None:
+    tracer.record_span("redis", seconds)
+
+checkout_listeners.append(_trace_redis_checkout)
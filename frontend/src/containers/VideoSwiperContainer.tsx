@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { Box, VStack, Heading, useToast, Text } from '@chakra-ui/react';
 import VideoCard from '../components/VideoCard';
 import VideoUploader from '../components/VideoUploader';
@@ -19,17 +19,57 @@ const VideoSwiperContainer = () => {
   const [currentIndex, setCurrentIndex] = useState(0);
   const [isNicheSelectorOpen, setIsNicheSelectorOpen] = useState(false);
   const toast = useToast();
+  // Latest list for the poller, whose effect closure only sees the first render
+  const videosRef = useRef<Video[]>(videos);
+  videosRef.current = videos;
 
-  // Poll for processed videos
+  // Poll for processed videos, only fetching those changed since the last poll.
+  // Deltas also carry videos that stopped being processed, which are dropped.
+  // Polls overlap, so changes are merged by id and may arrive more than once.
   useEffect(() => {
+    let lastUpdatedAt: string | undefined;
+
     const pollInterval = setInterval(async () => {
       try {
-        const response = await axios.get('http://localhost:8000/api/videos/processed');
+        const changedVideos: any[] = [];
+        const removedIds = new Set<number>();
+        let cursor: string | undefined;
+        do {
+          const response = await axios.get('http://localhost:8000/api/videos/processed', {
+            params: { updated_since: lastUpdatedAt, cursor, limit: 100 }
+          });
+          changedVideos.push(...response.data.items);
+          (response.data.removed ?? []).forEach((id: number) => removedIds.add(id));
+          cursor = response.data.nextCursor ?? undefined;
+        } while (cursor);
+
+        // Videos that left "processed" (reprocessing, failed uploads) go like
+        // deletions; the client's own uploads still being processed stay
+        changedVideos.forEach((changedVideo: any) => {
+          const shown = videosRef.current.find(v => v.id === changedVideo.id);
+          if (changedVideo.status !== 'processed' && shown && shown.status !== 'processing') {
+            removedIds.add(changedVideo.id);
+          }
+        });
+
+        if (removedIds.size > 0) {
+          // Keep the current card in place when videos before it are removed
+          const removedBefore = (index: number) =>
+            videosRef.current.slice(0, index).filter(v => removedIds.has(v.id)).length;
+          setCurrentIndex(prevIndex => prevIndex - removedBefore(prevIndex));
+        }
+
+        changedVideos.forEach((processedVideo: any) => {
+          if (processedVideo.updated_at && (!lastUpdatedAt || processedVideo.updated_at > lastUpdatedAt)) {
+            lastUpdatedAt = processedVideo.updated_at;
+          }
+        });
+
         setVideos(prevVideos => {
-          const updatedVideos = [...prevVideos];
-          response.data.forEach((processedVideo: any) => {
+          const updatedVideos = prevVideos.filter(v => !removedIds.has(v.id));
+          changedVideos.forEach((processedVideo: any) => {
             const index = updatedVideos.findIndex(v => v.id === processedVideo.id);
-            if (index !== -1) {
+            if (index !== -1 && processedVideo.status === 'processed') {
               updatedVideos[index] = {
                 ...updatedVideos[index],
                 ...processedVideo,